@@ -0,0 +1,49 @@
+"""
+Keys-per-second benchmark for bulk signer key generation.
+
+Generates keystores into a temporary directory with 1 worker and with all
+cores, so the parallel speed-up is visible. Run from the repository root:
+
+    python3 src/benchmarks/keygen.py --count 2000 --iterations 1000
+"""
+import argparse
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent)
+sys.path.append(project_root)
+
+from library.generate_keys import generate_keys_bulk, read_keystore_index
+
+
+def run_benchmark(count: int, kdf: str, iterations: int = None, worker_counts=None):
+    worker_counts = worker_counts or sorted({1, os.cpu_count() or 1})
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for workers in worker_counts:
+            keystore = os.path.join(tmp, f"bench-{workers}.keystore")
+            result = generate_keys_bulk(count, keystore, "benchmark", workers, kdf, iterations)
+            assert len(read_keystore_index(keystore)) == count
+            results.append(result)
+            print(f"workers={workers:<3} keys={count:<7} elapsed={result['elapsed_seconds']:>8.2f}s "
+                  f"keys/s={result['keys_per_second']:>9.1f}")
+
+    if len(results) > 1:
+        speedup = results[-1]["keys_per_second"] / results[0]["keys_per_second"]
+        print(f"Parallel speed-up: {speedup:.2f}x")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark bulk key generation")
+    parser.add_argument("--count", type=int, default=500)
+    parser.add_argument("--kdf", choices=["pbkdf2", "scrypt"], default="pbkdf2")
+    parser.add_argument("--iterations", type=int, help="KDF work factor (lower it to measure raw key creation)")
+    parser.add_argument("--workers", type=int, nargs="*", help="Worker counts to compare")
+    args = parser.parse_args()
+
+    run_benchmark(args.count, args.kdf, args.iterations, args.workers)
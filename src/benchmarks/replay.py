@@ -0,0 +1,235 @@
+"""
+Replays a recorded cassette of Crossmint traffic as a benchmark.
+
+Record the traffic of the automated wallet flow first:
+
+    CASSETTE_RECORD=flow.jsonl python3 src/cli-hello-world/flow/automate.py
+
+The benchmark then runs automate_wallet_flow() itself --runs times, with the
+cassette answering every Crossmint request after its recorded latency
+divided by --speed (0: at once), so staging is never hit. Each run's wall
+time covers the repo's code: request building, signing, polling and its
+fixed waits. The time spent in replayed responses is reported separately,
+so the rest is the code's own. A change that adds or removes requests shows
+up as a different request count, or as misses when the flow asks for
+something the cassette does not have. Save a run with --save and compare a
+later one against it with --compare. Run from the repository root:
+
+    python3 src/benchmarks/replay.py flow.jsonl --speed 0 --save before.json
+    python3 src/benchmarks/replay.py flow.jsonl --speed 0 --compare before.json
+
+With --raw the recorded requests (also of an agent session) are only sent
+again on their recorded schedule, straight into the cassette, without any
+of the repo's code in between. That measures client-side queueing and
+connection handling only.
+"""
+import argparse
+import importlib.util
+import json
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent)
+sys.path.append(project_root)
+
+from library.cassette import REDACTED, REPLAY, Cassette, CassetteTransport, endpoint_name
+from library.wallet_utils import http_session
+
+AUTOMATE_PATH = Path(project_root) / "cli-hello-world" / "flow" / "automate.py"
+
+
+def _percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def _summary(values: list) -> dict:
+    return {
+        "p50_ms": round(_percentile(values, 0.5) * 1000, 2),
+        "p95_ms": round(_percentile(values, 0.95) * 1000, 2),
+        "max_ms": round(max(values) * 1000, 2)
+    }
+
+
+def _load_automate():
+    spec = importlib.util.spec_from_file_location("automate", AUTOMATE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def replay_flow(path: str, speed: float = 0, runs: int = 3) -> dict:
+    """
+    Run the automated wallet flow against a cassette, `runs` times
+
+    Returns:
+        dict: Wall time per run, time spent in replayed responses and the
+        requests served and missed
+    """
+    automate = _load_automate()
+    cassette = Cassette(path, REPLAY, speed)
+    cassette.install()
+
+    results = []
+    for _ in range(runs):
+        cassette.rewind()
+        before = cassette.stats()
+        started = time.perf_counter()
+        result = automate.automate_wallet_flow()
+        wall = time.perf_counter() - started
+        after = cassette.stats()
+        replayed_seconds = after["replayed_seconds"] - before["replayed_seconds"]
+        results.append({
+            "status": result.get("status"),
+            "error": result.get("message") if result.get("status") != "success" else None,
+            "wall_seconds": round(wall, 3),
+            "replayed_seconds": round(replayed_seconds, 3),
+            "code_seconds": round(wall - replayed_seconds, 3),
+            "requests": after["replayed"] - before["replayed"],
+            "misses": after["misses"] - before["misses"]
+        })
+
+    return {
+        "mode": "flow",
+        "cassette": path,
+        "speed": speed,
+        "recorded_requests": len(cassette.interactions),
+        "runs": results,
+        "wall_seconds": _percentile([run["wall_seconds"] for run in results], 0.5),
+        "code_seconds": _percentile([run["code_seconds"] for run in results], 0.5)
+    }
+
+
+def replay_traffic(path: str, speed: float = 1.0, concurrency: int = 8) -> dict:
+    """
+    Send every request of a cassette again on its recorded schedule, without
+    any of the repo's code in between (client-side queueing only)
+
+    Returns:
+        dict: Wall time, errors, and latency per endpoint (replayed and recorded)
+    """
+    cassette = Cassette(path, REPLAY, speed)
+    cassette.install()
+    session = http_session()
+    httpx_client = None
+    if any(interaction["source"] == "httpx" for interaction in cassette.interactions):
+        import httpx
+        httpx_client = httpx.Client(transport=CassetteTransport(cassette))
+
+    latencies = defaultdict(list)
+    recorded = defaultdict(list)
+    errors = []
+    lock = threading.Lock()
+
+    def send(interaction, due):
+        request = interaction["request"]
+        headers = {name: value for name, value in request["headers"].items() if value != REDACTED}
+        body = request["body"].encode() if request["body"] else None
+        try:
+            if interaction["source"] == "httpx":
+                response = httpx_client.request(interaction["method"], interaction["url"], headers=headers, content=body)
+            else:
+                response = session.request(interaction["method"], interaction["url"], headers=headers, data=body)
+            status = response.status_code
+        except Exception as e:
+            status = None
+            with lock:
+                errors.append({"seq": interaction["seq"], "error": str(e)})
+        elapsed = time.perf_counter() - due
+        name = endpoint_name(interaction["method"], interaction["url"])
+        with lock:
+            latencies[name].append(elapsed)
+            recorded[name].append(interaction["duration"])
+        return status
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for interaction in cassette.interactions:
+            due = started + (interaction["offset"] / speed if speed > 0 else 0)
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, interaction, due)
+    wall = time.perf_counter() - started
+
+    if httpx_client:
+        httpx_client.close()
+    return {
+        "mode": "raw",
+        "cassette": path,
+        "speed": speed,
+        "concurrency": concurrency,
+        "requests": len(cassette.interactions),
+        "wall_seconds": round(wall, 3),
+        "errors": errors,
+        "endpoints": {
+            name: {
+                "count": len(values),
+                **_summary(values),
+                "recorded": _summary(recorded[name])
+            }
+            for name, values in sorted(latencies.items())
+        }
+    }
+
+
+def print_flow_report(report: dict, baseline: dict = None):
+    print(f"automate_wallet_flow x{len(report['runs'])} on {report['cassette']} "
+          f"({report['recorded_requests']} recorded requests) at speed {report['speed']}")
+    for index, run in enumerate(report["runs"], 1):
+        line = (f"  run {index}: {run['status']:<8} {run['wall_seconds']:>8.3f}s wall "
+                f"{run['code_seconds']:>8.3f}s code  {run['requests']} requests, {run['misses']} misses")
+        print(line + (f"  ({run['error']})" if run["error"] else ""))
+    line = f"Median: {report['wall_seconds']:.3f}s wall, {report['code_seconds']:.3f}s code"
+    if baseline and baseline.get("mode") == "flow":
+        line += f" vs {baseline['wall_seconds']:.3f}s wall, {baseline['code_seconds']:.3f}s code"
+    print(line)
+
+
+def print_report(report: dict, baseline: dict = None):
+    if report["mode"] == "flow":
+        print_flow_report(report, baseline)
+        return
+    print(f"{report['requests']} requests from {report['cassette']} at {report['speed']}x "
+          f"in {report['wall_seconds']:.3f}s ({len(report['errors'])} errors)")
+    print(f"{'endpoint':<60} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'rec p50':>9}" + ("  p50 vs baseline" if baseline else ""))
+    for name, stats in report["endpoints"].items():
+        line = f"{name[:60]:<60} {stats['count']:>5} {stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} {stats['recorded']['p50_ms']:>9.1f}"
+        before = (baseline or {}).get("endpoints", {}).get(name)
+        if before:
+            change = (stats["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100 if before["p50_ms"] else 0
+            line += f"  {change:+.1f}%"
+        print(line)
+    if baseline:
+        print(f"Wall time: {report['wall_seconds']:.3f}s vs {baseline['wall_seconds']:.3f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the wallet flow against a cassette and report its timing")
+    parser.add_argument("cassette", help="Cassette recorded with CASSETTE_RECORD")
+    parser.add_argument("--speed", type=float, default=1.0, help="Speed-up of recorded timing (0: no delays)")
+    parser.add_argument("--runs", type=int, default=3, help="Flow runs to take the median of")
+    parser.add_argument("--raw", action="store_true",
+                        help="Only resend the recorded requests (client-side queueing, no repo code)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight at once (--raw)")
+    parser.add_argument("--save", help="Write the report to this JSON file")
+    parser.add_argument("--compare", help="Baseline report to compare against")
+    args = parser.parse_args()
+
+    if args.raw:
+        report = replay_traffic(args.cassette, args.speed, args.concurrency)
+    else:
+        report = replay_flow(args.cassette, args.speed, args.runs)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+    print_report(report, baseline)
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(report, file, indent=2)
@@ -0,0 +1,87 @@
+"""
+Throughput benchmark for the bulk approval signature audit.
+
+Signs --count random user operation hashes with a handful of signers, swaps
+the expected signer of a few of them, and audits the lot with 1 worker and
+with all cores. Every swapped entry must come back as a mismatch. Run from the
+repository root:
+
+    python3 src/benchmarks/signature_audit.py --count 100000
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent)
+sys.path.append(project_root)
+
+from library.signature_audit import audit_signatures
+
+
+def _sign_range(private_key: bytes, start: int, count: int) -> list:
+    """Worker: sign `count` deterministic hashes the way sign_user_op_hash does"""
+    from eth_keys import keys
+    from eth_utils import keccak
+
+    key = keys.PrivateKey(private_key)
+    triples = []
+    for i in range(start, start + count):
+        user_op_hash = keccak(i.to_bytes(32, "big"))
+        message_hash = keccak(b"\x19Ethereum Signed Message:\n32" + user_op_hash)
+        signature = bytearray(key.sign_msg_hash(message_hash).to_bytes())
+        signature[64] += 27
+        triples.append(("0x" + user_op_hash.hex(), "0x" + signature.hex(),
+                        f"evm-keypair:{key.public_key.to_checksum_address()}"))
+    return triples
+
+
+def build_triples(count: int, signers: int = 8, chunk: int = 5000) -> list:
+    private_keys = [os.urandom(32) for _ in range(signers)]
+    starts = list(range(0, count, chunk))
+    with ProcessPoolExecutor() as pool:
+        parts = pool.map(
+            _sign_range,
+            [private_keys[i % signers] for i in range(len(starts))],
+            starts,
+            [min(chunk, count - start) for start in starts])
+        return [triple for part in parts for triple in part]
+
+
+def run_benchmark(count: int, tampered: int = 10, worker_counts=None):
+    started = time.perf_counter()
+    triples = build_triples(count)
+    print(f"signed {count} hashes in {time.perf_counter() - started:.2f}s")
+
+    # Expect the wrong signer for a few entries spread over the input
+    tampered_indexes = set(range(0, count, max(1, count // tampered)))
+    for index in tampered_indexes:
+        user_op_hash, signature, _ = triples[index]
+        triples[index] = (user_op_hash, signature, "evm-keypair:0x" + "11" * 20)
+
+    results = []
+    for workers in worker_counts or sorted({1, os.cpu_count() or 1}):
+        report = audit_signatures(triples, workers=workers)
+        found = {mismatch["index"] for mismatch in report["mismatches"]}
+        assert found == tampered_indexes, "audit missed or invented mismatches"
+        assert not report["errors"]
+        results.append(report)
+        print(f"workers={workers:<3} checked={report['checked']:<8} elapsed={report['elapsed_seconds']:>8.2f}s "
+              f"recoveries/s={report['per_second']:>10.1f} mismatches={len(found)}")
+
+    if len(results) > 1:
+        print(f"Parallel speed-up: {results[-1]['per_second'] / results[0]['per_second']:.2f}x")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark bulk signature recovery")
+    parser.add_argument("--count", type=int, default=20000)
+    parser.add_argument("--tampered", type=int, default=10, help="Entries with a wrong expected signer")
+    parser.add_argument("--workers", type=int, nargs="*", help="Worker counts to compare")
+    args = parser.parse_args()
+
+    run_benchmark(args.count, args.tampered, args.workers)
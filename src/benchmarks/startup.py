@@ -0,0 +1,123 @@
+"""
+Cold-start benchmark for the CLI entry points.
+
+Each entry point is loaded in a fresh interpreter (without running its
+`__main__` block) and the wall time is compared against a bare interpreter
+start. Run from the repository root:
+
+    python3 src/benchmarks/startup.py --repeat 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+src_root = Path(__file__).parent.parent
+
+ENTRY_POINTS = [
+    "cli-hello-world/run.py",
+    "cli-hello-world/flow/automate.py",
+    "cli-hello-world/flow/1_create_wallet.py",
+    "cli-hello-world/flow/2_get_usdc.py",
+    "cli-hello-world/flow/3.5_create_random_transaction.py",
+    "cli-hello-world/flow/3_transfer_usdc.py",
+    "cli-hello-world/flow/4_generate_signature.py",
+    "cli-hello-world/flow/5_submit_signature.py",
+    "cli-hello-world/flow/6_get_transaction.py",
+    "cli-hello-world/flow/get_wallet_balance.py",
+    "openai_assistant-hello-world/run.py",
+]
+
+# Placeholder values so module-level environment checks pass. load_dotenv()
+# never overrides variables that are already set.
+BENCH_ENV = {
+    "CROSSMINT_SERVER_API_KEY": "bench",
+    "SIGNER_PRIVATE_KEY": "0x" + "11" * 32,
+    "SIGNER_ADDRESS": "0x" + "22" * 20,
+    "OPENAI_API_KEY": "bench",
+}
+
+
+def _load_command(entry_point: str):
+    """Interpreter command that executes a script without its __main__ block"""
+    script = (
+        "import runpy, sys; "
+        f"sys.path.insert(0, {str(Path(entry_point).parent)!r}); "
+        f"runpy.run_path({entry_point!r}, run_name='__bench__')"
+    )
+    return [sys.executable, "-c", script]
+
+
+def time_command(command, repeat: int, env: dict):
+    """Run a command `repeat` times and return the wall times in seconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run(command, env=env, capture_output=True, text=True)
+        elapsed = time.perf_counter() - start
+        if result.returncode != 0:
+            error = result.stderr.strip().splitlines()
+            return {"status": "error", "error": error[-1] if error else "Unknown error"}
+        timings.append(elapsed)
+    return {"status": "success", "timings": timings}
+
+
+def import_hotspots(entry_point: str, env: dict, top: int = 10):
+    """Return the slowest imports (cumulative microseconds) reported by -X importtime"""
+    command = _load_command(entry_point)
+    command.insert(1, "-X")
+    command.insert(2, "importtime")
+    result = subprocess.run(command, env=env, capture_output=True, text=True)
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, self_us, cumulative_us, name = [part.strip() for part in line.split("|")]
+        rows.append((int(cumulative_us), name.strip()))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+def run_benchmark(repeat: int = 5, entry_points=None, show_imports: bool = False):
+    env = {**os.environ, **BENCH_ENV}
+    entry_points = entry_points or ENTRY_POINTS
+
+    baseline = time_command([sys.executable, "-c", "pass"], repeat, env)
+    baseline_median = statistics.median(baseline["timings"])
+    print(f"{'entry point':<55} {'median':>9} {'min':>9} {'overhead':>9}")
+    print(f"{'(bare interpreter)':<55} {baseline_median * 1000:>7.1f}ms")
+
+    results = {}
+    for entry_point in entry_points:
+        path = str(src_root / entry_point)
+        result = time_command(_load_command(path), repeat, env)
+        results[entry_point] = result
+
+        if result["status"] != "success":
+            print(f"{entry_point:<55} failed: {result['error']}")
+            continue
+
+        median = statistics.median(result["timings"])
+        fastest = min(result["timings"])
+        overhead = median - baseline_median
+        print(f"{entry_point:<55} {median * 1000:>7.1f}ms {fastest * 1000:>7.1f}ms {overhead * 1000:>7.1f}ms")
+
+        if show_imports:
+            for cumulative_us, name in import_hotspots(path, env):
+                print(f"    {cumulative_us / 1000:>8.1f}ms  {name}")
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure cold-start time of the CLI entry points")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per entry point")
+    parser.add_argument("--imports", action="store_true", help="Show the slowest imports per entry point")
+    parser.add_argument("entry_points", nargs="*", help="Entry points relative to src/ (default: all)")
+    args = parser.parse_args()
+
+    run_benchmark(args.repeat, args.entry_points, args.imports)
@@ -1,8 +1,10 @@
+import argparse
 import os
 import sys
 from pathlib import Path
 import json
 import time
+import uuid
 from dotenv import load_dotenv
 
 project_root = str(Path(__file__).parent.parent.parent)
@@ -11,68 +13,122 @@ sys.path.append(project_root)
 from library.wallet_utils import (
     create_wallet,
     transfer_usdc,
-    get_transaction,
+    wait_for_transaction,
     get_usdc_from_faucet,
     get_wallet_balance
 )
+from library.tx_journal import TransactionJournal, resume_transaction
+from library.profiling import Profiler
+from library import cassette
 load_dotenv()
 
 
-def automate_wallet_flow():
+def automate_wallet_flow(journal=None, profiler=None):
+    """
+    Run the demo flow. With a journal, every finished step is recorded and a
+    run that crashed or failed part-way is resumed from the first unfinished step.
+    With a profiler, each step is profiled separately.
+    """
+    profile = (profiler or Profiler()).profile
     try:
         api_key = os.getenv('CROSSMINT_SERVER_API_KEY')
         signer_address = os.getenv('SIGNER_ADDRESS')
         private_key = os.getenv('SIGNER_PRIVATE_KEY')
 
-        # Step 1: Create first wallet
-        print("\n1. Creating First EVM Smart Wallet...")
-        wallet1_response = create_wallet(api_key, "evm-smart-wallet", signer_address)
+        flow_id, flow = f"wallet-flow-{uuid.uuid4()}", {}
+        if journal:
+            unfinished = journal.in_flight(kind="wallet_flow")
+            if unfinished:
+                flow_id, flow = max(unfinished.items(), key=lambda item: item[1]["ts"])
+                print(f"Resuming {flow_id} after step '{flow['state']}'")
 
-        if wallet1_response.get("status") != "success":
-            raise Exception(f"First wallet creation failed: {wallet1_response.get('error')}")
+        def record(state, **data):
+            flow.update(data)
+            if journal:
+                journal.record(flow_id, state, kind="wallet_flow", **data)
 
-        wallet1_address = wallet1_response.get("wallet_data", {}).get("address")
-        if not wallet1_address:
-            raise Exception("First wallet address not found in response")
-        print(f"First wallet created successfully: {wallet1_address}")
+        # Step 1: Create first wallet
+        with profile("create_wallet1"):
+            wallet1_address = flow.get("wallet1_address")
+            if wallet1_address:
+                print(f"\n1. First wallet already created: {wallet1_address}")
+            else:
+                print("\n1. Creating First EVM Smart Wallet...")
+                wallet1_response = create_wallet(api_key, "evm-smart-wallet", signer_address)
+
+                if wallet1_response.get("status") != "success":
+                    raise Exception(f"First wallet creation failed: {wallet1_response.get('error')}")
+
+                wallet1_address = wallet1_response.get("wallet_data", {}).get("address")
+                if not wallet1_address:
+                    raise Exception("First wallet address not found in response")
+                print(f"First wallet created successfully: {wallet1_address}")
+                record("wallet1_created", wallet1_address=wallet1_address)
 
         # Step 2: Create second wallet
-        print("\n2. Creating Second EVM Smart Wallet...")
-        wallet2_response = create_wallet(api_key, "evm-smart-wallet", signer_address)
-
-        if wallet2_response.get("status") != "success":
-            raise Exception(f"Second wallet creation failed: {wallet2_response.get('error')}")
-
-        wallet2_address = wallet2_response.get("wallet_data", {}).get("address")
-        if not wallet2_address:
-            raise Exception("Second wallet address not found in response")
-        print(f"Second wallet created successfully: {wallet2_address}")
+        with profile("create_wallet2"):
+            wallet2_address = flow.get("wallet2_address")
+            if wallet2_address:
+                print(f"\n2. Second wallet already created: {wallet2_address}")
+            else:
+                print("\n2. Creating Second EVM Smart Wallet...")
+                wallet2_response = create_wallet(api_key, "evm-smart-wallet", signer_address)
+
+                if wallet2_response.get("status") != "success":
+                    raise Exception(f"Second wallet creation failed: {wallet2_response.get('error')}")
+
+                wallet2_address = wallet2_response.get("wallet_data", {}).get("address")
+                if not wallet2_address:
+                    raise Exception("Second wallet address not found in response")
+                print(f"Second wallet created successfully: {wallet2_address}")
+                record("wallet2_created", wallet2_address=wallet2_address)
 
         # Step 3: Get USDC from faucet for first wallet
-        fund_amount = 100
-        print(f"\n3. Getting {fund_amount} USDC from faucet for first wallet...")
-        faucet_response = get_usdc_from_faucet(api_key, "base-sepolia", wallet1_address, fund_amount)
-        if faucet_response.get("status") != "success":
-            raise Exception(f"Failed to get USDC from faucet: {faucet_response.get('error')}")
-
-        # Wait and check balance of first wallet
-        print("Waiting for faucet transaction to process...")
-        time.sleep(5)
+        with profile("fund_wallet1"):
+            fund_amount = 100
+            if flow.get("funded"):
+                print(f"\n3. First wallet already funded with {fund_amount} USDC")
+            else:
+                print(f"\n3. Getting {fund_amount} USDC from faucet for first wallet...")
+                faucet_response = get_usdc_from_faucet(api_key, "base-sepolia", wallet1_address, fund_amount)
+                if faucet_response.get("status") != "success":
+                    raise Exception(f"Failed to get USDC from faucet: {faucet_response.get('error')}")
+                record("funded", funded=True)
+
+                # Wait and check balance of first wallet
+                print("Waiting for faucet transaction to process...")
+                time.sleep(5)
 
         # Step 4: Transfer half of USDC to second wallet
         # Convert to base units (1 USDC = 1,000,000 base units)
-        transfer_amount = (fund_amount * 1000000) / 2
-        print(f"\n4. Transferring {transfer_amount / 1000000} USDC to second wallet...")
-        transaction_response = transfer_usdc(
-            api_key,
-            wallet1_address,
-            wallet2_address,
-            int(transfer_amount),  # Convert to integer since we need whole base units
-            "base-sepolia",
-            private_key
-        )
+        with profile("transfer"):
+            transfer_amount = (fund_amount * 1000000) / 2
+            transfer_op = f"{flow_id}:transfer"
+            transfer_state = journal.get(transfer_op) if journal else None
+            if transfer_state:
+                # The transfer was started before: only finish its missing steps
+                print(f"\n4. Resuming transfer from state '{transfer_state['state']}'...")
+                if transfer_state["state"] == "failed":
+                    # End the flow so later runs start a new one instead of resuming this one
+                    record("failed", error=transfer_state.get("error"))
+                    raise Exception(f"Transaction creation failed: {transfer_state.get('error')}")
+                transaction_response = resume_transaction(journal, api_key, transfer_op, private_key)
+            else:
+                print(f"\n4. Transferring {transfer_amount / 1000000} USDC to second wallet...")
+                transaction_response = transfer_usdc(
+                    api_key,
+                    wallet1_address,
+                    wallet2_address,
+                    int(transfer_amount),  # Convert to integer since we need whole base units
+                    "base-sepolia",
+                    private_key,
+                    journal=journal,
+                    op_id=transfer_op
+                )
 
         if transaction_response.get("status") != "success":
+            if journal and (journal.get(transfer_op) or {}).get("state") == "failed":
+                record("failed", error=transaction_response.get("error"))
             raise Exception(f"Transaction creation failed: {transaction_response.get('error')}")
 
         transaction_data = transaction_response.get("transaction_data", {})
@@ -83,27 +139,35 @@ def automate_wallet_flow():
         print(f"Transaction created successfully. ID: {transaction_id}")
 
         # Wait for transaction to process
-        print("\n7. Verifying transaction and final balances...")
-        time.sleep(10)
-
-        transaction_status = get_transaction(api_key, wallet1_address, transaction_id)
-        if transaction_status.get("status") != "success":
-            raise Exception(f"Transaction verification failed: {transaction_status.get('error')}")
-
-        # Check final balances of both wallets
-        print("\nChecking final balances...")
-        wallet1_final = get_wallet_balance(api_key, "base-sepolia", wallet1_address)
-        if wallet1_final.get("status") != "success":
-            raise Exception(f"Failed to get wallet1 balance: {wallet1_final.get('error')}")
-
-        wallet2_final = get_wallet_balance(api_key, "base-sepolia", wallet2_address)
-        if wallet2_final.get("status") != "success":
-            raise Exception(f"Failed to get wallet2 balance: {wallet2_final.get('error')}")
+        with profile("verify"):
+            print("\n7. Verifying transaction and final balances...")
+            # A timeout leaves the transfer "approved", so the next run waits for it again
+            transaction_status = wait_for_transaction(api_key, wallet1_address, transaction_id)
+            if transaction_status.get("status") != "success":
+                raise Exception(f"Transaction verification failed: {transaction_status.get('error')}")
+            final_status = transaction_status["transaction_data"].get("status")
+            if journal:
+                journal.record(transfer_op, "confirmed" if final_status == "success" else "failed",
+                               final_status=final_status)
+            if final_status != "success":
+                record("failed", error=f"Transaction {transaction_id} ended with status {final_status}")
+                raise Exception(f"Transaction {transaction_id} ended with status {final_status}")
+
+            # Check final balances of both wallets
+            print("\nChecking final balances...")
+            wallet1_final = get_wallet_balance(api_key, "base-sepolia", wallet1_address)
+            if wallet1_final.get("status") != "success":
+                raise Exception(f"Failed to get wallet1 balance: {wallet1_final.get('error')}")
+
+            wallet2_final = get_wallet_balance(api_key, "base-sepolia", wallet2_address)
+            if wallet2_final.get("status") != "success":
+                raise Exception(f"Failed to get wallet2 balance: {wallet2_final.get('error')}")
 
         print(f"\nWallet 1 (was funded with USDC from faucet): {wallet1_address}")
         print(f"Final First Wallet Balance: {wallet1_final.get('balance')} USDC")
         print(f"\nWallet 2 (received USDC from first wallet): {wallet2_address}")
         print(f"Final Second Wallet Balance: {wallet2_final.get('balance')} USDC")
+        record("completed")
 
         return {
             "status": "success",
@@ -130,6 +194,22 @@ def automate_wallet_flow():
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the automated wallet flow")
+    parser.add_argument("--profile", nargs="?", const="profile-stats", metavar="DIR",
+                        help="cProfile every flow step into DIR (default: profile-stats)")
+    options = parser.parse_args()
+
     print("Starting automated wallet flow...")
-    result = automate_wallet_flow()
+    journal_dir = os.getenv('FLOW_JOURNAL_DIR')
+    journal = TransactionJournal(journal_dir) if journal_dir else None
+    profiler = Profiler(options.profile)
+    # Records or replays the Crossmint traffic when CASSETTE_RECORD/CASSETTE_REPLAY is set
+    recording = cassette.from_env()
+    result = automate_wallet_flow(journal, profiler)
+    if journal:
+        journal.close()
     print(f"\nFinal Result: {json.dumps(result, indent=2)}")
+    profiler.print_hotspots()
+    if recording:
+        print(f"Cassette: {json.dumps(recording.stats())}")
+        recording.close()
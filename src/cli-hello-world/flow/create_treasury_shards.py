@@ -0,0 +1,27 @@
+import os
+import sys
+from pathlib import Path
+import json
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+sys.path.append(project_root)
+
+from library.sharded_treasury import ShardedTreasury
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def create_treasury_shards(count: int):
+    api_key = os.getenv('CROSSMINT_SERVER_API_KEY')
+    signer_address = os.getenv('SIGNER_ADDRESS')
+    return ShardedTreasury.create_shards(api_key, count, signer_address)
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    response = create_treasury_shards(count)
+    print(f"Result: {json.dumps(response, indent=2)}")
+    if response["addresses"]:
+        print(f"\nTEST_TREASURY_EVM_SHARDS={','.join(response['addresses'])}")
+        print("Be sure to copy and paste this value into your .env file")
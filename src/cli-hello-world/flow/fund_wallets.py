@@ -0,0 +1,37 @@
+import os
+import sys
+from pathlib import Path
+import json
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+sys.path.append(project_root)
+
+from library.balance_ledger import USDC_BASE_UNITS
+from library.funding_scheduler import FundingScheduler
+from library.signer_pool import SignerPool
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def fund_wallets(addresses, target: float):
+    """Top up every wallet to `target` USDC, through FUNDING_HUB_WALLET when set"""
+    api_key = os.getenv('CROSSMINT_SERVER_API_KEY')
+    scheduler = FundingScheduler.from_env(api_key, signer_pool=SignerPool.from_env())
+    return scheduler.fund_all(addresses, int(target * USDC_BASE_UNITS))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python fund_wallets.py <target USDC> <addresses file | address...>")
+        sys.exit(1)
+
+    target = float(sys.argv[1])
+    if len(sys.argv) == 3 and os.path.isfile(sys.argv[2]):
+        with open(sys.argv[2]) as file:
+            addresses = [line.strip() for line in file if line.strip()]
+    else:
+        addresses = sys.argv[2:]
+
+    response = fund_wallets(addresses, target)
+    print(f"Result: {json.dumps(response, indent=2)}")
@@ -0,0 +1,47 @@
+import os
+import sys
+from pathlib import Path
+import json
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+sys.path.append(project_root)
+
+from library.sharded_treasury import ShardedTreasury
+from library.signer_pool import SignerPool
+from library.tx_pipeline import TransactionPipeline
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def sweep_treasury(keep: float = 0):
+    """
+    Sweep every TEST_TREASURY_EVM_SHARDS wallet into TEST_TREASURY_EVM_WALLET
+    through a TransactionPipeline, leaving `keep` USDC on each shard
+
+    Returns:
+        dict: The sweep report, with the pipeline's per-stage stats added
+    """
+    api_key = os.getenv('CROSSMINT_SERVER_API_KEY')
+    signer_pool = SignerPool.from_env()
+    pipeline = TransactionPipeline(api_key, signer_pool)
+    treasury = ShardedTreasury.from_env(api_key, signer_pool=signer_pool, pipeline=pipeline)
+    if treasury is None:
+        pipeline.close()
+        return {"status": "error", "error": "TEST_TREASURY_EVM_SHARDS is not set"}
+
+    try:
+        report = treasury.sweep(keep=int(keep * 10**6))
+        report["pipeline"] = pipeline.stats()
+        return report
+    finally:
+        treasury.close()
+        pipeline.close()
+
+
+if __name__ == "__main__":
+    keep = float(sys.argv[1]) if len(sys.argv) > 1 else 0
+    response = sweep_treasury(keep)
+    print(f"Result: {json.dumps(response, indent=2)}")
+    if response.get("pipeline"):
+        print(f"\nBottleneck stage: {response['pipeline']['bottleneck']}")
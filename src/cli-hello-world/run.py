@@ -1,8 +1,8 @@
-import time
+import argparse
 import json
-from openai import OpenAI
 import os
 import sys
+import time
 from pathlib import Path
 
 # Add the project root to Python path
@@ -10,9 +10,22 @@ project_root = str(Path(__file__).parent.parent)
 sys.path.append(project_root)
 
 from library.tools_schema import tools_schema
+from library.command_router import route_command
+from library.response_cache import ResponseCache, schema_fingerprint
+from library.wallet_context import build_wallet_context
+from library.wallet_registry import WalletRegistry
+from library.addresses import validate_addresses
+from library.signer_pool import SignerPool
+from library.balance_ledger import BalanceLedger, print_reconciliation
+from library.speculative_tx import SpeculativeTransactions
+from library.webhook_receiver import waiter_from_env
+from library import cassette, tracing
+from library.profiling import Profiler
+from library.token_budget import BudgetExceededError, TokenBudget
+from library.tracing import span, traced, traced_sleep
 from library.wallet_utils import (
     create_wallet,
-    create_transaction, generate_signature, submit_transaction_approval,
+    create_transaction, submit_transaction_approvals,
     get_transaction, transfer_usdc, get_usdc_from_faucet
 )
 
@@ -49,17 +62,66 @@ class CryptoAIAgent:
             "solana-devnet": "https://explorer.solana.com/?cluster=devnet"
         }
         self.chat_history = []
-        self.openai_client = OpenAI()
-        self.wallets = []
-        self.api_calls = 0
-        self.max_api_calls = 20
+        self._openai_client = None
+        # Records or replays Crossmint/OpenAI traffic when CASSETTE_RECORD/CASSETTE_REPLAY is set
+        self.cassette = cassette.from_env()
+        self.wallets = WalletRegistry()
+        self._signer_pool = None
+        self.ledger = BalanceLedger(self.api_key)
+        if os.getenv('LEDGER_RECONCILE_INTERVAL'):
+            self.ledger.start(float(os.getenv('LEDGER_RECONCILE_INTERVAL')), print_reconciliation)
+        # Webhook-driven confirmations when WEBHOOK_SECRET/WEBHOOK_PORT are set
+        self.transaction_waiter = waiter_from_env(self.api_key)
+        # Replaced by main() when run with --profile
+        self.profiler = Profiler()
+        # Pre-created, pre-signed repeat transfers when SPECULATIVE_TX_TTL is set
+        self.speculation = None
+        if os.getenv('SPECULATIVE_TX_TTL'):
+            self.speculation = SpeculativeTransactions(
+                self.api_key, self.signer_pool, ttl=float(os.getenv('SPECULATIVE_TX_TTL')))
+        self.wallet_context_tokens = int(os.getenv('WALLET_CONTEXT_TOKENS', '300'))
+        self.model = "gpt-4o-mini"
+        # Token and cost ceilings from the BUDGET_* environment variables
+        self.budget = TokenBudget.from_env(self.model)
+        self.tools = tools_schema()
+        self.tools_hash = schema_fingerprint(self.tools)
+        self.response_cache = ResponseCache(
+            max_entries=int(os.getenv('RESPONSE_CACHE_SIZE', '256')),
+            ttl_seconds=float(os.getenv('RESPONSE_CACHE_TTL', '300')))
+
+    @property
+    def openai_client(self):
+        """OpenAI client, created on first use to keep startup fast"""
+        if self._openai_client is None:
+            from openai import OpenAI
+            if self.cassette:
+                self._openai_client = OpenAI(http_client=self.cassette.openai_http_client())
+            else:
+                self._openai_client = OpenAI()
+        return self._openai_client
+
+    @property
+    def signer_pool(self):
+        """Signer pool (SIGNER_PRIVATE_KEY plus SIGNER_KEYSTORE), loaded on first use"""
+        if self._signer_pool is None:
+            self._signer_pool = SignerPool.from_env()
+        return self._signer_pool
+
+    def admin_signer_address(self):
+        """Admin signer for a new wallet, spread across the pool when a keystore is configured"""
+        if os.getenv('SIGNER_KEYSTORE'):
+            return self.signer_pool.next_address()
+        return self.signer_address
 
     def create_new_wallet(self, wallet_type):
         """Agent method to create and track new wallets"""
-        result = create_wallet(self.api_key, wallet_type, self.signer_address)
+        result = create_wallet(self.api_key, wallet_type, self.admin_signer_address())
 
         if result.get("status") == "success":
-            self.wallets.append(result["wallet_data"])
+            self.wallets.add(result["wallet_data"])
+            # The ledger reconciles on base-sepolia: it only holds EVM wallets
+            if wallet_type == "evm-smart-wallet":
+                self.ledger.track(result["wallet_data"].get("address"))
 
         return result
 
@@ -95,22 +157,20 @@ class CryptoAIAgent:
 
             transaction_data = transaction_response.get("transaction_data", {})
             transaction_id = transaction_data.get("id")
-            user_op_hash = transaction_data.get(
-                "data", {}).get("userOperationHash")
 
-            # Step 2: Generate signature
+            # Step 2: Sign every pending approval with its cached signer
             print("Generating signature...")
-            signature = generate_signature(self.private_key, user_op_hash)
+            approvals = self.signer_pool.sign_pending(transaction_data)
+            if not approvals:
+                return {"status": "error", "message": "No signer available for the pending approvals"}
 
-            # Step 3: Submit signature
+            # Step 3: Submit signatures
             print("Submitting signature...")
-            signer_id = self.signer_address
-            submit_response = submit_transaction_approval(
+            submit_response = submit_transaction_approvals(
                 self.api_key,
                 wallet_address,
                 transaction_id,
-                signer_id,
-                signature
+                approvals
             )
 
             if submit_response.get("status") != "success":
@@ -118,10 +178,14 @@ class CryptoAIAgent:
 
             # Step 4: Verify transaction
             print("Verifying transaction...")
-            time.sleep(10)  # Allow transaction to process
+            if self.transaction_waiter:
+                transaction_status = self.transaction_waiter.wait(
+                    wallet_address, transaction_id)
+            else:
+                traced_sleep(10)  # Allow transaction to process
 
-            transaction_status = get_transaction(
-                self.api_key, wallet_address, transaction_id)
+                transaction_status = get_transaction(
+                    self.api_key, wallet_address, transaction_id)
 
             return {
                 "status": "success",
@@ -148,28 +212,47 @@ class CryptoAIAgent:
 
     def get_wallet_balance(self, wallet_address):
         """Agent method to get the balance of a wallet"""
-        wallet = next(
-            (w for w in self.wallets if w['address'] == wallet_address), None)
+        wallet = self.wallets.get(wallet_address)
         if not wallet:
             return {"status": "error", "message": "Wallet not found in tracked wallets"}
+        self.wallets.touch(wallet_address)
 
         chain = "base-sepolia" if wallet['type'] == "evm-smart-wallet" else "solana-devnet"
         explorer_url = self.get_explorer_url(wallet_address, chain)
 
-        return {
+        result = {
             "status": "success",
             "message": f"View wallet balance and transactions at: {explorer_url}",
             "explorer_url": explorer_url
         }
 
+        # Balance from the local ledger, fetched only when it is unknown or suspect
+        balance = self.ledger.checked_balance(wallet_address) if wallet['type'] == "evm-smart-wallet" else None
+        if balance is not None:
+            result["balance"] = balance / 10**6
+            result["message"] = f"Balance: {result['balance']} USDC. " + result["message"]
+        return result
+
+    def find_wallets(self, query: str = "", wallet_type: str = None, limit: int = 10):
+        """Agent method to look up tracked wallets that are not in the prompt"""
+        limit = max(1, min(int(limit or 10), 50))
+        matches = self.wallets.search(query or "", wallet_type, limit)
+        return {
+            "status": "success",
+            "total_tracked": len(self.wallets),
+            "wallets": [{"address": w.get("address"), "type": w.get("type")} for w in matches]
+        }
+
     def get_usdc_tokens(self, wallet_address: str, amount: int):
         """Get USDC tokens from faucet for a wallet"""
+        self.wallets.touch(wallet_address)
         result = get_usdc_from_faucet(
             self.api_key, "base-sepolia", wallet_address, amount)
 
         if result.get("status") == "success":
             print(f"Waiting for faucet transaction to process...")
-            time.sleep(5)
+            self.ledger.apply_faucet(wallet_address, amount)
+            traced_sleep(5)
 
             # Provide explorer link instead of balance
             explorer_url = self.get_explorer_url(wallet_address)
@@ -182,24 +265,46 @@ class CryptoAIAgent:
         # Convert USDC amount to base units (1 USDC = 1,000,000 base units)
         amount_in_base_units = amount * 1000000
 
+        # Reject malformed addresses before any API call, and use one spelling
+        checked = validate_addresses([from_wallet, to_wallet])
+        if checked["invalid"]:
+            return {"status": "error", "message": checked["invalid"][0]["error"]}
+        from_wallet, to_wallet = checked["valid"]
+        self.wallets.touch(to_wallet)
+        self.wallets.touch(from_wallet)
+
         # Create and send the transaction
-        transaction_response = transfer_usdc(
-            self.api_key,
-            from_wallet,
-            to_wallet,
-            amount_in_base_units,
-            "base-sepolia",
-            self.private_key
-        )
+        if self.speculation:
+            transaction_response = self.speculation.submit_transfer(
+                from_wallet, to_wallet, amount_in_base_units)
+        else:
+            transaction_response = transfer_usdc(
+                self.api_key,
+                from_wallet,
+                to_wallet,
+                amount_in_base_units,
+                "base-sepolia",
+                self.private_key,
+                signer_pool=self.signer_pool
+            )
 
         if transaction_response.get("status") != "success":
             return transaction_response
 
+        self.ledger.apply_transfer(from_wallet, to_wallet, amount_in_base_units)
+
         transaction_data = transaction_response.get("transaction_data", {})
 
         # Wait for transaction to process
         print("Waiting for transaction to process...")
-        time.sleep(10)
+        if self.transaction_waiter:
+            self.transaction_waiter.wait(from_wallet, transaction_data.get("id"))
+        else:
+            traced_sleep(10)
+
+        if self.speculation:
+            # A transfer seen twice recently is likely to repeat: have it ready
+            self.speculation.prepare_repeat_transfer(from_wallet, to_wallet, amount_in_base_units)
 
         # Get the explorer URL for both wallets
         from_explorer = self.get_explorer_url(from_wallet)
@@ -215,20 +320,24 @@ class CryptoAIAgent:
             }
         }
 
+    @traced("chat_completion")
     def chat_completion(self, user_input):
         """Handle chat completion with OpenAI"""
-        if self.api_calls >= self.max_api_calls:
-            raise Exception(
-                "Maximum API calls reached. Please restart the program.")
-
-        self.api_calls += 1
-
-        # Create wallet context
-        wallet_context = "No wallets created yet."
-        if self.wallets:
-            wallet_details = [f"Wallet {i+1}: {w.get('address', 'No address')} (Type: {w.get('type', 'unknown')})"
-                              for i, w in enumerate(self.wallets)]
-            wallet_context = "Available wallets:\n" + "\n".join(wallet_details)
+        # Create wallet context, bounded so the prompt stays flat as wallets grow
+        wallet_context = build_wallet_context(
+            self.wallets, self.wallet_context_tokens)
+
+        # Repeated intents against the same wallet state and prompt reuse the
+        # earlier response and do not count towards the budget
+        self.response_cache.sync_version(self.wallets.version)
+        cache_key = ResponseCache.make_key(
+            user_input, self.wallets.version, self.tools_hash, wallet_context)
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        # Raises BudgetExceededError past a session ceiling, throttles per minute
+        self.budget.acquire()
 
         # Base contextual prompt where we include any wallet context
         contextual_prompt = f"""You are a super helpful AI web3 assistant that can perform actions on the blockchain using Crossmint's API.
@@ -238,23 +347,106 @@ class CryptoAIAgent:
 
         You can create new wallets, check the balance of existing wallets, deposit tokens to a wallet, transfer tokens between wallets, and more."""
 
-        response = self.openai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": contextual_prompt},
-                {"role": "user", "content": user_input}
-            ],
-            tools=tools_schema(),
-            tool_choice="auto"
+        started = time.perf_counter()
+        with span("openai.chat.completions", model=self.model):
+            response = self.openai_client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": contextual_prompt},
+                    {"role": "user", "content": user_input}
+                ],
+                tools=self.tools,
+                tool_choice="auto"
+            )
+        self.budget.record(response.usage, time.perf_counter() - started, user_input[:80])
+        message = response.choices[0].message
+        self.response_cache.put(cache_key, message)
+        return message
+
+
+def handle_tool_call(agent, name, args):
+    """Run a tool by name with parsed arguments and print the outcome"""
+    with span(f"tool.{name}"), agent.profiler.profile(f"tool.{name}"):
+        return _run_tool(agent, name, args)
+
+
+def _run_tool(agent, name, args):
+    result = None
+
+    if name == "create_new_wallet":
+        result = agent.create_new_wallet(args["wallet_type"])
+        if result.get("status") == "success":
+            print(f"\nWallet Created Successfully!")
+        else:
+            print(f"\nWallet Creation Failed!")
+
+        print(f"Result: {json.dumps(result, indent=2)}")
+
+    elif name == "get_wallet_balance":
+        result = agent.get_wallet_balance(args["wallet_address"])
+        if result.get("status") == "success":
+            print(f"\n{result.get('message')}")
+        else:
+            print(f"\nError: {result.get('message')}")
+
+    elif name == "find_wallets":
+        result = agent.find_wallets(
+            args.get("query", ""), args.get("wallet_type"), args.get("limit", 10))
+        print(f"\nFound {len(result['wallets'])} of {result['total_tracked']} tracked wallets:")
+        for wallet in result["wallets"]:
+            print(f"- {wallet['address']} (Type: {wallet['type']})")
+
+    elif name == "create_transaction":
+        wallet_address = agent.select_wallet()  # Let user select the wallet
+        if wallet_address:
+            result = agent.create_transaction(wallet_address)
+            if result.get("status") == "success":
+                print("\nTransaction Completed Successfully!")
+            else:
+                print(f"\nTransaction Failed: {result.get('message', 'Unknown error')}")
+            print(f"Result: {json.dumps(result, indent=2)}")
+        else:
+            print("\nNo wallet selected for transaction.")
+
+    elif name == "get_usdc_from_faucet":
+        result = agent.get_usdc_tokens(args["wallet_address"], args["amount"])
+        if result.get("status") == "success":
+            print("\nUSDC tokens requested successfully!")
+        else:
+            print(f"\nFailed to get USDC tokens: {result.get('message', 'Unknown error')}")
+
+    elif name == "transfer_usdc":
+        result = agent.transfer_usdc_tokens(
+            args["from_wallet_address"],
+            args["to_wallet_address"],
+            args["amount"]
         )
-        return response.choices[0].message
+        if result.get("status") == "success":
+            print("\nUSDC transfer completed successfully!")
+            print(f"\nView source wallet at: {result['data']['from_wallet_explorer']}")
+            print(f"View destination wallet at: {result['data']['to_wallet_explorer']}")
+        else:
+            print(f"\nUSDC transfer failed: {result.get('message', 'Unknown error')}")
+        print(f"Result: {json.dumps(result, indent=2)}")
+
+    return result
 
 
 def main():
     try:
+        parser = argparse.ArgumentParser()
+        parser.add_argument("--profile", nargs="?", const="profile-stats", metavar="DIR",
+                            help="cProfile every tool call into DIR (default: profile-stats)")
+        options = parser.parse_args()
+
         agent = CryptoAIAgent()
+        agent.profiler = Profiler(options.profile)
+        if tracing.configure():
+            print(f"Writing trace spans to {os.getenv('TRACE_FILE')}")
+        if agent.cassette:
+            print(f"Cassette {agent.cassette.mode}: {agent.cassette.path}")
         print("Welcome to the AI Agent! (Type 'exit' or 'q' to quit)")
-        print(f"Maximum API calls: {agent.max_api_calls}")
+        print(f"Budget: {json.dumps(agent.budget.stats()['limits'])}")
 
         while True:
             user_input = input("\nAsk anything -> ").strip()
@@ -262,75 +454,42 @@ def main():
             if user_input.lower() in ['exit', 'q']:
                 import random
                 farewell = random.choice(["Goodbye!", "See ya!", "Take care!"])
+                print(f"Response cache: {json.dumps(agent.response_cache.stats())}")
+                print(f"Budget: {json.dumps(agent.budget.stats(), indent=2)}")
+                if agent.speculation:
+                    print(f"Speculative transactions: {json.dumps(agent.speculation.stats())}")
+                agent.profiler.print_hotspots()
+                if agent.cassette:
+                    print(f"Cassette: {json.dumps(agent.cassette.stats())}")
+                    agent.cassette.close()
                 print(farewell)
                 break
 
-            # Get AI response
-            response = agent.chat_completion(user_input)
-
-            # Handle normal response
-            if response.content:
-                print(f"\nAI Agent: {response.content}")
-
-            # Handle function calls
-            if response.tool_calls:
-                for tool_call in response.tool_calls:
-                    if tool_call.function.name == "create_new_wallet":
+            # One root span per turn when TRACE_FILE is set
+            with span("turn", input=user_input[:80]):
+                # Structured commands go straight to the tool, skipping the LLM
+                routed = route_command(user_input)
+                if routed:
+                    handle_tool_call(agent, *routed)
+                    continue
+
+                # Get AI response; a spent budget ends the turn, not the session
+                try:
+                    response = agent.chat_completion(user_input)
+                except BudgetExceededError as e:
+                    print(f"\nBudget exceeded: {e}")
+                    continue
+
+                # Handle normal response
+                if response.content:
+                    print(f"\nAI Agent: {response.content}")
+
+                # Handle function calls
+                if response.tool_calls:
+                    for tool_call in response.tool_calls:
                         # Parse JSON string into dict
                         args = json.loads(tool_call.function.arguments)
-                        result = agent.create_new_wallet(args["wallet_type"])
-                        if result.get("status") == "success":
-                            print(f"\nWallet Created Successfully!")
-                        else:
-                            print(f"\nWallet Creation Failed!")
-
-                        print(f"Result: {json.dumps(result, indent=2)}")
-
-                    elif tool_call.function.name == "get_wallet_balance":
-                        args = json.loads(tool_call.function.arguments)
-                        result = agent.get_wallet_balance(
-                            args["wallet_address"])
-                        if result.get("status") == "success":
-                            print(f"\n{result.get('message')}")
-                        else:
-                            print(f"\nError: {result.get('message')}")
-
-                    elif tool_call.function.name == "create_transaction":
-                        args = json.loads(tool_call.function.arguments)
-                        wallet_address = agent.select_wallet()  # Let user select the wallet
-                        if wallet_address:
-                            result = agent.create_transaction(wallet_address)
-                            if result.get("status") == "success":
-                                print("\nTransaction Completed Successfully!")
-                            else:
-                                print(f"\nTransaction Failed: {result.get('message', 'Unknown error')}")
-                            print(f"Result: {json.dumps(result, indent=2)}")
-                        else:
-                            print("\nNo wallet selected for transaction.")
-
-                    elif tool_call.function.name == "get_usdc_from_faucet":
-                        args = json.loads(tool_call.function.arguments)
-                        result = agent.get_usdc_tokens(
-                            args["wallet_address"], args["amount"])
-                        if result.get("status") == "success":
-                            print("\nUSDC tokens requested successfully!")
-                        else:
-                            print(f"\nFailed to get USDC tokens: {result.get('message', 'Unknown error')}")
-
-                    elif tool_call.function.name == "transfer_usdc":
-                        args = json.loads(tool_call.function.arguments)
-                        result = agent.transfer_usdc_tokens(
-                            args["from_wallet_address"],
-                            args["to_wallet_address"],
-                            args["amount"]
-                        )
-                        if result.get("status") == "success":
-                            print("\nUSDC transfer completed successfully!")
-                            print(f"\nView source wallet at: {result['data']['from_wallet_explorer']}")
-                            print(f"View destination wallet at: {result['data']['to_wallet_explorer']}")
-                        else:
-                            print(f"\nUSDC transfer failed: {result.get('message', 'Unknown error')}")
-                        print(f"Result: {json.dumps(result, indent=2)}")
+                        handle_tool_call(agent, tool_call.function.name, args)
 
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
@@ -0,0 +1,290 @@
+import argparse
+import hmac
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# The agent lives next to this script; the project root for library imports
+from run import CryptoAIAgent, handle_tool_call
+
+from library import tracing
+from library.token_budget import BudgetExceededError
+from library.tracing import span
+from library.wallet_utils import get_transaction
+
+# Larger request bodies are rejected before they are read
+MAX_BODY_BYTES = 64 * 1024
+
+# Tools that prompt on stdin, which a service has no one to answer
+INTERACTIVE_TOOLS = {"create_transaction"}
+
+
+class ServiceError(Exception):
+    """A request the service refuses, answered with its HTTP status"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _error(message: str) -> dict:
+    return {"status": "error", "error": message, "timestamp": datetime.utcnow().isoformat()}
+
+
+def _require(body: dict, *fields) -> list:
+    missing = [field for field in fields if body.get(field) in (None, "")]
+    if missing:
+        raise ServiceError(400, f"Missing field(s): {', '.join(missing)}")
+    return [body[field] for field in fields]
+
+
+class AgentService:
+    """
+    The agent's tools and chat over HTTP/JSON, for many clients at once
+
+    One CryptoAIAgent is shared by every request, so the HTTP connection pool,
+    the signer pool, the wallet registry, the ledger and the response cache
+    stay warm between clients. Requests run on their own threads
+    (ThreadingHTTPServer); the shared state is already guarded by locks.
+    """
+
+    def __init__(self, agent: CryptoAIAgent, host: str = "127.0.0.1", port: int = 8080, token: str = None):
+        """
+        Args:
+            agent (CryptoAIAgent): Agent whose state every request shares
+            host (str): Interface to listen on
+            port (int): Port to listen on (0 picks a free one)
+            token (str): Bearer token required on every request but /health
+        """
+        self.agent = agent
+        self.token = token
+        self.started = time.time()
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self._routes = [
+            ("GET", r"/health", self.health),
+            ("GET", r"/stats", self.stats),
+            ("GET", r"/wallets", self.find_wallets),
+            ("POST", r"/wallets", self.create_wallet),
+            ("GET", r"/wallets/(?P<address>[^/]+)/balance", self.balance),
+            ("POST", r"/wallets/(?P<address>[^/]+)/faucet", self.faucet),
+            ("GET", r"/wallets/(?P<address>[^/]+)/transactions/(?P<transaction_id>[^/]+)", self.transaction),
+            ("POST", r"/transfers", self.transfer),
+            ("POST", r"/chat", self.chat)
+        ]
+        self._routes = [(method, re.compile(pattern + "$"), handler) for method, pattern, handler in self._routes]
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def dispatch(self, method: str, path: str, query: dict, body: dict) -> tuple:
+        """
+        Route one request
+
+        Returns:
+            tuple: (HTTP status, JSON-serializable response)
+        """
+        known_path = False
+        for route_method, pattern, handler in self._routes:
+            match = pattern.match(path)
+            if not match:
+                continue
+            known_path = True
+            if route_method != method:
+                continue
+            result = handler(body=body, query=query, **match.groupdict())
+            status = 200 if result.get("status") != "error" else 400
+            return status, result
+        if known_path:
+            raise ServiceError(405, f"{method} not allowed on {path}")
+        raise ServiceError(404, f"No route for {path}")
+
+    # Endpoints
+
+    def health(self, **_):
+        return {"status": "success", "uptime_seconds": round(time.time() - self.started, 1)}
+
+    def stats(self, **_):
+        agent = self.agent
+        with self._lock:
+            service = {"requests": self.requests, "errors": self.errors, "in_flight": self.in_flight}
+        return {
+            "status": "success",
+            "service": service,
+            "wallets_tracked": len(agent.wallets),
+            "budget": agent.budget.stats(),
+            "response_cache": agent.response_cache.stats(),
+            "speculation": agent.speculation.stats() if agent.speculation else None
+        }
+
+    def find_wallets(self, query, **_):
+        return self.agent.find_wallets(
+            query.get("query", [""])[0], query.get("wallet_type", [None])[0], query.get("limit", [10])[0])
+
+    def create_wallet(self, body, **_):
+        wallet_type, = _require(body, "wallet_type")
+        return self.agent.create_new_wallet(wallet_type)
+
+    def balance(self, address, **_):
+        return self.agent.get_wallet_balance(address)
+
+    def faucet(self, address, body, **_):
+        amount, = _require(body, "amount")
+        return self.agent.get_usdc_tokens(address, int(amount))
+
+    def transaction(self, address, transaction_id, **_):
+        return get_transaction(self.agent.api_key, address, transaction_id)
+
+    def transfer(self, body, **_):
+        from_wallet, to_wallet, amount = _require(body, "from_wallet_address", "to_wallet_address", "amount")
+        return self.agent.transfer_usdc_tokens(from_wallet, to_wallet, int(amount))
+
+    def chat(self, body, **_):
+        """Ask the model, then run the tool calls it makes, like one CLI turn"""
+        message, = _require(body, "message")
+        try:
+            response = self.agent.chat_completion(message)
+        except BudgetExceededError as e:
+            raise ServiceError(429, f"Budget exceeded: {e}")
+
+        tool_results = []
+        for tool_call in response.tool_calls or []:
+            name = tool_call.function.name
+            args = json.loads(tool_call.function.arguments)
+            if name in INTERACTIVE_TOOLS:
+                result = _error(f"{name} needs an interactive session and is not available over HTTP")
+            else:
+                result = handle_tool_call(self.agent, name, args)
+            tool_results.append({"name": name, "arguments": args, "result": result})
+
+        return {
+            "status": "success",
+            "reply": response.content,
+            "tool_results": tool_results,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+
+    def _handler_class(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                self._handle("GET")
+
+            def do_POST(self):
+                self._handle("POST")
+
+            def do_PUT(self):
+                self._handle("PUT")
+
+            def do_DELETE(self):
+                self._handle("DELETE")
+
+            def _authorized(self, path: str) -> bool:
+                if not service.token or path == "/health":
+                    return True
+                supplied = self.headers.get("Authorization", "")
+                return hmac.compare_digest(supplied.encode(), f"Bearer {service.token}".encode())
+
+            def _read_body(self) -> dict:
+                length = int(self.headers.get("Content-Length") or 0)
+                if length > MAX_BODY_BYTES:
+                    raise ServiceError(413, f"Request body over {MAX_BODY_BYTES} bytes")
+                if not length:
+                    return {}
+                try:
+                    body = json.loads(self.rfile.read(length))
+                except ValueError:
+                    raise ServiceError(400, "Request body is not valid JSON")
+                if not isinstance(body, dict):
+                    raise ServiceError(400, "Request body must be a JSON object")
+                return body
+
+            def _handle(self, method: str):
+                url = urlparse(self.path)
+                path = url.path.rstrip("/") or "/"
+                with service._lock:
+                    service.requests += 1
+                    service.in_flight += 1
+                try:
+                    with span("request", method=method, path=path) as attributes:
+                        try:
+                            if not self._authorized(path):
+                                raise ServiceError(401, "Missing or wrong bearer token")
+                            status, result = service.dispatch(method, path, parse_qs(url.query), self._read_body())
+                        except ServiceError as e:
+                            # The body may be unread: do not reuse the connection
+                            self.close_connection = True
+                            status, result = e.status, _error(str(e))
+                        except (ValueError, TypeError) as e:
+                            status, result = 400, _error(str(e))
+                        except Exception as e:
+                            status, result = 500, _error(f"Internal error: {e}")
+                        attributes["status_code"] = status
+                    if status >= 400:
+                        with service._lock:
+                            service.errors += 1
+                    self._send(status, result)
+                finally:
+                    with service._lock:
+                        service.in_flight -= 1
+
+            def _send(self, status: int, result: dict):
+                payload = json.dumps(result, default=str).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the agent's tools and chat over HTTP")
+    parser.add_argument("--host", default=os.getenv('SERVICE_HOST', '127.0.0.1'))
+    parser.add_argument("--port", type=int, default=int(os.getenv('SERVICE_PORT', '8080')))
+    options = parser.parse_args()
+
+    token = os.getenv('SERVICE_TOKEN')
+    if options.host not in ("127.0.0.1", "localhost") and not token:
+        print("Warning: listening beyond localhost without SERVICE_TOKEN, anyone who can reach the port can move funds")
+
+    agent = CryptoAIAgent()
+    if tracing.configure():
+        print(f"Writing trace spans to {os.getenv('TRACE_FILE')}")
+    service = AgentService(agent, options.host, options.port, token)
+    print(f"Agent service listening on {service.url}")
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+        print(f"\nBudget: {json.dumps(agent.budget.stats(), indent=2)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import re
+from functools import lru_cache
+
+ADDRESS_BYTES = 20
+
+# Distinct addresses whose parsed and checksummed forms are kept
+CACHE_SIZE = 65536
+
+_HEX_ADDRESS = re.compile(r"^(?:0[xX])?[0-9a-fA-F]{40}$")
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _parse(address: str) -> bytes:
+    text = address.strip()
+    if not _HEX_ADDRESS.match(text):
+        raise ValueError(f"Invalid EVM address: {address!r}")
+    body = text[2:] if text[:2] in ("0x", "0X") else text
+    # Mixed case carries an EIP-55 checksum, which has to match
+    if body != body.lower() and body != body.upper() and _checksum(body.lower()) != "0x" + body:
+        raise ValueError(f"Invalid EIP-55 checksum: {address!r}")
+    return bytes.fromhex(body)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _checksum(lower_hex: str) -> str:
+    # The only keccak of the layer, computed once per distinct address
+    from eth_utils import keccak
+    digest = keccak(text=lower_hex).hex()
+    return "0x" + "".join(
+        char.upper() if int(digest[i], 16) >= 8 else char
+        for i, char in enumerate(lower_hex))
+
+
+def parse_address(address) -> bytes:
+    """
+    Canonical 20-byte form of an EVM address
+
+    Accepts hex strings with or without 0x in any case (mixed case must carry a
+    valid EIP-55 checksum) and raw 20-byte values.
+
+    Raises:
+        ValueError: If the address is malformed or its checksum is wrong
+    """
+    if isinstance(address, (bytes, bytearray, memoryview)):
+        if len(address) != ADDRESS_BYTES:
+            raise ValueError(f"Invalid EVM address: {len(address)} bytes")
+        return bytes(address)
+    if not isinstance(address, str):
+        raise ValueError(f"Invalid EVM address: {address!r}")
+    return _parse(address)
+
+
+def is_valid_address(address) -> bool:
+    try:
+        parse_address(address)
+        return True
+    except ValueError:
+        return False
+
+
+def normalize_address(address) -> str:
+    """Lowercase 0x-prefixed form, for comparing and keying addresses"""
+    return "0x" + parse_address(address).hex()
+
+
+def to_checksum_address(address) -> str:
+    """EIP-55 checksummed form, cached per address"""
+    return _checksum(parse_address(address).hex())
+
+
+def address_key(address) -> str:
+    """
+    Key under which a wallet is stored and compared
+
+    EVM addresses map to their normalized form, so differently cased or
+    checksummed spellings are one wallet. Anything else (Solana addresses are
+    case-sensitive base58) is only stripped of surrounding whitespace.
+    """
+    try:
+        return normalize_address(address)
+    except ValueError:
+        return (address or "").strip()
+
+
+def validate_addresses(addresses) -> dict:
+    """
+    Validate a list of addresses in one pass, e.g. a payout batch
+
+    Returns:
+        dict: "valid" (checksummed addresses in input order), "invalid"
+        ({"index", "address", "error"} entries) and "duplicates" (indexes of
+        addresses already seen earlier in the list under any spelling)
+    """
+    valid, invalid, duplicates = [], [], []
+    seen = set()
+    for index, address in enumerate(addresses):
+        try:
+            raw = parse_address(address)
+        except ValueError as e:
+            invalid.append({"index": index, "address": address, "error": str(e)})
+            continue
+        if raw in seen:
+            duplicates.append(index)
+        seen.add(raw)
+        valid.append(_checksum(raw.hex()))
+    return {
+        "status": "success" if not invalid else "error",
+        "valid": valid,
+        "invalid": invalid,
+        "duplicates": duplicates
+    }
+
+
+def cache_info() -> dict:
+    """Hit and miss counts of the parse and checksum caches"""
+    return {"parse": _parse.cache_info()._asdict(), "checksum": _checksum.cache_info()._asdict()}
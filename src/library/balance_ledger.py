@@ -0,0 +1,199 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from library.addresses import address_key
+from library.wallet_utils import get_wallet_balance
+
+USDC_BASE_UNITS = 10**6
+
+
+class BalanceLedger:
+    """
+    Local USDC balances derived from the movements we originate
+
+    Balances are integer base units (1000000 = 1 USDC). Faucet funding and
+    transfers are applied as deltas, so balance queries are answered locally.
+    reconcile() compares against get_wallet_balance and adopts the remote value;
+    it runs on a schedule (start()) and as soon as drift is suspected, e.g. a
+    transfer that would take a wallet below zero. Without a running reconciler,
+    checked_balance() reconciles a suspect wallet when it is read.
+
+    All wallets are on one chain: track only wallets of `chain`.
+    """
+
+    def __init__(self, api_key: str, chain: str = "base-sepolia", max_workers: int = 8, keep_reports: int = 20):
+        self.api_key = api_key
+        self.chain = chain
+        self.max_workers = max_workers
+        self._balances = {}
+        self._addresses = {}
+        self._suspect = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.reports = deque(maxlen=keep_reports)
+        self.reconciliations = 0
+
+    @staticmethod
+    def _key(address: str) -> str:
+        return address_key(address)
+
+    def track(self, address: str, balance: int = 0):
+        """Start tracking a wallet with a known balance (0 for a new wallet)"""
+        key = self._key(address)
+        with self._lock:
+            self._addresses[key] = address
+            self._balances.setdefault(key, balance)
+
+    def balance(self, address: str):
+        """Local balance in base units, or None if the wallet is not tracked"""
+        return self._balances.get(self._key(address))
+
+    @property
+    def running(self) -> bool:
+        """Whether the start() reconciler thread is running"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def checked_balance(self, address: str):
+        """
+        Local balance, reconciled first if it cannot be trusted
+
+        A wallet never seen before is fetched and tracked from then on. A
+        suspect wallet is reconciled here when no reconciler thread would do it.
+
+        Returns:
+            int: Balance in base units, or None if it could not be fetched
+        """
+        key = self._key(address)
+        with self._lock:
+            untracked = key not in self._balances
+            stale = untracked or (key in self._suspect and not self.running)
+            if untracked:
+                self._addresses[key] = address
+        if stale:
+            self.reconcile([address])
+        return self.balance(address)
+
+    def apply_delta(self, address: str, delta: int):
+        key = self._key(address)
+        with self._lock:
+            if key not in self._balances:
+                # Unknown starting balance: fetch it on the next reconciliation
+                self._addresses[key] = address
+                self._suspect.add(key)
+            else:
+                self._balances[key] += delta
+                if self._balances[key] < 0:
+                    self._suspect.add(key)
+            suspect = key in self._suspect
+        if suspect:
+            self._wake.set()
+
+    def apply_faucet(self, address: str, amount: int):
+        """Apply faucet funding; amount is whole USDC, as passed to get_usdc_from_faucet"""
+        self.apply_delta(address, amount * USDC_BASE_UNITS)
+
+    def apply_transfer(self, from_wallet_address: str, to_wallet_address: str, amount: int):
+        """Apply a transfer; amount is base units, as passed to transfer_usdc"""
+        self.apply_delta(from_wallet_address, -amount)
+        self.apply_delta(to_wallet_address, amount)
+
+    def reconcile(self, addresses=None) -> dict:
+        """
+        Compare local balances with get_wallet_balance and adopt the remote values
+
+        Args:
+            addresses (list): Wallets to check (default: every tracked wallet)
+
+        Returns:
+            dict: Report with the wallets checked, each drift found and any errors
+        """
+        with self._lock:
+            keys = [self._key(a) for a in addresses] if addresses else list(self._addresses)
+            self._suspect.difference_update(keys)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            results = list(pool.map(self._reconcile_one, keys))
+
+        drifts = [result for result in results if result.get("drift")]
+        errors = [result for result in results if "error" in result]
+        report = {
+            "status": "success" if not errors else "error",
+            "timestamp": datetime.utcnow().isoformat(),
+            "checked": len(keys),
+            "drifted": drifts,
+            "total_drift": sum(d["drift"] for d in drifts),
+            "errors": errors,
+            "elapsed_seconds": round(time.perf_counter() - started, 3)
+        }
+        self.reports.append(report)
+        self.reconciliations += 1
+        return report
+
+    def _reconcile_one(self, key: str) -> dict:
+        address = self._addresses.get(key, key)
+        before = self._balances.get(key)
+        response = get_wallet_balance(self.api_key, self.chain, address)
+        if response.get("status") != "success":
+            with self._lock:
+                self._suspect.add(key)
+            return {"address": address, "error": response.get("error")}
+
+        remote = response["balance_base_units"]
+        with self._lock:
+            current = self._balances.get(key)
+            # Keep deltas applied while the request was in flight
+            moved_meanwhile = (current or 0) - (before or 0)
+            self._balances[key] = remote + moved_meanwhile
+        drift = remote - before if before is not None else 0
+        return {"address": address, "local": before, "remote": remote, "drift": drift}
+
+    def start(self, interval: float = 300, on_report=None):
+        """Reconcile every `interval` seconds, or sooner when drift is suspected"""
+        def loop():
+            next_full = time.monotonic() + interval
+            while not self._stop.is_set():
+                self._wake.wait(max(0, next_full - time.monotonic()))
+                self._wake.clear()
+                if self._stop.is_set():
+                    return
+                if time.monotonic() >= next_full:
+                    report = self.reconcile()
+                    next_full = time.monotonic() + interval
+                else:
+                    with self._lock:
+                        suspects = [self._addresses[key] for key in self._suspect]
+                    report = self.reconcile(suspects) if suspects else None
+                if report and on_report:
+                    on_report(report)
+
+        self._thread = threading.Thread(target=loop, name="ledger-reconciler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def stats(self) -> dict:
+        last = self.reports[-1] if self.reports else None
+        return {
+            "tracked_wallets": len(self._balances),
+            "suspect_wallets": len(self._suspect),
+            "reconciliations": self.reconciliations,
+            "last_reconciled": last["timestamp"] if last else None,
+            "last_total_drift": last["total_drift"] if last else None
+        }
+
+
+def print_reconciliation(report: dict):
+    """Default on_report callback: print drift and errors, stay quiet otherwise"""
+    for drift in report["drifted"]:
+        print(f"\nLedger drift on {drift['address']}: local {drift['local']} vs remote "
+              f"{drift['remote']} base units ({drift['drift']:+d})")
+    for error in report["errors"]:
+        print(f"\nLedger reconciliation failed for {error['address']}: {error['error']}")
@@ -0,0 +1,335 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime
+
+import requests
+
+from library.wallet_utils import http_session
+
+RECORD = "record"
+REPLAY = "replay"
+
+CASSETTE_VERSION = 1
+
+# Headers never written to a cassette
+SECRET_HEADERS = {"x-api-key", "authorization", "cookie", "set-cookie", "openai-organization", "openai-project"}
+
+# Environment variables whose values are scrubbed from everything recorded
+SECRET_ENV = ("CROSSMINT_SERVER_API_KEY", "SIGNER_PRIVATE_KEY", "OPENAI_API_KEY",
+              "KEYSTORE_PASSWORD", "WEBHOOK_SECRET", "SERVICE_TOKEN")
+
+REDACTED = "<redacted>"
+
+# Headers that describe the wire encoding; recorded bodies are already decoded
+_WIRE_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+_ADDRESS = re.compile(r"0x[0-9a-fA-F]{40}")
+_ID_AFTER = re.compile(r"/(transactions|approvals|runs|threads|messages)/[^/?]+")
+
+
+def endpoint_name(method: str, url: str) -> str:
+    """Method and URL with addresses and ids replaced, to group similar requests"""
+    path = url.split("://", 1)[-1].split("?", 1)[0]
+    path = _ADDRESS.sub("{address}", path)
+    path = _ID_AFTER.sub(lambda match: f"/{match.group(1)}/{{id}}", path)
+    return f"{method} {path}"
+
+
+def _secret_values() -> list:
+    values = []
+    for name in SECRET_ENV:
+        value = os.getenv(name)
+        if value and len(value) >= 8:
+            values.append(value)
+            if value.startswith("0x"):
+                values.append(value[2:])
+    # Longest first, so a secret containing another is scrubbed whole
+    return sorted(values, key=len, reverse=True)
+
+
+def _body_text(body) -> str:
+    if body is None:
+        return None
+    if isinstance(body, bytes):
+        return body.decode("utf-8", errors="replace")
+    return str(body)
+
+
+class Cassette:
+    """
+    Recorded Crossmint and OpenAI traffic, for replaying without staging
+
+    In RECORD mode every request made through wallet_utils' http_session() and
+    through the OpenAI client built by openai_http_client() goes out as usual
+    and is appended to a JSON lines file: method, URL, body, status, headers,
+    body and timing. API keys, private keys and other secrets are scrubbed
+    before anything is written.
+
+    In REPLAY mode the same two entry points answer from the file instead of
+    the network. A request gets the next unused interaction with the same
+    method and URL (or, failing that, the same endpoint_name), after sleeping
+    its recorded duration divided by `speed`: speed 1 reproduces the recorded
+    latencies, 10 is ten times faster, 0 answers immediately. Requests with
+    nothing left to replay fail like a connection error.
+    """
+
+    def __init__(self, path: str, mode: str = RECORD, speed: float = 1.0):
+        """
+        Args:
+            path (str): Cassette file (JSON lines)
+            mode (str): RECORD or REPLAY
+            speed (float): Replay speed-up of the recorded latencies (0: no delay)
+        """
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.speed = speed
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._sequence = 0
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+        # Seconds spent sleeping out recorded latencies while replaying
+        self.replayed_seconds = 0.0
+
+        if mode == RECORD:
+            self._secrets = _secret_values()
+            self._file = open(path, "a")
+            self._write({"cassette": CASSETTE_VERSION, "recorded_at": datetime.utcnow().isoformat()})
+        else:
+            self.interactions = load_cassette(path)
+            self.rewind()
+
+    # Recording
+
+    def _write(self, record: dict):
+        line = json.dumps(record, default=str)
+        for secret in self._secrets:
+            line = line.replace(secret, REDACTED)
+        self._file.write(line + "\n")
+        self._file.flush()
+
+    @staticmethod
+    def _clean_headers(headers) -> dict:
+        return {
+            name: REDACTED if name.lower() in SECRET_HEADERS else value
+            for name, value in headers.items()
+            if name.lower() not in _WIRE_HEADERS
+        }
+
+    def record(self, source: str, method: str, url: str, request_headers, request_body,
+               status: int, response_headers, response_body, started: float, duration: float):
+        """Append one exchange; `started` is time.monotonic() when it was sent"""
+        with self._lock:
+            self._sequence += 1
+            self.recorded += 1
+            self._write({
+                "seq": self._sequence,
+                "source": source,
+                "method": method,
+                "url": url,
+                "request": {"headers": self._clean_headers(request_headers), "body": _body_text(request_body)},
+                "status": status,
+                "headers": self._clean_headers(response_headers),
+                "body": _body_text(response_body),
+                "offset": round(started - self._started, 6),
+                "duration": round(duration, 6)
+            })
+
+    # Replaying
+
+    def rewind(self):
+        """Make every recorded interaction available again"""
+        with self._lock:
+            self._by_url = defaultdict(deque)
+            self._by_endpoint = defaultdict(deque)
+            self._used = set()
+            for interaction in self.interactions:
+                self._by_url[(interaction["method"], interaction["url"])].append(interaction)
+                self._by_endpoint[endpoint_name(interaction["method"], interaction["url"])].append(interaction)
+
+    def _take(self, queue: deque):
+        while queue:
+            interaction = queue.popleft()
+            if interaction["seq"] not in self._used:
+                self._used.add(interaction["seq"])
+                return interaction
+        return None
+
+    def lookup(self, method: str, url: str):
+        """
+        Next recorded interaction for a request, after its scaled latency
+
+        Returns:
+            dict: The interaction, or None when the cassette has none left
+        """
+        with self._lock:
+            interaction = (self._take(self._by_url[(method, url)])
+                           or self._take(self._by_endpoint[endpoint_name(method, url)]))
+            if interaction is None:
+                self.misses += 1
+                return None
+            self.replayed += 1
+            if self.speed > 0:
+                self.replayed_seconds += interaction["duration"] / self.speed
+        if self.speed > 0:
+            time.sleep(interaction["duration"] / self.speed)
+        return interaction
+
+    # Client hooks
+
+    def install(self, session: requests.Session = None):
+        """Route a requests session (default: wallet_utils' shared one) through the cassette"""
+        adapter = RecordingAdapter(self) if self.mode == RECORD else ReplayAdapter(self)
+        session = session or http_session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return adapter
+
+    def openai_http_client(self):
+        """httpx client for OpenAI(http_client=...) that records or replays through the cassette"""
+        from openai import DefaultHttpxClient
+        return DefaultHttpxClient(transport=CassetteTransport(self))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "path": self.path,
+                "recorded": self.recorded,
+                "replayed": self.replayed,
+                "misses": self.misses,
+                "replayed_seconds": round(self.replayed_seconds, 3),
+                "remaining": len(self.interactions) - len(self._used) if self.mode == REPLAY else None
+            }
+
+    def close(self):
+        if self.mode == RECORD:
+            with self._lock:
+                self._file.close()
+
+
+def load_cassette(path: str) -> list:
+    """Interactions of a cassette file, in recorded order"""
+    interactions = []
+    with open(path) as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if "seq" in record:
+                interactions.append(record)
+    # Several recordings appended to one file restart their numbering
+    for index, interaction in enumerate(interactions):
+        interaction["seq"] = index
+    return interactions
+
+
+class RecordingAdapter(requests.adapters.HTTPAdapter):
+    """Sends requests as usual and records each exchange in a cassette"""
+
+    def __init__(self, cassette: Cassette):
+        super().__init__(pool_connections=4, pool_maxsize=int(os.getenv('HTTP_POOL_SIZE', '32')))
+        self.cassette = cassette
+
+    def send(self, request, **kwargs):
+        started = time.monotonic()
+        response = super().send(request, **kwargs)
+        content = response.content
+        self.cassette.record(
+            "requests", request.method, request.url, request.headers, request.body,
+            response.status_code, response.headers, content, started, time.monotonic() - started)
+        return response
+
+
+class ReplayAdapter(requests.adapters.BaseAdapter):
+    """Answers requests from a cassette, without any network access"""
+
+    def __init__(self, cassette: Cassette):
+        super().__init__()
+        self.cassette = cassette
+
+    def send(self, request, **kwargs):
+        interaction = self.cassette.lookup(request.method, request.url)
+        if interaction is None:
+            raise requests.exceptions.ConnectionError(
+                f"No recorded response for {request.method} {request.url}", request=request)
+
+        response = requests.models.Response()
+        response.status_code = interaction["status"]
+        response.headers = requests.structures.CaseInsensitiveDict(interaction["headers"])
+        response._content = (interaction["body"] or "").encode()
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        response.reason = "Replayed"
+        return response
+
+    def close(self):
+        pass
+
+
+class CassetteTransport:
+    """httpx transport that records through, or replays from, a cassette"""
+
+    def __init__(self, cassette: Cassette):
+        self.cassette = cassette
+        self._inner = None
+        if cassette.mode == RECORD:
+            import httpx
+            self._inner = httpx.HTTPTransport()
+
+    def handle_request(self, request):
+        import httpx
+
+        if self.cassette.mode == REPLAY:
+            interaction = self.cassette.lookup(request.method, str(request.url))
+            if interaction is None:
+                raise httpx.ConnectError(f"No recorded response for {request.method} {request.url}", request=request)
+            return httpx.Response(interaction["status"], headers=interaction["headers"],
+                                  content=(interaction["body"] or "").encode(), request=request)
+
+        started = time.monotonic()
+        request_body = request.read()
+        response = self._inner.handle_request(request)
+        content = response.read()
+        response.close()
+        headers = {name: value for name, value in response.headers.items() if name.lower() not in _WIRE_HEADERS}
+        self.cassette.record(
+            "httpx", request.method, str(request.url), request.headers, request_body,
+            response.status_code, headers, content, started, time.monotonic() - started)
+        return httpx.Response(response.status_code, headers=headers, content=content, request=request)
+
+    def close(self):
+        if self._inner:
+            self._inner.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def from_env():
+    """
+    Cassette from CASSETTE_REPLAY (with CASSETTE_SPEED) or CASSETTE_RECORD,
+    installed on wallet_utils' session; None when neither is set
+    """
+    replay = os.getenv('CASSETTE_REPLAY')
+    record = os.getenv('CASSETTE_RECORD')
+    if replay:
+        cassette = Cassette(replay, REPLAY, speed=float(os.getenv('CASSETTE_SPEED', '1')))
+    elif record:
+        cassette = Cassette(record, RECORD)
+    else:
+        return None
+    cassette.install()
+    return cassette
@@ -0,0 +1,84 @@
+import re
+
+EVM_ADDRESS = r"0x[0-9a-fA-F]{40}"
+SOLANA_ADDRESS = r"[1-9A-HJ-NP-Za-km-z]{32,44}"
+ANY_ADDRESS = f"(?:{EVM_ADDRESS}|{SOLANA_ADDRESS})"
+
+WALLET_TYPES = {
+    "evm": "evm-smart-wallet",
+    "solana": "solana-custodial-wallet"
+}
+
+
+def _create_wallet(match):
+    return "create_new_wallet", {"wallet_type": WALLET_TYPES[match["chain"].lower()]}
+
+
+def _balance(match):
+    return "get_wallet_balance", {"wallet_address": match["address"]}
+
+
+def _faucet(match):
+    if int(match["amount"]) <= 0:
+        return None
+    return "get_usdc_from_faucet", {"wallet_address": match["address"], "amount": int(match["amount"])}
+
+
+def _transfer(match):
+    if int(match["amount"]) <= 0:
+        return None
+    return "transfer_usdc", {
+        "from_wallet_address": match["source"],
+        "to_wallet_address": match["destination"],
+        "amount": int(match["amount"])
+    }
+
+
+def _list_wallets(match):
+    return "find_wallets", {"query": match.groupdict().get("query") or ""}
+
+
+# (pattern, builder) pairs, matched against the whole input. Amounts are whole
+# USDC, like the tool schema; anything fancier goes to the LLM. A builder
+# returns None to reject a match (a zero amount), which also goes to the LLM.
+COMMANDS = [
+    (r"(?:create|make)\s+(?:an?\s+)?(?:new\s+)?(?P<chain>evm|solana)(?:\s+(?:smart|custodial))?\s+wallet",
+     _create_wallet),
+    (rf"(?:check\s+|get\s+|show\s+)?(?:the\s+)?(?:wallet\s+)?balance\s+(?:of|for)\s+(?:wallet\s+)?(?P<address>{ANY_ADDRESS})",
+     _balance),
+    (rf"(?P<address>{ANY_ADDRESS})\s+balance",
+     _balance),
+    (rf"(?:fund|faucet)\s+(?:wallet\s+)?(?P<address>{EVM_ADDRESS})\s+(?:with\s+)?(?P<amount>\d+)\s*usdc",
+     _faucet),
+    (rf"(?:get|request|fund)\s+(?P<amount>\d+)\s*usdc\s+(?:from\s+(?:the\s+)?faucet\s+)?(?:to|for|into)\s+(?:wallet\s+)?(?P<address>{EVM_ADDRESS})",
+     _faucet),
+    (rf"(?:transfer|send)\s+(?P<amount>\d+)\s*usdc\s+from\s+(?P<source>{EVM_ADDRESS})\s+to\s+(?P<destination>{EVM_ADDRESS})",
+     _transfer),
+    (r"(?:list|show)\s+(?:all\s+|my\s+)*wallets",
+     _list_wallets),
+    (r"find\s+wallets?\s+(?P<query>\S+)",
+     _list_wallets),
+]
+
+_COMPILED = [(re.compile(rf"^\s*(?:please\s+)?{pattern}\s*[.!]?\s*$", re.IGNORECASE), builder)
+             for pattern, builder in COMMANDS]
+
+
+def route_command(user_input: str):
+    """
+    Recognize structured commands that map directly to a tool
+
+    Args:
+        user_input (str): The raw user input
+
+    Returns:
+        tuple: (tool_name, args) using the same names and arguments as tools_schema,
+        or None if the input is free-form text that needs the LLM
+    """
+    for pattern, builder in _COMPILED:
+        match = pattern.match(user_input or "")
+        if match:
+            routed = builder(match)
+            if routed:
+                return routed
+    return None
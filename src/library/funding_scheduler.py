@@ -0,0 +1,293 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from library.addresses import address_key
+from library.balance_ledger import USDC_BASE_UNITS, BalanceLedger
+from library.tracing import traced_sleep
+from library.wallet_utils import get_usdc_from_faucet, transfer_usdc_batch
+
+
+class AimdRateLimiter:
+    """
+    Paces calls to an endpoint whose rate limit is unknown (the faucet)
+
+    Calls are spaced 1/rate seconds apart. Every success raises the rate by
+    `increase` calls per second; a 429 cuts it by the factor `decrease` and
+    holds all calls for Retry-After. This is additive increase, multiplicative
+    decrease, as in TCP congestion control: the rate settles just under the
+    limit the server enforces. Calls already in flight when the limit is hit
+    all come back throttled, so the rate is cut at most once per interval.
+    """
+
+    def __init__(self, rate: float = 2.0, min_rate: float = 0.1, max_rate: float = 20.0,
+                 increase: float = 0.2, decrease: float = 0.5):
+        """
+        Args:
+            rate (float): Starting calls per second
+            min_rate (float): Lowest rate a run of 429s can push it to
+            max_rate (float): Highest rate successes can push it to
+            increase (float): Calls per second added per success
+            decrease (float): Factor applied to the rate on a 429
+        """
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self._next = 0.0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+        self.successes = 0
+        self.throttled = 0
+        self.waited_seconds = 0.0
+
+    def acquire(self):
+        """Block until this caller's slot comes up"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + 1 / self.rate
+            wait = slot - now
+            self.waited_seconds += wait
+        if wait > 0:
+            traced_sleep(wait)
+
+    def on_success(self):
+        with self._lock:
+            self.successes += 1
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttled(self, retry_after: float = None):
+        with self._lock:
+            self.throttled += 1
+            now = time.monotonic()
+            if now - self._last_decrease >= 1 / self.rate:
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+                self._last_decrease = now
+            self._next = max(self._next, now + (retry_after or 1 / self.rate))
+
+    def stats(self) -> dict:
+        return {
+            "rate": round(self.rate, 3),
+            "successes": self.successes,
+            "throttled": self.throttled,
+            "waited_seconds": round(self.waited_seconds, 2)
+        }
+
+
+def _faucet_units(base_units: int) -> int:
+    """Whole USDC to request from the faucet to cover an amount in base units"""
+    return -(-base_units // USDC_BASE_UNITS)
+
+
+class FundingScheduler:
+    """
+    Brings many wallets up to a target balance in few faucet calls
+
+    Current balances are fetched in parallel (through a BalanceLedger) and
+    only the shortfall is requested. With a hub wallet the total shortfall is
+    requested from the faucet into the hub, in as few calls as faucet_max
+    allows, and fanned out with transfer_usdc_batch: one transaction per
+    batch_size wallets. Without a hub every wallet is funded from the faucet
+    directly. Faucet calls are paced by an AimdRateLimiter and retried when
+    rate limited.
+    """
+
+    def __init__(self, api_key: str, chain: str = "base-sepolia", hub_address: str = None,
+                 private_key: str = None, signer_pool=None, ledger: BalanceLedger = None,
+                 limiter: AimdRateLimiter = None, faucet_max: int = None, batch_size: int = 50,
+                 max_workers: int = 8, max_attempts: int = 6, settle_timeout: float = 120):
+        """
+        Args:
+            api_key (str): Crossmint API key
+            chain (str): Blockchain network (default: "base-sepolia")
+            hub_address (str): Wallet funded from the faucet and fanned out from
+                (default: none, fund every wallet from the faucet)
+            private_key (str): Admin signer key of the hub
+            signer_pool (SignerPool): Signers of the hub, instead of private_key
+            ledger (BalanceLedger): Shared balance ledger (default: a new one)
+            limiter (AimdRateLimiter): Faucet pacing (default: a new one)
+            faucet_max (int): Most whole USDC one faucet call may request
+                (default: no limit)
+            batch_size (int): Transfers per fan-out transaction
+            max_workers (int): Concurrent faucet calls when funding directly
+            max_attempts (int): Tries per faucet call when rate limited
+            settle_timeout (float): Seconds to wait for faucet funds to reach the hub
+        """
+        self.api_key = api_key
+        self.chain = chain
+        self.hub_address = hub_address
+        self.private_key = private_key
+        self.signer_pool = signer_pool
+        self.ledger = ledger or BalanceLedger(api_key, chain)
+        self.limiter = limiter or AimdRateLimiter()
+        self.faucet_max = faucet_max
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.max_attempts = max_attempts
+        self.settle_timeout = settle_timeout
+        self._lock = threading.Lock()
+        self.faucet_calls = 0
+        self.transactions = 0
+
+    @classmethod
+    def from_env(cls, api_key: str, **kwargs):
+        """Hub from FUNDING_HUB_WALLET, faucet_max from FAUCET_MAX_AMOUNT, starting rate from FAUCET_RATE"""
+        kwargs.setdefault("hub_address", os.getenv('FUNDING_HUB_WALLET'))
+        if os.getenv('FAUCET_MAX_AMOUNT'):
+            kwargs.setdefault("faucet_max", int(os.getenv('FAUCET_MAX_AMOUNT')))
+        if os.getenv('FAUCET_RATE'):
+            kwargs.setdefault("limiter", AimdRateLimiter(rate=float(os.getenv('FAUCET_RATE'))))
+        return cls(api_key, **kwargs)
+
+    def shortfalls(self, targets: dict) -> tuple:
+        """
+        Fetch the current balance of every wallet and compute what it lacks
+
+        Args:
+            targets (dict): Wallet address -> target balance in base units
+
+        Returns:
+            tuple: ({address: shortfall in base units} for wallets below their
+            target, [errors] for wallets whose balance could not be fetched)
+        """
+        for address in targets:
+            self.ledger.track(address)
+        report = self.ledger.reconcile(list(targets))
+        failed = {address_key(error["address"]) for error in report["errors"]}
+
+        shortfalls = {}
+        for address, target in targets.items():
+            if address_key(address) in failed:
+                continue
+            missing = target - (self.ledger.balance(address) or 0)
+            if missing > 0:
+                shortfalls[address] = missing
+        return shortfalls, report["errors"]
+
+    def _faucet(self, address: str, amount: int) -> dict:
+        """One paced faucet call for `amount` whole USDC, retried while rate limited"""
+        for _ in range(self.max_attempts):
+            self.limiter.acquire()
+            with self._lock:
+                self.faucet_calls += 1
+            response = get_usdc_from_faucet(self.api_key, self.chain, address, amount)
+            if response.get("status") == "success":
+                self.limiter.on_success()
+                self.ledger.apply_faucet(address, amount)
+                return response
+            if not response.get("rate_limited"):
+                return response
+            self.limiter.on_throttled(response.get("retry_after"))
+        return response
+
+    def _fund_from_faucet(self, address: str, amount: int) -> list:
+        """Faucet calls covering `amount` base units, split at faucet_max; returns the errors"""
+        units = _faucet_units(amount)
+        chunk = self.faucet_max or units
+        errors = []
+        while units > 0:
+            request = min(chunk, units)
+            response = self._faucet(address, request)
+            if response.get("status") != "success":
+                errors.append({"address": address, "error": response.get("error")})
+                break
+            units -= request
+        return errors
+
+    def _wait_for_hub(self, amount: int) -> bool:
+        """Poll the hub's balance until faucet funds covering `amount` have landed"""
+        deadline = time.monotonic() + self.settle_timeout
+        while True:
+            report = self.ledger.reconcile([self.hub_address])
+            # A failed fetch leaves the optimistic faucet credit in place: only trust fetched balances
+            if not report["errors"] and (self.ledger.balance(self.hub_address) or 0) >= amount:
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            traced_sleep(2)
+
+    def _fund_through_hub(self, shortfalls: dict) -> tuple:
+        total = sum(shortfalls.values())
+        self.ledger.track(self.hub_address)
+        self.ledger.reconcile([self.hub_address])
+        missing = total - (self.ledger.balance(self.hub_address) or 0)
+        if missing > 0:
+            errors = self._fund_from_faucet(self.hub_address, missing)
+            if errors:
+                return {}, errors
+            if not self._wait_for_hub(total):
+                return {}, [{"address": self.hub_address, "error": "Faucet funds did not reach the hub in time"}]
+
+        funded, errors = {}, []
+        items = list(shortfalls.items())
+        # Batches leave the one hub wallet, so they are sent in order
+        for start in range(0, len(items), self.batch_size):
+            batch = items[start:start + self.batch_size]
+            response = transfer_usdc_batch(
+                self.api_key, self.hub_address, batch, self.chain,
+                self.private_key, signer_pool=self.signer_pool)
+            with self._lock:
+                self.transactions += 1
+            if response.get("status") != "success":
+                errors.extend({"address": address, "error": response.get("error")} for address, _ in batch)
+                continue
+            for address, amount in batch:
+                self.ledger.apply_transfer(self.hub_address, address, amount)
+                funded[address] = amount
+        return funded, errors
+
+    def _fund_directly(self, shortfalls: dict) -> tuple:
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            results = list(pool.map(lambda item: self._fund_from_faucet(*item), shortfalls.items()))
+
+        funded, errors = {}, []
+        for (address, amount), wallet_errors in zip(shortfalls.items(), results):
+            if wallet_errors:
+                errors.extend(wallet_errors)
+            else:
+                funded[address] = _faucet_units(amount) * USDC_BASE_UNITS
+        return funded, errors
+
+    def fund(self, targets: dict) -> dict:
+        """
+        Bring every wallet up to its target balance
+
+        Args:
+            targets (dict): Wallet address -> target balance in base units
+
+        Returns:
+            dict: Report with the amount "funded" per wallet (base units), the
+            wallets "already_funded", the faucet calls and transactions used,
+            the limiter's final state and any errors
+        """
+        started = time.perf_counter()
+        calls_before, transactions_before = self.faucet_calls, self.transactions
+
+        shortfalls, balance_errors = self.shortfalls(targets)
+        # A hub only saves calls when it fans out to more than one wallet
+        if self.hub_address and len(shortfalls) > 1:
+            funded, funding_errors = self._fund_through_hub(shortfalls)
+        else:
+            funded, funding_errors = self._fund_directly(shortfalls)
+        errors = balance_errors + funding_errors
+
+        return {
+            "status": "success" if not errors else "error",
+            "funded": funded,
+            "total_funded": sum(funded.values()),
+            "already_funded": len(targets) - len(shortfalls) - len(balance_errors),
+            "faucet_calls": self.faucet_calls - calls_before,
+            "transactions": self.transactions - transactions_before,
+            "limiter": self.limiter.stats(),
+            "errors": errors,
+            "elapsed_seconds": round(time.perf_counter() - started, 3),
+            "timestamp": datetime.utcnow().isoformat()
+        }
+
+    def fund_all(self, addresses, target: int) -> dict:
+        """fund() with the same target balance (base units) for every wallet"""
+        return self.fund({address: target for address in addresses})
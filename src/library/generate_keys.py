@@ -1,7 +1,14 @@
-from web3 import Web3
+import argparse
+import getpass
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 
 def generate_keys():
+    from web3 import Web3
+
     # Initialize Web3
     w3 = Web3()
 
@@ -13,5 +20,114 @@ def generate_keys():
     print("Be sure to copy and paste these values into your .env file")
 
 
+def _generate_batch(count: int, password: str, kdf: str, iterations: int = None):
+    """Worker: create `count` accounts and return (address, keystore json) pairs"""
+    from eth_account import Account
+
+    batch = []
+    for _ in range(count):
+        account = Account.create()
+        keystore = Account.encrypt(account.key, password, kdf=kdf, iterations=iterations)
+        batch.append((account.address, json.dumps(keystore)))
+    return batch
+
+
+def index_path_for(keystore_path: str) -> str:
+    return f"{keystore_path}.index.json"
+
+
+def generate_keys_bulk(count: int, output_path: str, password: str, workers: int = None,
+                       kdf: str = "pbkdf2", iterations: int = None, batch_size: int = 50):
+    """
+    Generate many signer keypairs in parallel and write them to an encrypted keystore
+
+    The keystore is a file with one standard V3 keystore JSON per line. Next to it,
+    `<output_path>.index.json` maps each address to the byte offset and length of
+    its line, so a single key can be loaded without scanning the file.
+
+    Args:
+        count (int): Number of keypairs to generate
+        output_path (str): Keystore file to write
+        password (str): Password used to encrypt every key
+        workers (int): Worker processes (default: number of CPU cores)
+        kdf (str): Key derivation function, "pbkdf2" or "scrypt"
+        iterations (int): KDF work factor (default: the eth_account default)
+        batch_size (int): Keys generated per worker task
+
+    Returns:
+        dict: Status, file paths, key count and keys per second
+    """
+    if count < 1:
+        raise ValueError("Count must be at least 1")
+    if not password:
+        raise ValueError("A keystore password is required")
+
+    workers = workers or os.cpu_count() or 1
+    batches = [batch_size] * (count // batch_size)
+    if count % batch_size:
+        batches.append(count % batch_size)
+
+    index = {}
+    start = time.perf_counter()
+    with open(output_path, "wb") as keystore_file, ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_generate_batch, size, password, kdf, iterations) for size in batches]
+        for future in as_completed(futures):
+            for address, keystore_json in future.result():
+                line = (keystore_json + "\n").encode()
+                index[address] = [keystore_file.tell(), len(line)]
+                keystore_file.write(line)
+        keystore_file.flush()
+        os.fsync(keystore_file.fileno())
+    elapsed = time.perf_counter() - start
+
+    with open(index_path_for(output_path), "w") as index_file:
+        json.dump({"count": len(index), "kdf": kdf, "keys": index}, index_file)
+
+    return {
+        "status": "success",
+        "keystore": output_path,
+        "index": index_path_for(output_path),
+        "count": len(index),
+        "workers": workers,
+        "elapsed_seconds": round(elapsed, 3),
+        "keys_per_second": round(len(index) / elapsed, 1) if elapsed else None
+    }
+
+
+def read_keystore_index(keystore_path: str) -> dict:
+    """Return the address -> [offset, length] index of a bulk keystore"""
+    with open(index_path_for(keystore_path)) as index_file:
+        return json.load(index_file)["keys"]
+
+
+def read_keystore_entry(keystore_path: str, address: str, index: dict = None) -> dict:
+    """Read the encrypted keystore JSON for one address without scanning the file"""
+    index = index if index is not None else read_keystore_index(keystore_path)
+    entry = index.get(address) or next(
+        (value for key, value in index.items() if key.lower() == address.lower()), None)
+    if entry is None:
+        raise ValueError(f"Address {address} not found in keystore")
+
+    offset, length = entry
+    with open(keystore_path, "rb") as keystore_file:
+        keystore_file.seek(offset)
+        return json.loads(keystore_file.read(length))
+
+
 if __name__ == "__main__":
-    generate_keys()
+    parser = argparse.ArgumentParser(description="Generate signer keypairs")
+    parser.add_argument("--count", type=int, help="Generate this many keys into an encrypted keystore")
+    parser.add_argument("--output", default="signers.keystore", help="Keystore file for bulk mode")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--kdf", choices=["pbkdf2", "scrypt"], default="pbkdf2")
+    parser.add_argument("--iterations", type=int, help="KDF work factor")
+    args = parser.parse_args()
+
+    if not args.count:
+        generate_keys()
+    else:
+        password = os.getenv("KEYSTORE_PASSWORD") or getpass.getpass("Keystore password: ")
+        result = generate_keys_bulk(
+            args.count, args.output, password, args.workers, args.kdf, args.iterations)
+        print(json.dumps(result, indent=2))
+        print("Set SIGNER_KEYSTORE and KEYSTORE_PASSWORD in your .env file to use these signers")
@@ -0,0 +1,109 @@
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+from library.addresses import address_key
+
+
+def wallet_key(wallet_address: str) -> str:
+    """Executor key for a wallet, so differently cased addresses share one queue"""
+    return address_key(wallet_address)
+
+
+class KeyedExecutor:
+    """
+    Thread pool that runs tasks in FIFO order per key and in parallel across keys
+
+    Use the wallet address as the key for wallet_utils operations: transactions
+    from one smart wallet are submitted in order, different wallets never wait on
+    each other. At most one task per key runs at a time, and keys with queued work
+    take turns one task at a time, so a busy wallet cannot starve the others.
+    """
+
+    def __init__(self, max_workers: int = 8):
+        self._condition = threading.Condition()
+        self._pending = {}
+        self._ready = deque()
+        self._running = set()
+        self._shutdown = False
+        self.completed = 0
+        self.max_queue_depth = 0
+
+        self._threads = []
+        for i in range(max_workers):
+            thread = threading.Thread(target=self._worker, name=f"keyed-executor-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, key: str, fn, *args, **kwargs) -> Future:
+        """Queue fn(*args, **kwargs) behind earlier tasks with the same key"""
+        key = wallet_key(key)
+        future = Future()
+
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("Executor is shut down")
+
+            tasks = self._pending.setdefault(key, deque())
+            tasks.append((future, fn, args, kwargs))
+            self.max_queue_depth = max(self.max_queue_depth, len(tasks))
+
+            # A key with a running task is re-queued when that task finishes
+            if len(tasks) == 1 and key not in self._running:
+                self._ready.append(key)
+                self._condition.notify()
+
+        return future
+
+    def map(self, key_fn, fn, items) -> list:
+        """Run fn(item) for every item, keyed by key_fn(item); returns futures in order"""
+        return [self.submit(key_fn(item), fn, item) for item in items]
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                "queued": sum(len(tasks) for tasks in self._pending.values()),
+                "active_keys": len(self._running),
+                "waiting_keys": len(self._ready),
+                "completed": self.completed,
+                "max_queue_depth": self.max_queue_depth
+            }
+
+    def shutdown(self, wait: bool = True):
+        """Finish the queued tasks, then stop the workers"""
+        with self._condition:
+            self._shutdown = True
+            self._condition.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _worker(self):
+        while True:
+            with self._condition:
+                while not self._ready and not (self._shutdown and not self._pending):
+                    self._condition.wait()
+                if not self._ready:
+                    return
+
+                key = self._ready.popleft()
+                future, fn, args, kwargs = self._pending[key].popleft()
+                self._running.add(key)
+
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn(*args, **kwargs))
+                except BaseException as e:
+                    future.set_exception(e)
+
+            with self._condition:
+                self._running.discard(key)
+                self.completed += 1
+                if self._pending[key]:
+                    # Back of the line: every other waiting key gets a turn first
+                    self._ready.append(key)
+                    self._condition.notify()
+                else:
+                    del self._pending[key]
+                    if self._shutdown and not self._pending:
+                        self._condition.notify_all()
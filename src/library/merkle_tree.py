@@ -0,0 +1,210 @@
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+
+HASH_SIZE = 32
+
+# Domain separation, so a leaf can never be passed off as an interior node
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+
+FILE_MAGIC = b"MRKL"
+FILE_VERSION = 1
+_HEADER = struct.Struct("<4sHQ")
+
+# Levels smaller than this are hashed in-process, process startup costs more
+PARALLEL_THRESHOLD = 1 << 16
+
+
+def _keccak():
+    # eth_utils pulls in the hashing backend, so it is only imported when hashing
+    from eth_utils import keccak
+    return keccak
+
+
+def leaf_hash(data: bytes) -> bytes:
+    """Hash of a leaf: keccak(0x00 || data)"""
+    return _keccak()(LEAF_PREFIX + bytes(data))
+
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    """Hash of an interior node: keccak(0x01 || left || right)"""
+    return _keccak()(NODE_PREFIX + left + right)
+
+
+def _hash_records(records: bytes, record_size: int) -> bytes:
+    """Worker: leaf hashes of fixed-width records, concatenated"""
+    keccak = _keccak()
+    view = memoryview(records)
+    return b"".join(
+        keccak(LEAF_PREFIX + view[i:i + record_size].tobytes())
+        for i in range(0, len(view), record_size))
+
+
+def _hash_pairs(level: bytes) -> bytes:
+    """Worker: parent level of a level, promoting a lone last node"""
+    keccak = _keccak()
+    view = memoryview(level)
+    pair = 2 * HASH_SIZE
+    end = len(view) - len(view) % pair
+    parents = b"".join(keccak(NODE_PREFIX + view[i:i + pair].tobytes()) for i in range(0, end, pair))
+    return parents + view[end:].tobytes()
+
+
+def _chunks(buffer: bytes, unit: int, parts: int):
+    """Split a buffer into about `parts` chunks whose sizes are multiples of unit"""
+    count = len(buffer) // unit
+    step = max(1, -(-count // parts)) * unit
+    return [buffer[i:i + step] for i in range(0, len(buffer), step)]
+
+
+class MerkleTree:
+    """
+    Append-only keccak Merkle tree over ticket records
+
+    Every level is a bytearray of 32-byte hashes, so 10M leaves take about
+    640 MB with no per-node Python objects. A lone last node at a level is
+    promoted to the next level unchanged, which makes append() touch exactly one
+    node per level: O(log n) appends and proofs. Leaves are keccak(0x00 || data)
+    and interior nodes keccak(0x01 || left || right).
+    """
+
+    def __init__(self):
+        self.levels = [bytearray()]
+
+    def __len__(self):
+        return len(self.levels[0]) // HASH_SIZE
+
+    @staticmethod
+    def _node(level: bytearray, index: int) -> bytes:
+        return bytes(level[index * HASH_SIZE:(index + 1) * HASH_SIZE])
+
+    @property
+    def root(self):
+        """Root hash, or None for an empty tree"""
+        if not len(self):
+            return None
+        return self._node(self.levels[-1], 0)
+
+    def append(self, data: bytes) -> int:
+        """Add a leaf and update the path to the root; returns the leaf index"""
+        index = len(self)
+        self.levels[0] += leaf_hash(data)
+
+        level, position = 0, index
+        while len(self.levels[level]) > HASH_SIZE:
+            nodes = self.levels[level]
+            if position % 2:
+                parent = node_hash(self._node(nodes, position - 1), self._node(nodes, position))
+            else:
+                parent = self._node(nodes, position)
+
+            if level + 1 == len(self.levels):
+                self.levels.append(bytearray())
+            parents = self.levels[level + 1]
+            parent_position = position // 2
+            offset = parent_position * HASH_SIZE
+            if offset == len(parents):
+                parents += parent
+            else:
+                parents[offset:offset + HASH_SIZE] = parent
+            level, position = level + 1, parent_position
+        return index
+
+    def proof(self, index: int) -> list:
+        """
+        Inclusion proof for a leaf
+
+        Returns:
+            list: (side, sibling hash hex) pairs from the leaf up, side being
+            "left" or "right" of the running hash; promoted levels are skipped
+        """
+        if not 0 <= index < len(self):
+            raise IndexError(f"Leaf index {index} out of range")
+
+        path = []
+        for nodes in self.levels[:-1]:
+            sibling = index ^ 1
+            if sibling * HASH_SIZE < len(nodes):
+                side = "left" if index % 2 else "right"
+                path.append((side, "0x" + self._node(nodes, sibling).hex()))
+            index //= 2
+        return path
+
+    @staticmethod
+    def verify(data: bytes, proof: list, root) -> bool:
+        """Check a leaf's inclusion proof against a root (bytes or hex)"""
+        if isinstance(root, str):
+            root = bytes.fromhex(root.removeprefix("0x"))
+        running = leaf_hash(data)
+        for side, sibling in proof:
+            sibling = bytes.fromhex(sibling.removeprefix("0x"))
+            running = node_hash(sibling, running) if side == "left" else node_hash(running, sibling)
+        return running == root
+
+    @classmethod
+    def build(cls, records: bytes, record_size: int, workers: int = None):
+        """
+        Build a tree in bulk from fixed-width records, such as a ticket snapshot
+
+        Leaves and large levels are hashed in batches on a process pool; the
+        result is identical to appending the records one by one.
+
+        Args:
+            records (bytes): Concatenated records, len(records) % record_size == 0
+            record_size (int): Bytes per record
+            workers (int): Hashing processes (default: CPU count, 1 hashes in-process)
+        """
+        if len(records) % record_size:
+            raise ValueError("Records buffer is not a multiple of record_size")
+        workers = workers or os.cpu_count() or 1
+        tree = cls()
+        count = len(records) // record_size
+
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 and count >= PARALLEL_THRESHOLD else None
+        try:
+            if pool:
+                chunks = _chunks(records, record_size, workers * 4)
+                tree.levels[0] = bytearray(b"".join(pool.map(_hash_records, chunks, [record_size] * len(chunks))))
+            else:
+                tree.levels[0] = bytearray(_hash_records(records, record_size))
+
+            while len(tree.levels[-1]) > HASH_SIZE:
+                level = tree.levels[-1]
+                if pool and len(level) // HASH_SIZE >= PARALLEL_THRESHOLD:
+                    chunks = _chunks(bytes(level), 2 * HASH_SIZE, workers * 4)
+                    tree.levels.append(bytearray(b"".join(pool.map(_hash_pairs, chunks))))
+                else:
+                    tree.levels.append(bytearray(_hash_pairs(level)))
+        finally:
+            if pool:
+                pool.shutdown()
+        return tree
+
+    def save(self, path: str):
+        """Write the tree as a header followed by every level's raw hashes"""
+        with open(path, "wb") as file:
+            file.write(_HEADER.pack(FILE_MAGIC, FILE_VERSION, len(self)))
+            for nodes in self.levels:
+                file.write(nodes)
+
+    @classmethod
+    def load(cls, path: str):
+        """Read a tree written by save()"""
+        tree = cls()
+        with open(path, "rb") as file:
+            magic, version, count = _HEADER.unpack(file.read(_HEADER.size))
+            if magic != FILE_MAGIC or version != FILE_VERSION:
+                raise ValueError(f"{path} is not a Merkle tree file")
+
+            tree.levels = []
+            size = count
+            while True:
+                nodes = bytearray(file.read(size * HASH_SIZE))
+                if len(nodes) != size * HASH_SIZE:
+                    raise ValueError(f"{path} is truncated")
+                tree.levels.append(nodes)
+                if size <= 1:
+                    break
+                size = (size + 1) // 2
+        return tree
@@ -0,0 +1,113 @@
+import cProfile
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+import warnings
+from contextlib import contextmanager
+
+# From Python 3.12 cProfile hooks sys.monitoring, which allows one profiler per
+# process: enabling a second one, from any thread, raises ValueError
+_ONE_PER_PROCESS = sys.version_info >= (3, 12)
+_process_lock = threading.Lock()
+
+
+class Profiler:
+    """
+    cProfile per labelled section (a tool invocation, a flow step)
+
+    Each section is dumped to `<directory>/<seq>-<label>.prof`, readable with
+    pstats or snakeviz. print_hotspots() merges all of them. Built with no
+    directory, profile() does nothing, so callers need no branches.
+
+    cProfile only sees the thread that enters the section: work handed to
+    thread or process pools (SignerPool.sign_many, the pipeline) shows up as
+    time spent waiting on them. Profile with max_workers=1 to see inside.
+
+    Sections nested in a profiled one fold into it. On Python 3.12+ only one
+    section in the whole process is profiled at a time: a section entered
+    while another thread's (or another tool's) profiler runs is skipped and
+    counted in `skipped`, with a warning the first time.
+    """
+
+    def __init__(self, directory: str = None):
+        self.directory = directory
+        self.files = []
+        self._active = threading.local()
+        self._lock = threading.Lock()
+        self.skipped = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+
+    @contextmanager
+    def profile(self, label: str):
+        # Only one cProfile can run per thread: nested sections fold into the outer one
+        if not self.enabled or getattr(self._active, "running", False):
+            yield
+            return
+
+        if _ONE_PER_PROCESS and not _process_lock.acquire(blocking=False):
+            with self._skip(label, "another thread is being profiled"):
+                yield
+            return
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e:
+            # Another profiling tool (not a Profiler) is already active
+            if _ONE_PER_PROCESS:
+                _process_lock.release()
+            with self._skip(label, str(e)):
+                yield
+            return
+
+        self._active.running = True
+        try:
+            yield
+        finally:
+            profiler.disable()
+            self._active.running = False
+            if _ONE_PER_PROCESS:
+                _process_lock.release()
+            with self._lock:
+                safe_label = re.sub(r"[^A-Za-z0-9_.-]+", "_", label)
+                path = os.path.join(self.directory, f"{len(self.files) + 1:04d}-{safe_label}.prof")
+                self.files.append(path)
+            profiler.dump_stats(path)
+
+    @contextmanager
+    def _skip(self, label: str, reason: str):
+        """Run a section unprofiled; its nested sections are not counted again"""
+        with self._lock:
+            self.skipped += 1
+            first = self.skipped == 1
+        if first:
+            warnings.warn(f"Not profiling section {label!r}: {reason}; later skips are only counted in Profiler.skipped")
+        self._active.running = True
+        try:
+            yield
+        finally:
+            self._active.running = False
+
+    def hotspots(self, top: int = 20, sort: str = "cumulative") -> str:
+        """Top functions over every section profiled so far, as printed by pstats"""
+        if not self.files:
+            return ""
+        output = io.StringIO()
+        stats = pstats.Stats(*self.files, stream=output)
+        stats.strip_dirs().sort_stats(sort).print_stats(top)
+        return output.getvalue()
+
+    def print_hotspots(self, top: int = 20):
+        if not self.files:
+            return
+        skipped = f" ({self.skipped} skipped while another was profiled)" if self.skipped else ""
+        print(f"\nProfiled {len(self.files)} sections into {self.directory}{skipped}, top {top} by cumulative time:")
+        print(self.hotspots(top))
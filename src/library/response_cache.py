@@ -0,0 +1,100 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_input(user_input: str) -> str:
+    """Normalize user input so trivially different phrasings share a cache entry"""
+    text = re.sub(r"\s+", " ", (user_input or "").strip().lower())
+    return text.rstrip(" .!?")
+
+
+def schema_fingerprint(schema) -> str:
+    """Stable hash of a tool schema, so schema changes never reuse old responses"""
+    encoded = json.dumps(schema, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode()).hexdigest()[:16]
+
+
+class ResponseCache:
+    """
+    LRU cache of chat completion responses with a TTL
+
+    Keys combine the normalized user input, the wallet-state version, the tool
+    schema fingerprint and a hash of the rendered wallet context, which lists
+    the most recently used wallets and so changes on a touch without a version
+    change. When the wallet-state version moves on, every entry built against
+    the old version is dropped (see `sync_version`).
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(user_input: str, state_version, schema_hash: str, context: str = "") -> tuple:
+        context_hash = hashlib.sha256(context.encode()).hexdigest()[:16]
+        return (normalize_input(user_input), state_version, schema_hash, context_hash)
+
+    def sync_version(self, state_version):
+        """Invalidate the cache if the wallet state changed since the last call"""
+        with self._lock:
+            if self._version is not None and state_version != self._version:
+                self._entries.clear()
+                self.invalidations += 1
+            self._version = state_version
+
+    def get(self, key):
+        """Return the cached value for a key, or None on a miss"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            stored_at, value = entry
+            if now - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations
+        }
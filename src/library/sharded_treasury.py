@@ -0,0 +1,316 @@
+import bisect
+import hashlib
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+
+from library.balance_ledger import BalanceLedger
+from library.keyed_executor import KeyedExecutor, wallet_key
+from library.wallet_utils import create_wallet, transfer_usdc
+
+
+def _ring_hash(value: str) -> int:
+    return int.from_bytes(hashlib.sha256(value.encode()).digest()[:8], "big")
+
+
+class HashRing:
+    """
+    Consistent hash ring over shard addresses
+
+    Each shard owns `replicas` points on the ring, so keys spread evenly and
+    adding or removing a shard only moves the keys next to its points.
+    """
+
+    def __init__(self, nodes=(), replicas: int = 128):
+        self.replicas = replicas
+        self._points = []
+        self._owners = {}
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node: str):
+        for i in range(self.replicas):
+            point = _ring_hash(f"{wallet_key(node)}#{i}")
+            bisect.insort(self._points, point)
+            self._owners[point] = node
+
+    def remove(self, node: str):
+        for i in range(self.replicas):
+            point = _ring_hash(f"{wallet_key(node)}#{i}")
+            if self._owners.pop(point, None) is not None:
+                self._points.remove(point)
+
+    def node_for(self, key: str) -> str:
+        if not self._points:
+            raise ValueError("Hash ring has no nodes")
+        index = bisect.bisect(self._points, _ring_hash(wallet_key(key))) % len(self._points)
+        return self._owners[self._points[index]]
+
+    def __len__(self):
+        return len(self._points) // self.replicas
+
+
+class ShardedTreasury:
+    """
+    A set of treasury wallets that share intake and payouts
+
+    Ticket payments are routed to a shard by consistent hashing of the payer, so
+    each shard sees a stable share of the traffic. Transfers out of a shard are
+    queued per shard on a KeyedExecutor: a shard's transactions stay in order
+    while different shards never wait on each other, so throughput grows with
+    the number of shards. Shard balances live in a BalanceLedger, and sweep()
+    moves them into the consolidation wallet with one transfer per shard, all
+    shards at once.
+
+    With a TransactionPipeline, payouts and sweeps go through its create, sign,
+    approve and confirm stages instead of transfer_usdc, so the transactions of
+    different shards overlap stage by stage and pipeline.stats() shows which
+    stage limits them. Each shard still waits for its transfer to confirm
+    before starting the next one.
+    """
+
+    def __init__(self, api_key: str, shard_addresses, consolidation_address: str,
+                 chain: str = "base-sepolia", ledger: BalanceLedger = None,
+                 private_key: str = None, signer_pool=None, max_workers: int = 8,
+                 pipeline=None):
+        """
+        Args:
+            api_key (str): Crossmint API key
+            shard_addresses (list): Treasury shard wallet addresses
+            consolidation_address (str): Wallet that sweeps move funds into
+            chain (str): Blockchain network (default: "base-sepolia")
+            ledger (BalanceLedger): Shared balance ledger (default: a new one)
+            private_key (str): Admin signer key of the shards
+            signer_pool (SignerPool): Signers of the shards, instead of private_key
+            max_workers (int): Concurrent transactions, across shards and payers
+            pipeline (TransactionPipeline): Sends payouts and sweeps; its signer
+                pool must hold the shards' signers
+        """
+        if not shard_addresses:
+            raise ValueError("A sharded treasury needs at least one shard")
+        self.api_key = api_key
+        self.chain = chain
+        self.shards = list(shard_addresses)
+        self.consolidation_address = consolidation_address
+        self.private_key = private_key
+        self.signer_pool = signer_pool
+        self.pipeline = pipeline
+        self.ledger = ledger or BalanceLedger(api_key, chain)
+        self.ring = HashRing(self.shards)
+        self._executor = KeyedExecutor(max_workers=max_workers)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.routed = {wallet_key(shard): 0 for shard in self.shards}
+        # Payouts debited locally but not yet submitted, per shard
+        self._reserved = {wallet_key(shard): 0 for shard in self.shards}
+        self.sweeps = 0
+        self.swept = 0
+
+        for shard in self.shards:
+            self.ledger.track(shard)
+        self.ledger.track(consolidation_address)
+
+    @classmethod
+    def create_shards(cls, api_key: str, count: int, signer_address: str, max_workers: int = 8) -> dict:
+        """
+        Create `count` treasury shard wallets in parallel
+
+        Returns:
+            dict: Response with the new shard "addresses" and any "errors"
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(
+                lambda _: create_wallet(api_key, "evm-smart-wallet", signer_address), range(count)))
+
+        addresses = [r["wallet_data"]["address"] for r in results if r.get("status") == "success"]
+        errors = [r.get("error") for r in results if r.get("status") != "success"]
+        return {
+            "status": "success" if not errors else "error",
+            "addresses": addresses,
+            "errors": errors,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+
+    @classmethod
+    def from_env(cls, api_key: str, **kwargs):
+        """
+        Treasury over TEST_TREASURY_EVM_SHARDS (comma separated), consolidating
+        into TEST_TREASURY_EVM_WALLET, with max_workers from TREASURY_MAX_WORKERS;
+        None when no shards are configured
+        """
+        shards = [address.strip() for address in os.getenv('TEST_TREASURY_EVM_SHARDS', '').split(',') if address.strip()]
+        if not shards:
+            return None
+        consolidation_address = os.getenv('TEST_TREASURY_EVM_WALLET')
+        if not consolidation_address:
+            raise ValueError("TEST_TREASURY_EVM_SHARDS is set but TEST_TREASURY_EVM_WALLET is missing")
+        if os.getenv('TREASURY_MAX_WORKERS'):
+            kwargs.setdefault("max_workers", int(os.getenv('TREASURY_MAX_WORKERS')))
+        return cls(api_key, shards, consolidation_address, **kwargs)
+
+    def shard_for(self, payer_address: str) -> str:
+        """Treasury shard that receives payments from this payer"""
+        return self.ring.node_for(payer_address)
+
+    def _send(self, from_wallet_address: str, to_wallet_address: str, amount: int) -> dict:
+        """Transfer out of a shard, through the pipeline when there is one"""
+        if self.pipeline is None:
+            return transfer_usdc(
+                self.api_key, from_wallet_address, to_wallet_address, amount, self.chain,
+                self.private_key, signer_pool=self.signer_pool)
+        response = self.pipeline.submit_transfer(from_wallet_address, to_wallet_address, amount).result()
+        status = (response.get("transaction_data") or {}).get("status")
+        if response.get("status") == "success" and status != "success":
+            return {**response, "status": "error", "error": f"Transaction ended with status {status}"}
+        return response
+
+    def _transfer(self, from_wallet_address: str, to_wallet_address: str, amount: int) -> dict:
+        response = self._send(from_wallet_address, to_wallet_address, amount)
+        if response.get("status") == "success":
+            self.ledger.apply_transfer(from_wallet_address, to_wallet_address, amount)
+        return response
+
+    def pay_in(self, payer_address: str, amount: int, private_key: str = None, signer_pool=None):
+        """
+        Transfer a ticket payment from a payer to its shard (amount in base units)
+
+        Payments from one payer stay in order; different payers run in parallel.
+
+        Returns:
+            Future: Resolves to the transfer_usdc response, with "shard" added
+        """
+        shard = self.shard_for(payer_address)
+        with self._lock:
+            self.routed[wallet_key(shard)] += 1
+
+        def pay():
+            response = transfer_usdc(
+                self.api_key, payer_address, shard, amount, self.chain,
+                private_key or self.private_key, signer_pool=signer_pool or self.signer_pool)
+            if response.get("status") == "success":
+                self.ledger.apply_delta(shard, amount)
+            return {**response, "shard": shard}
+
+        return self._executor.submit(payer_address, pay)
+
+    def record_payment(self, shard_address: str, amount: int):
+        """Credit a payment that arrived at a shard by other means (amount in base units)"""
+        self.ledger.apply_delta(shard_address, amount)
+
+    def pay_out(self, to_wallet_address: str, amount: int):
+        """
+        Pay from the shard with the largest local balance (amount in base units)
+
+        Returns:
+            Future: Resolves to the transfer_usdc response, with "shard" added,
+            or an error when no shard holds enough
+        """
+        with self._lock:
+            shard = max(self.shards, key=lambda address: self.ledger.balance(address) or 0)
+            if (self.ledger.balance(shard) or 0) < amount:
+                future = Future()
+                future.set_result({
+                    "status": "error",
+                    "error": f"No treasury shard holds {amount} base units",
+                    "timestamp": datetime.utcnow().isoformat()
+                })
+                return future
+            # Reserve now so concurrent payouts pick other shards
+            self.ledger.apply_delta(shard, -amount)
+            self._reserved[wallet_key(shard)] += amount
+
+        def pay():
+            response = self._send(shard, to_wallet_address, amount)
+            with self._lock:
+                self._reserved[wallet_key(shard)] -= amount
+                if response.get("status") != "success":
+                    self.ledger.apply_delta(shard, amount)
+            return {**response, "shard": shard}
+
+        return self._executor.submit(shard, pay)
+
+    def balances(self) -> dict:
+        """Local balance of every shard in base units"""
+        return {shard: self.ledger.balance(shard) or 0 for shard in self.shards}
+
+    def sweep(self, min_amount: int = 1, keep: int = 0, reconcile: bool = True) -> dict:
+        """
+        Move shard balances into the consolidation wallet, all shards in parallel
+
+        Args:
+            min_amount (int): Skip shards with less than this to sweep (base units)
+            keep (int): Leave this much on every shard for payouts (base units)
+            reconcile (bool): Reconcile each shard's balance with the API right
+                before its transfer, so local drift does not make it fail.
+                Payouts reserved but still queued behind the sweep are debited
+                again after it, since the API balance does not include them yet
+
+        Returns:
+            dict: Report with the amount swept per shard and any errors
+        """
+        def sweep_shard(shard):
+            # Runs behind the shard's queued payouts, so their debits are applied.
+            # Payouts reserved after the sweep was queued have not reached the
+            # chain: the lock keeps new ones out while they are debited again
+            if reconcile:
+                with self._lock:
+                    self.ledger.reconcile([shard])
+                    self.ledger.apply_delta(shard, -self._reserved[wallet_key(shard)])
+            amount = (self.ledger.balance(shard) or 0) - keep
+            if amount < min_amount:
+                return amount, None
+            return amount, self._transfer(shard, self.consolidation_address, amount)
+
+        futures = {shard: self._executor.submit(shard, sweep_shard, shard) for shard in self.shards}
+
+        swept, errors = {}, []
+        for shard, future in futures.items():
+            amount, response = future.result()
+            if response is None:
+                continue
+            if response.get("status") == "success":
+                swept[shard] = amount
+            else:
+                errors.append({"shard": shard, "error": response.get("error")})
+
+        self.sweeps += 1
+        self.swept += sum(swept.values())
+        return {
+            "status": "success" if not errors else "error",
+            "swept": swept,
+            "total_swept": sum(swept.values()),
+            "errors": errors,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+
+    def start_sweeper(self, interval: float = 3600, on_report=None, **sweep_kwargs):
+        """Sweep every `interval` seconds in a background thread"""
+        def loop():
+            while not self._stop.wait(interval):
+                report = self.sweep(**sweep_kwargs)
+                if on_report:
+                    on_report(report)
+
+        self._thread = threading.Thread(target=loop, name="treasury-sweeper", daemon=True)
+        self._thread.start()
+
+    def stats(self) -> dict:
+        with self._lock:
+            routed = dict(self.routed)
+            reserved = dict(self._reserved)
+        return {
+            "shards": len(self.shards),
+            "routed_payments": routed,
+            "reserved_payouts": reserved,
+            "balances": self.balances(),
+            "sweeps": self.sweeps,
+            "total_swept": self.swept,
+            "executor": self._executor.stats(),
+            "pipeline": self.pipeline.stats() if self.pipeline else None
+        }
+
+    def close(self):
+        self._stop.set()
+        self._executor.shutdown()
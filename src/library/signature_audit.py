@@ -0,0 +1,107 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from library.addresses import parse_address
+from library.signer_pool import signer_address
+
+# EIP-191 prefix that encode_defunct puts in front of the message bytes
+_MESSAGE_PREFIX = b"\x19Ethereum Signed Message:\n"
+
+
+def _recover(user_op_hash: str, signature: str) -> bytes:
+    """20-byte address that produced a sign_user_op_hash signature"""
+    from eth_keys import keys
+    from eth_utils import keccak
+
+    message = bytes.fromhex(user_op_hash.removeprefix("0x"))
+    message_hash = keccak(_MESSAGE_PREFIX + str(len(message)).encode() + message)
+    raw = bytearray(bytes.fromhex(signature.removeprefix("0x")))
+    if len(raw) != 65:
+        raise ValueError(f"Signature must be 65 bytes, got {len(raw)}")
+    if raw[64] >= 27:
+        raw[64] -= 27
+    public_key = keys.Signature(signature_bytes=bytes(raw)).recover_public_key_from_msg_hash(message_hash)
+    return public_key.to_canonical_address()
+
+
+def recover_signer(user_op_hash: str, signature: str) -> str:
+    """Address (lowercase) that signed a user operation hash"""
+    return "0x" + _recover(user_op_hash, signature).hex()
+
+
+def _audit_chunk(start: int, triples: list) -> tuple:
+    """Worker: recover a chunk of triples, returning its mismatches and errors"""
+    mismatches, errors = [], []
+    for offset, (user_op_hash, signature, expected) in enumerate(triples):
+        try:
+            recovered = _recover(user_op_hash, signature)
+            if recovered != parse_address(signer_address(expected)):
+                mismatches.append({
+                    "index": start + offset,
+                    "user_op_hash": user_op_hash,
+                    "expected": expected,
+                    "recovered": "0x" + recovered.hex()
+                })
+        except Exception as e:
+            errors.append({"index": start + offset, "user_op_hash": user_op_hash, "error": str(e)})
+    return mismatches, errors
+
+
+def audit_signatures(triples, workers: int = None, chunk_size: int = 2000) -> dict:
+    """
+    Recover the signer of many signatures in parallel and report mismatches
+
+    Args:
+        triples (list): (user_op_hash, signature, expected_signer) tuples; the
+            expected signer is an address or a Crossmint signer id
+        workers (int): Recovery processes (default: CPU count, 1 runs in-process)
+        chunk_size (int): Triples per task sent to a worker
+
+    Returns:
+        dict: Report with "checked", the "mismatches" and "errors" found (by
+        input index) and the recoveries per second
+    """
+    triples = list(triples)
+    workers = workers or os.cpu_count() or 1
+    chunks = [(start, triples[start:start + chunk_size]) for start in range(0, len(triples), chunk_size)]
+
+    started = time.perf_counter()
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_audit_chunk, *zip(*chunks)))
+    else:
+        results = [_audit_chunk(start, chunk) for start, chunk in chunks]
+    elapsed = time.perf_counter() - started
+
+    mismatches = [item for chunk_mismatches, _ in results for item in chunk_mismatches]
+    errors = [item for _, chunk_errors in results for item in chunk_errors]
+    return {
+        "status": "success" if not (mismatches or errors) else "error",
+        "checked": len(triples),
+        "mismatches": mismatches,
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 3),
+        "per_second": round(len(triples) / elapsed, 1) if elapsed else None,
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
+def submitted_approvals(transaction_data: dict) -> list:
+    """
+    Audit triples for the submitted approvals of a transaction
+
+    Args:
+        transaction_data (dict): Transaction as returned by get_transaction or
+            submit_transaction_approval
+
+    Returns:
+        list: (user_op_hash, signature, signer id) per submitted approval
+    """
+    fallback_hash = transaction_data.get("onChain", {}).get("userOperationHash")
+    return [
+        (approval.get("message") or fallback_hash, approval["signature"], approval["signer"])
+        for approval in transaction_data.get("approvals", {}).get("submitted", [])
+        if approval.get("signature")
+    ]
@@ -0,0 +1,132 @@
+import contextvars
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from library.addresses import address_key
+from library.generate_keys import read_keystore_index, read_keystore_entry
+from library.wallet_utils import sign_user_op_hash
+
+
+def signer_address(signer_id: str) -> str:
+    """Extract the address from a Crossmint signer id such as 'evm-keypair:0xabc...'"""
+    return (signer_id or "").rsplit(":", 1)[-1].strip()
+
+
+def _decrypt_keystore(keystore: dict, password: str) -> str:
+    """Worker: decrypt one V3 keystore and return the private key as hex"""
+    from eth_account import Account
+    return Account.decrypt(keystore, password).hex()
+
+
+class SignerPool:
+    """
+    A set of admin signers loaded once and kept in memory
+
+    Accounts are cached by address, so each pending approval of a transaction is
+    signed by the signer it names, without re-deriving keys per signature.
+    Signatures for many approvals are produced concurrently.
+    """
+
+    def __init__(self, private_keys=(), max_workers: int = None):
+        from eth_account import Account
+
+        self._accounts = {}
+        for private_key in private_keys:
+            account = Account.from_key(private_key)
+            self._accounts[address_key(account.address)] = account
+
+        self._addresses = [account.address for account in self._accounts.values()]
+        self._next_index = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or min(32, (os.cpu_count() or 1) + 4))
+
+    @classmethod
+    def from_keystore(cls, keystore_path: str, password: str, extra_keys=(), workers: int = None):
+        """Load every signer in a bulk keystore (see generate_keys_bulk), decrypting in parallel"""
+        index = read_keystore_index(keystore_path)
+        entries = [read_keystore_entry(keystore_path, address, index) for address in index]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            keys = list(pool.map(_decrypt_keystore, entries, [password] * len(entries), chunksize=16))
+        return cls(list(extra_keys) + keys)
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build the pool from SIGNER_PRIVATE_KEY and, when set, every key in
+        SIGNER_KEYSTORE (decrypted with KEYSTORE_PASSWORD)
+        """
+        keys = [key for key in [os.getenv('SIGNER_PRIVATE_KEY')] if key]
+        keystore_path = os.getenv('SIGNER_KEYSTORE')
+        if keystore_path:
+            password = os.getenv('KEYSTORE_PASSWORD')
+            if not password:
+                raise ValueError("SIGNER_KEYSTORE is set but KEYSTORE_PASSWORD is missing")
+            return cls.from_keystore(keystore_path, password, extra_keys=keys)
+        return cls(keys)
+
+    def __len__(self):
+        return len(self._addresses)
+
+    @property
+    def addresses(self):
+        return list(self._addresses)
+
+    def private_keys(self) -> list:
+        """Hex private keys of the pool, used to build the same pool in worker processes"""
+        return ['0x' + account.key.hex().removeprefix('0x') for account in self._accounts.values()]
+
+    def has_signer(self, signer_id: str) -> bool:
+        return address_key(signer_address(signer_id)) in self._accounts
+
+    def next_address(self) -> str:
+        """Round-robin over the signers, used to spread new wallets across admin signers"""
+        if not self._addresses:
+            raise ValueError("Signer pool is empty")
+        with self._lock:
+            address = self._addresses[self._next_index % len(self._addresses)]
+            self._next_index += 1
+        return address
+
+    def sign(self, signer_id: str, user_op_hash: str) -> str:
+        """Sign a user operation hash with the cached signer named by signer_id"""
+        account = self._accounts.get(address_key(signer_address(signer_id)))
+        if account is None:
+            raise ValueError(f"Signer {signer_id} is not in the signer pool")
+        return sign_user_op_hash(account, user_op_hash)
+
+    def sign_many(self, requests) -> list:
+        """
+        Sign many (signer_id, user_op_hash) pairs concurrently
+
+        Returns:
+            list: Signatures in the same order as the requests
+        """
+        requests = list(requests)
+        # Each signature runs in a copy of the caller's context, so tracing spans nest under it
+        contexts = [contextvars.copy_context() for _ in requests]
+        return list(self._executor.map(
+            lambda context, request: context.run(self.sign, *request), contexts, requests))
+
+    def sign_pending(self, transaction_data: dict) -> list:
+        """
+        Sign every pending approval of a transaction that belongs to this pool
+
+        Args:
+            transaction_data (dict): Transaction as returned by create_transaction
+
+        Returns:
+            list: Approvals ready for submit_transaction_approvals, as
+            [{"signer": str, "signature": str}, ...]
+        """
+        fallback_hash = transaction_data.get("onChain", {}).get("userOperationHash")
+        requests = [
+            (pending["signer"], pending.get("message") or fallback_hash)
+            for pending in transaction_data.get("approvals", {}).get("pending", [])
+            if self.has_signer(pending.get("signer"))
+        ]
+        signatures = self.sign_many(requests)
+        return [
+            {"signer": signer_id, "signature": signature}
+            for (signer_id, _), signature in zip(requests, signatures)
+        ]
@@ -0,0 +1,274 @@
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+
+from library.keyed_executor import wallet_key
+from library.wallet_utils import (
+    approve_transaction, build_transfer_params, create_transaction,
+    submit_transaction_approvals
+)
+
+
+def speculation_key(wallet_address: str, params: dict) -> tuple:
+    """Key of a prepared transaction: the sending wallet and its exact params"""
+    return wallet_key(wallet_address), json.dumps(params, sort_keys=True)
+
+
+class SpeculativeTransactions:
+    """
+    Transactions created and signed ahead of time for wallets expected to act soon
+
+    prepare() runs create_transaction and signs the pending approvals in the
+    background. A later submit() with the same wallet and params only sends the
+    approvals, taking create_transaction and signing off the critical path; with
+    no usable prepared transaction it falls back to create + approve.
+
+    Prepared transactions are never approved unless submitted, so they cannot
+    execute: cancelling or expiring one only drops it locally. They expire after
+    ttl seconds (dropped on the next prepare, submit or stats), and submitting
+    any transaction from a wallet discards its other prepared transactions,
+    whose user operation nonce is then stale. A prepared transaction the
+    backend rejects on approval is retried through the fallback.
+
+    prepare_repeat_transfer() only prepares a transfer already submitted within
+    the last repeat_window seconds, so nothing is created for one-off transfers.
+    """
+
+    def __init__(self, api_key: str, signer_pool, chain: str = "base-sepolia",
+                 ttl: float = 60, max_workers: int = 4, max_per_wallet: int = 4,
+                 repeat_window: float = 600):
+        """
+        Args:
+            api_key (str): Crossmint API key
+            signer_pool (SignerPool): Signs the pending approvals
+            chain (str): Blockchain network (default: "base-sepolia")
+            ttl (float): Seconds a prepared transaction stays usable
+            max_workers (int): Background threads preparing transactions
+            max_per_wallet (int): Prepared transactions kept per wallet, oldest dropped first
+            repeat_window (float): Seconds a submitted transfer counts as recent
+                for prepare_repeat_transfer()
+        """
+        self.api_key = api_key
+        self.signer_pool = signer_pool
+        self.chain = chain
+        self.ttl = ttl
+        self.max_per_wallet = max_per_wallet
+        self.repeat_window = repeat_window
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="speculative-tx")
+        self._prepared = {}
+        # speculation_key -> when that transfer was last seen
+        self._seen = {}
+        self._lock = threading.Lock()
+        self.counters = {
+            "prepared": 0,
+            "prepare_failed": 0,
+            "hits": 0,
+            "misses": 0,
+            "stale": 0,
+            "expired": 0,
+            "cancelled": 0,
+            "invalidated": 0
+        }
+        self.latency_saved = 0.0
+
+    def prepare(self, wallet_address: str, params: dict):
+        """
+        Create and sign a transaction in the background
+
+        Returns:
+            Future: Resolves to the prepared entry, or None if preparation failed
+        """
+        key = speculation_key(wallet_address, params)
+        # The future exists before the entry is visible, so submit() can always wait on it
+        entry = {"wallet_address": wallet_address, "params": params, "expires_at": None, "future": Future()}
+        with self._lock:
+            self._expire(time.monotonic())
+            entries = self._prepared.setdefault(key[0], deque())
+            if len(entries) >= self.max_per_wallet:
+                entries.popleft()
+                self.counters["cancelled"] += 1
+            entries.append((key, entry))
+        self._executor.submit(self._run, entry)
+        return entry["future"]
+
+    def prepare_transfer(self, from_wallet_address: str, to_wallet_address: str, amount: int):
+        """Prepare a USDC transfer (amount in base units)"""
+        return self.prepare(from_wallet_address, build_transfer_params(to_wallet_address, amount, self.chain))
+
+    def prepare_repeat_transfer(self, from_wallet_address: str, to_wallet_address: str, amount: int):
+        """
+        Prepare a USDC transfer again only if it was already submitted recently
+
+        Call it after each transfer: the first time a transfer is seen it is
+        only remembered, a repeat within repeat_window is prepared once more.
+
+        Returns:
+            Future: As prepare(), or None when no repeat is predicted
+        """
+        params = build_transfer_params(to_wallet_address, amount, self.chain)
+        key = speculation_key(from_wallet_address, params)
+        now = time.monotonic()
+        with self._lock:
+            for seen_key in [k for k, seen in self._seen.items() if seen <= now - self.repeat_window]:
+                del self._seen[seen_key]
+            repeated = key in self._seen
+            self._seen[key] = now
+        if not repeated:
+            return None
+        return self.prepare(from_wallet_address, params)
+
+    def _run(self, entry: dict):
+        try:
+            entry["future"].set_result(self._prepare(entry))
+        except Exception as e:
+            with self._lock:
+                self.counters["prepare_failed"] += 1
+                self._remove(entry)
+            entry["future"].set_exception(e)
+
+    def _prepare(self, entry: dict):
+        started = time.perf_counter()
+        response = create_transaction(self.api_key, entry["wallet_address"], self.chain, entry["params"])
+        transaction_data = response.get("transaction_data") or {}
+        approvals = None
+        if response.get("status") == "success" and transaction_data.get("status") == "awaiting-approval":
+            approvals = self.signer_pool.sign_pending(transaction_data)
+
+        with self._lock:
+            if not approvals:
+                self.counters["prepare_failed"] += 1
+                self._remove(entry)
+                return None
+            entry["transaction_data"] = transaction_data
+            entry["approvals"] = approvals
+            entry["prepare_seconds"] = time.perf_counter() - started
+            entry["expires_at"] = time.monotonic() + self.ttl
+            self.counters["prepared"] += 1
+        return entry
+
+    def _remove(self, entry: dict):
+        entries = self._prepared.get(wallet_key(entry["wallet_address"]))
+        if entries:
+            for item in entries:
+                if item[1] is entry:
+                    entries.remove(item)
+                    break
+            if not entries:
+                del self._prepared[wallet_key(entry["wallet_address"])]
+
+    def _take(self, wallet_address: str, params: dict):
+        """Pop the prepared entry for these params and drop the wallet's others"""
+        key = speculation_key(wallet_address, params)
+        with self._lock:
+            self._expire(time.monotonic())
+            entries = self._prepared.pop(key[0], deque())
+            match = None
+            for item_key, entry in entries:
+                if match is None and item_key == key:
+                    match = entry
+                else:
+                    self.counters["invalidated"] += 1
+        return match
+
+    def submit(self, wallet_address: str, params: dict) -> dict:
+        """
+        Submit a transaction, using a prepared one when it matches
+
+        Returns:
+            dict: The submit_transaction_approvals response (same format as
+            approve_transaction), with "speculative" set to "hit" or "miss"
+        """
+        entry = self._take(wallet_address, params)
+        if entry is not None:
+            # Still preparing: waiting on it is never slower than starting over
+            try:
+                prepared = entry["future"].result()
+            except Exception:
+                prepared = None
+            if prepared is None:
+                entry = None
+            elif time.monotonic() >= prepared["expires_at"]:
+                with self._lock:
+                    self.counters["expired"] += 1
+                entry = None
+
+        if entry is not None:
+            response = submit_transaction_approvals(
+                self.api_key, wallet_address, entry["transaction_data"]["id"], entry["approvals"])
+            if response.get("status") == "success":
+                with self._lock:
+                    self.counters["hits"] += 1
+                    self.latency_saved += entry["prepare_seconds"]
+                return {**response, "speculative": "hit"}
+            # Rejected by the backend (expired there or superseded): start over
+            with self._lock:
+                self.counters["stale"] += 1
+
+        with self._lock:
+            self.counters["misses"] += 1
+        response = create_transaction(self.api_key, wallet_address, self.chain, params)
+        if response.get("status") != "success":
+            return {**response, "speculative": "miss"}
+        response = approve_transaction(
+            self.api_key, wallet_address, response["transaction_data"], signer_pool=self.signer_pool)
+        return {**response, "speculative": "miss"}
+
+    def submit_transfer(self, from_wallet_address: str, to_wallet_address: str, amount: int) -> dict:
+        """Submit a USDC transfer (amount in base units)"""
+        return self.submit(from_wallet_address, build_transfer_params(to_wallet_address, amount, self.chain))
+
+    def cancel(self, wallet_address: str, params: dict = None) -> int:
+        """
+        Drop prepared transactions for a wallet (only the matching one when params is given)
+
+        Returns:
+            int: Number of prepared transactions dropped
+        """
+        key = speculation_key(wallet_address, params) if params is not None else None
+        with self._lock:
+            entries = self._prepared.get(wallet_key(wallet_address), deque())
+            dropped = [item for item in entries if key is None or item[0] == key]
+            for item in dropped:
+                entries.remove(item)
+            if not entries:
+                self._prepared.pop(wallet_key(wallet_address), None)
+            self.counters["cancelled"] += len(dropped)
+        return len(dropped)
+
+    def _expire(self, now: float) -> int:
+        """Drop prepared transactions past their ttl; call with the lock held"""
+        dropped = 0
+        for wallet in list(self._prepared):
+            entries = self._prepared[wallet]
+            for item in [item for item in entries if item[1]["expires_at"] and item[1]["expires_at"] <= now]:
+                entries.remove(item)
+                dropped += 1
+            if not entries:
+                del self._prepared[wallet]
+        self.counters["expired"] += dropped
+        return dropped
+
+    def expire(self) -> int:
+        """Drop prepared transactions past their ttl; returns how many were dropped"""
+        with self._lock:
+            return self._expire(time.monotonic())
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._expire(time.monotonic())
+            submitted = self.counters["hits"] + self.counters["misses"]
+            return {
+                **self.counters,
+                "pending": sum(len(entries) for entries in self._prepared.values()),
+                "hit_rate": round(self.counters["hits"] / submitted, 3) if submitted else None,
+                "latency_saved_ms": round(self.latency_saved * 1000, 2),
+                "avg_latency_saved_ms": round(self.latency_saved / self.counters["hits"] * 1000, 2)
+                if self.counters["hits"] else None,
+                "timestamp": datetime.utcnow().isoformat()
+            }
+
+    def close(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
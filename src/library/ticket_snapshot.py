@@ -0,0 +1,150 @@
+import json
+import os
+import shutil
+from datetime import datetime
+
+import numpy as np
+
+from library.addresses import ADDRESS_BYTES, parse_address
+
+# Column files of a snapshot directory
+COLUMNS = {
+    "owners": (np.uint8, (ADDRESS_BYTES,)),   # purchaser address bytes
+    "amounts": (np.int64, ()),                # paid, USDC base units
+    "ticket_start": (np.int64, ()),           # first ticket number of the purchase
+    "ticket_count": (np.int64, ())            # tickets in the purchase
+}
+META_FILE = "meta.json"
+
+# Fixed-width record used for the round's Merkle commitment
+RECORD_DTYPE = np.dtype([("owner", "V20"), ("ticket_start", ">i8"), ("ticket_count", ">i8")])
+
+
+def write_snapshot(directory: str, purchases, round_id: str = None) -> dict:
+    """
+    Export ticket purchases to a columnar snapshot of .npy files
+
+    Purchases get consecutive ticket ranges in the order given. The columns are
+    written to a temporary directory that replaces `directory` once complete,
+    so readers never see a partial snapshot.
+
+    Args:
+        directory (str): Snapshot directory
+        purchases (list): Dicts with "wallet_address", "amount" (base units)
+            and "tickets" (number of tickets)
+        round_id (str): Draw round the snapshot belongs to
+
+    Returns:
+        dict: The snapshot metadata
+    """
+    count = len(purchases)
+    tmp = f"{directory}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    columns = {
+        name: np.lib.format.open_memmap(
+            os.path.join(tmp, f"{name}.npy"), mode="w+", dtype=dtype, shape=(count,) + shape)
+        for name, (dtype, shape) in COLUMNS.items()
+    }
+    if count:
+        columns["owners"][:] = np.frombuffer(
+            b"".join(parse_address(p["wallet_address"]) for p in purchases),
+            dtype=np.uint8).reshape(count, ADDRESS_BYTES)
+        columns["amounts"][:] = [p["amount"] for p in purchases]
+        columns["ticket_count"][:] = [p["tickets"] for p in purchases]
+        np.cumsum(columns["ticket_count"][:-1], out=columns["ticket_start"][1:])
+        columns["ticket_start"][0] = 0
+    for column in columns.values():
+        column.flush()
+
+    meta = {
+        "round_id": round_id,
+        "purchases": count,
+        "total_tickets": int(columns["ticket_count"].sum()),
+        "total_amount": int(columns["amounts"].sum()),
+        "created_at": datetime.utcnow().isoformat()
+    }
+    del columns
+    with open(os.path.join(tmp, META_FILE), "w") as file:
+        json.dump(meta, file)
+
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp, directory)
+    return meta
+
+
+class TicketSnapshot:
+    """
+    Read-only view of a snapshot written by write_snapshot()
+
+    Columns are memory-mapped, so opening is instant and scans run over the
+    page cache at memory speed without deserializing anything.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, META_FILE)) as file:
+            self.meta = json.load(file)
+        for name in COLUMNS:
+            setattr(self, name, np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r"))
+
+    def __len__(self):
+        return len(self.amounts)
+
+    @property
+    def total_tickets(self) -> int:
+        return self.meta["total_tickets"]
+
+    def address(self, index: int) -> str:
+        return "0x" + self.owners[index].tobytes().hex()
+
+    def purchase_of_ticket(self, ticket_numbers):
+        """Purchase index holding each ticket number, by binary search over ticket_start"""
+        tickets = np.asarray(ticket_numbers, dtype=np.int64)
+        if tickets.size and (tickets.min() < 0 or tickets.max() >= self.total_tickets):
+            raise IndexError("Ticket number out of range")
+        return np.searchsorted(self.ticket_start, tickets, side="right") - 1
+
+    def draw(self, random_words) -> list:
+        """
+        Winners for a list of random words (e.g. from Chainlink VRF)
+
+        Returns:
+            list: {"ticket", "wallet_address"} per word, ticket = word % total_tickets
+        """
+        if not self.total_tickets:
+            raise ValueError("Snapshot has no tickets to draw from")
+        tickets = [int(word) % self.total_tickets for word in random_words]
+        purchases = self.purchase_of_ticket(tickets)
+        return [
+            {"ticket": ticket, "wallet_address": self.address(index)}
+            for ticket, index in zip(tickets, purchases)
+        ]
+
+    def totals_by_owner(self) -> dict:
+        """Tickets and amount per purchaser, for payouts and reporting"""
+        owners = np.ascontiguousarray(self.owners).view(np.dtype((np.void, ADDRESS_BYTES))).ravel()
+        unique, inverse = np.unique(owners, return_inverse=True)
+        tickets = np.zeros(len(unique), dtype=np.int64)
+        amounts = np.zeros(len(unique), dtype=np.int64)
+        np.add.at(tickets, inverse, self.ticket_count)
+        np.add.at(amounts, inverse, self.amounts)
+        return {
+            "0x" + owner.tobytes().hex(): {"tickets": int(t), "amount": int(a)}
+            for owner, t, a in zip(unique, tickets, amounts)
+        }
+
+    def merkle_records(self):
+        """
+        Fixed-width purchase records (owner, ticket_start, ticket_count) for
+        MerkleTree.build
+
+        Returns:
+            tuple: (records bytes, record size)
+        """
+        records = np.empty(len(self), dtype=RECORD_DTYPE)
+        records["owner"] = np.ascontiguousarray(self.owners).view("V20").ravel()
+        records["ticket_start"] = self.ticket_start
+        records["ticket_count"] = self.ticket_count
+        return records.tobytes(), RECORD_DTYPE.itemsize
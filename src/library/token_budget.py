@@ -0,0 +1,218 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import deque
+
+from library.tracing import traced_sleep
+
+# USD per million tokens: (prompt, completion)
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4-turbo-preview": (10.00, 30.00)
+}
+
+WINDOW_SECONDS = 60
+
+
+class BudgetExceededError(Exception):
+    """A session ceiling is reached, or throttling would wait longer than allowed"""
+
+
+def _env_float(name: str):
+    value = os.getenv(name)
+    return float(value) if value else None
+
+
+class TokenBudget:
+    """
+    Token and cost accounting for OpenAI calls, with ceilings
+
+    record() takes each response's usage and latency. acquire() runs before a
+    call: past a per-session ceiling it raises BudgetExceededError; when the
+    call would push the last minute over a per-minute ceiling it sleeps just
+    until enough usage has aged out of the sliding window, so load is spread
+    out instead of stopping the session. The expected size of a call is the
+    running average of the calls so far; acquire() reserves it in the window
+    until the call's record(), so concurrent callers cannot all claim the same
+    room. A reservation that is never recorded ages out with the window.
+    """
+
+    def __init__(self, model: str, session_tokens: int = None, session_cost: float = None,
+                 minute_tokens: int = None, minute_cost: float = None,
+                 max_wait: float = 60, keep_expensive: int = 10):
+        """
+        Args:
+            model (str): Model name, for MODEL_PRICES
+            session_tokens (int): Ceiling on total tokens this session
+            session_cost (float): Ceiling on total USD this session
+            minute_tokens (int): Ceiling on tokens in any 60 second window
+            minute_cost (float): Ceiling on USD in any 60 second window
+            max_wait (float): Longest throttling sleep before giving up
+            keep_expensive (int): Most expensive calls kept for stats()
+        """
+        self.model = model
+        self.prices = MODEL_PRICES.get(model)
+        self.session_tokens = session_tokens
+        self.session_cost = session_cost
+        self.minute_tokens = minute_tokens
+        self.minute_cost = minute_cost
+        self.max_wait = max_wait
+        self.keep_expensive = keep_expensive
+
+        self._window = deque()
+        self._reserved = deque()
+        self._expensive = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.throttled_seconds = 0.0
+
+    @classmethod
+    def from_env(cls, model: str):
+        """Ceilings from BUDGET_SESSION_TOKENS, BUDGET_SESSION_COST, BUDGET_MINUTE_TOKENS and BUDGET_MINUTE_COST"""
+        session_tokens = _env_float('BUDGET_SESSION_TOKENS')
+        minute_tokens = _env_float('BUDGET_MINUTE_TOKENS')
+        return cls(
+            model,
+            session_tokens=int(session_tokens) if session_tokens else None,
+            session_cost=_env_float('BUDGET_SESSION_COST'),
+            minute_tokens=int(minute_tokens) if minute_tokens else None,
+            minute_cost=_env_float('BUDGET_MINUTE_COST'),
+            max_wait=_env_float('BUDGET_MAX_WAIT') or 60)
+
+    def call_cost(self, prompt_tokens: int, completion_tokens: int) -> float:
+        """USD for one call (0 for a model without a known price)"""
+        if not self.prices:
+            return 0.0
+        return (prompt_tokens * self.prices[0] + completion_tokens * self.prices[1]) / 1_000_000
+
+    def _expected(self):
+        if not self.calls:
+            return 0, 0.0
+        return (self.prompt_tokens + self.completion_tokens) / self.calls, self.cost / self.calls
+
+    def _expire(self, now: float):
+        for entries in (self._window, self._reserved):
+            while entries and entries[0][0] <= now - WINDOW_SECONDS:
+                entries.popleft()
+
+    def _wait_needed(self, now: float) -> float:
+        """Seconds until the window has room for one more average call"""
+        expected_tokens, expected_cost = self._expected()
+        entries = sorted(itertools.chain(self._window, self._reserved))
+        wait = 0.0
+        for limit, index, expected in ((self.minute_tokens, 1, expected_tokens), (self.minute_cost, 2, expected_cost)):
+            if limit is None:
+                continue
+            used = sum(entry[index] for entry in entries)
+            # Drop the oldest entries until the expected call fits
+            for timestamp, *amounts in entries:
+                if used + expected <= limit:
+                    break
+                used -= amounts[index - 1]
+                wait = max(wait, timestamp + WINDOW_SECONDS - now)
+        return wait
+
+    def acquire(self):
+        """
+        Wait for room under the per-minute ceilings before a call
+
+        Raises:
+            BudgetExceededError: If a session ceiling is reached, or the wait
+                would be longer than max_wait
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                total_tokens = self.prompt_tokens + self.completion_tokens
+                if self.session_tokens is not None and total_tokens >= self.session_tokens:
+                    raise BudgetExceededError(f"Session token budget of {self.session_tokens} reached")
+                if self.session_cost is not None and self.cost >= self.session_cost:
+                    raise BudgetExceededError(f"Session cost budget of ${self.session_cost:.4f} reached")
+                now = time.monotonic()
+                self._expire(now)
+                wait = self._wait_needed(now)
+                if wait <= 0:
+                    # Hold the room until record(), so the next caller sees it taken
+                    if self.calls and (self.minute_tokens is not None or self.minute_cost is not None):
+                        self._reserved.append((now, *self._expected()))
+                    return
+                if waited + wait > self.max_wait:
+                    raise BudgetExceededError(
+                        f"Per-minute budget needs a {waited + wait:.0f}s wait (max {self.max_wait:.0f}s)")
+                self.throttled_seconds += wait
+            # Others may take the room while this caller sleeps: check again after
+            traced_sleep(wait)
+            waited += wait
+
+    def record(self, usage, latency: float, label: str = None):
+        """
+        Account one call
+
+        Args:
+            usage: The response's usage (object or dict with prompt_tokens and
+                completion_tokens); None counts only the latency
+            latency (float): Seconds the call took
+            label (str): What was asked, shown for the most expensive calls
+        """
+        if isinstance(usage, dict):
+            prompt_tokens, completion_tokens = usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+        else:
+            prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+            completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        cost = self.call_cost(prompt_tokens, completion_tokens)
+
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.cost += cost
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+            self._window.append((time.monotonic(), prompt_tokens + completion_tokens, cost))
+            if self._reserved:
+                self._reserved.popleft()
+
+            entry = (prompt_tokens + completion_tokens, next(self._sequence), {
+                "label": label,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "cost": round(cost, 6),
+                "latency_ms": round(latency * 1000, 1)
+            })
+            if len(self._expensive) < self.keep_expensive:
+                heapq.heappush(self._expensive, entry)
+            else:
+                heapq.heappushpop(self._expensive, entry)
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._expire(time.monotonic())
+            calls = self.calls or 1
+            return {
+                "model": self.model,
+                "calls": self.calls,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "cost_usd": round(self.cost, 6),
+                "priced": self.prices is not None,
+                "last_minute_tokens": sum(entry[1] for entry in self._window),
+                "avg_latency_ms": round(self.total_latency / calls * 1000, 1),
+                "max_latency_ms": round(self.max_latency * 1000, 1),
+                "throttled_seconds": round(self.throttled_seconds, 2),
+                "limits": {
+                    "session_tokens": self.session_tokens,
+                    "session_cost": self.session_cost,
+                    "minute_tokens": self.minute_tokens,
+                    "minute_cost": self.minute_cost
+                },
+                "most_expensive": [entry[2] for entry in sorted(self._expensive, reverse=True)]
+            }
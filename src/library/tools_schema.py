@@ -35,6 +35,32 @@ def tools_schema():
                 }
             }
         },
+        {
+            "type": "function",
+            "function": {
+                "name": "find_wallets",
+                "description": "Look up tracked wallets that are not listed in the prompt, by address fragment and/or wallet type",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "query": {
+                            "type": "string",
+                            "description": "Part of the wallet address to search for (empty string matches all wallets)"
+                        },
+                        "wallet_type": {
+                            "type": "string",
+                            "enum": ["evm-smart-wallet", "solana-custodial-wallet"],
+                            "description": "Only return wallets of this type"
+                        },
+                        "limit": {
+                            "type": "integer",
+                            "description": "Maximum number of wallets to return (default 10)"
+                        }
+                    },
+                    "required": []
+                }
+            }
+        },
         {
             "type": "function",
             "function": {
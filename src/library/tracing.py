@@ -0,0 +1,215 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Span of the code currently running, per thread / asyncio task
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+_writer = None
+
+
+class _SpanWriter:
+    """Appends finished spans to a JSONL file, flushing when a root span ends"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "a")
+        self._lock = threading.Lock()
+
+    def write(self, record: dict, flush: bool):
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+            if flush:
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def configure(path: str = None):
+    """
+    Write spans to a JSONL file (None turns tracing off)
+
+    Defaults to the TRACE_FILE environment variable. While tracing is off,
+    span() and @traced cost one global lookup.
+    """
+    global _writer
+    path = path if path is not None else os.getenv('TRACE_FILE')
+    if _writer:
+        _writer.close()
+    _writer = _SpanWriter(path) if path else None
+    return _writer is not None
+
+
+def enabled() -> bool:
+    return _writer is not None
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Time a block as a span, nested under the span around it
+
+    Yields:
+        dict: The span's attributes, which the block may add to
+    """
+    if _writer is None:
+        yield attributes
+        return
+
+    parent = _current_span.get()
+    current = {
+        "trace_id": parent["trace_id"] if parent else uuid.uuid4().hex,
+        "span_id": uuid.uuid4().hex[:16],
+        "parent_id": parent["span_id"] if parent else None,
+        "name": name,
+        "thread": threading.current_thread().name,
+        "start": time.time(),
+        "attributes": attributes
+    }
+    token = _current_span.set(current)
+    started = time.perf_counter()
+    try:
+        yield attributes
+    except BaseException as e:
+        attributes.setdefault("error", repr(e))
+        raise
+    finally:
+        current["duration_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        _current_span.reset(token)
+        writer = _writer
+        if writer:
+            writer.write(current, flush=parent is None)
+
+
+def traced(name: str = None):
+    """
+    Decorator: run the function inside a span (default name: the function's)
+
+    A returned dict with a "status" key (the wallet_utils response format) is
+    recorded on the span.
+    """
+    def decorate(fn):
+        span_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _writer is None:
+                return fn(*args, **kwargs)
+            with span(span_name) as attributes:
+                result = fn(*args, **kwargs)
+                if isinstance(result, dict) and "status" in result:
+                    attributes["status"] = result["status"]
+                return result
+        return wrapper
+    return decorate
+
+
+def traced_sleep(seconds: float):
+    """time.sleep inside a "sleep" span, so fixed waits show up in traces"""
+    with span("sleep", seconds=seconds):
+        time.sleep(seconds)
+
+
+def load_traces(path: str) -> dict:
+    """trace_id -> list of spans, from a span file"""
+    traces = defaultdict(list)
+    with open(path) as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            traces[record["trace_id"]].append(record)
+    return traces
+
+
+def critical_path(spans: list, root: dict = None) -> list:
+    """
+    Critical path of one trace as (name, milliseconds) segments
+
+    From the end of each span, repeatedly step into the child that finished
+    last before the current point; time not covered by a child is the span's
+    own time. With sequential children this is every child; with parallel
+    ones only the chain that decided the end time. With `root` only that
+    root's spans are walked, otherwise every root of the trace.
+    """
+    children = defaultdict(list)
+    roots = []
+    for record in spans:
+        record["end"] = record["start"] + record["duration_ms"] / 1000
+        if record["parent_id"]:
+            children[record["parent_id"]].append(record)
+        else:
+            roots.append(record)
+
+    def walk(record):
+        segments = []
+        cursor = record["end"]
+        pending = sorted(children[record["span_id"]], key=lambda child: child["end"], reverse=True)
+        own = f"{record['name']} (self)" if pending else record["name"]
+        for child in pending:
+            if child["end"] > cursor or child["start"] < record["start"]:
+                continue
+            segments.append((own, (cursor - child["end"]) * 1000))
+            segments.extend(walk(child))
+            cursor = child["start"]
+        segments.append((own, (cursor - record["start"]) * 1000))
+        return segments
+
+    return [segment for record in ([root] if root else roots) for segment in walk(record)]
+
+
+def summarize(path: str, top: int = 8, root_name: str = "turn") -> list:
+    """
+    Print a critical-path breakdown for each traced turn in a span file
+
+    A trace with a `root_name` root is reported root by root, so spans that
+    ended up in the same trace outside the turn (background work, or several
+    turns sharing an id) get their own breakdown instead of being dropped.
+
+    Returns:
+        list: One {"trace_id", "name", "root", "total_ms", "breakdown"} dict per root
+    """
+    summaries = []
+    for trace_id, spans in load_traces(path).items():
+        roots = [record for record in spans if not record["parent_id"]]
+        if not any(record["name"] == root_name for record in roots):
+            continue
+        for root in sorted(roots, key=lambda record: record["start"]):
+            breakdown = defaultdict(float)
+            for name, ms in critical_path(spans, root):
+                breakdown[name] += ms
+            ordered = sorted(((name, round(ms, 1)) for name, ms in breakdown.items() if ms >= 0.05),
+                             key=lambda item: item[1], reverse=True)
+            summaries.append({
+                "trace_id": trace_id,
+                "name": root["name"],
+                "root": root["attributes"],
+                "total_ms": root["duration_ms"],
+                "breakdown": ordered
+            })
+
+            print(f"\n{root['name']} {json.dumps(root['attributes'])}: {root['duration_ms']:.1f} ms")
+            for name, ms in ordered[:top]:
+                share = ms / root["duration_ms"] * 100 if root["duration_ms"] else 0
+                print(f"  {ms:>10.1f} ms  {share:5.1f}%  {name}")
+    return summaries
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Per-turn critical-path breakdown of a span file")
+    parser.add_argument("path", nargs="?", default=os.getenv('TRACE_FILE', 'traces.jsonl'))
+    parser.add_argument("--top", type=int, default=8, help="Segments shown per turn")
+    args = parser.parse_args()
+    summarize(args.path, args.top)
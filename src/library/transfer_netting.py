@@ -0,0 +1,360 @@
+import itertools
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import Future
+from datetime import datetime
+
+from library.addresses import address_key, validate_addresses
+from library.keyed_executor import KeyedExecutor
+from library.wallet_utils import transfer_usdc
+
+PAIRWISE = "pairwise"
+MINIMAL = "minimal"
+
+
+def net_pairwise(intents: list) -> list:
+    """
+    Net transfers between the same two wallets, in both directions
+
+    Args:
+        intents (list): {"id", "from", "to", "amount"} dicts, amounts in base units
+
+    Returns:
+        list: One {"from", "to", "amount", "intents"} settlement per pair with a
+        non-zero net flow; "intents" lists every intent between the pair
+    """
+    pairs = {}
+    for intent in intents:
+        a, b = address_key(intent["from"]), address_key(intent["to"])
+        key = (a, b) if a <= b else (b, a)
+        pair = pairs.setdefault(key, {"addresses": {}, "net": 0, "intents": []})
+        pair["addresses"][a] = intent["from"]
+        pair["addresses"][b] = intent["to"]
+        # Positive net flows from key[0] to key[1]; a wallet paying itself nets out
+        if a != b:
+            pair["net"] += intent["amount"] if a == key[0] else -intent["amount"]
+        pair["intents"].append(intent["id"])
+
+    settlements = []
+    for (first, second), pair in pairs.items():
+        if pair["net"] == 0:
+            continue
+        payer, payee = (first, second) if pair["net"] > 0 else (second, first)
+        settlements.append({
+            "from": pair["addresses"][payer],
+            "to": pair["addresses"][payee],
+            "amount": abs(pair["net"]),
+            "intents": pair["intents"]
+        })
+    return settlements
+
+
+def _groups(intents: list) -> list:
+    """Intents split into groups of wallets connected by any transfer between them"""
+    parent = {}
+
+    def find(key):
+        while parent.setdefault(key, key) != key:
+            parent[key] = parent[parent[key]]
+            key = parent[key]
+        return key
+
+    for intent in intents:
+        parent[find(address_key(intent["from"]))] = find(address_key(intent["to"]))
+
+    groups = {}
+    for intent in intents:
+        groups.setdefault(find(address_key(intent["from"])), []).append(intent)
+    return list(groups.values())
+
+
+def minimal_settlement(intents: list) -> list:
+    """
+    Settle a group of transfers with few transfers between net payers and payees
+
+    The intents are split into groups of wallets connected by transfers. In
+    each group, every wallet's net position (received minus sent) is computed,
+    then the largest remaining debtor pays the largest remaining creditor until
+    every position is zero: at most one transfer fewer than the wallets
+    involved. A wallet may end up paying a wallet it never sent to directly,
+    so use this only for groups of wallets you control (treasury shards, test
+    wallets).
+
+    Args:
+        intents (list): {"id", "from", "to", "amount"} dicts, amounts in base units
+
+    Returns:
+        list: {"from", "to", "amount", "intents"} settlements; "intents" lists
+        every intent of the settlement's group, since any of them may have been
+        offset by it
+    """
+    settlements = []
+    for group in _groups(intents):
+        positions = defaultdict(int)
+        addresses = {}
+        for intent in group:
+            payer, payee = address_key(intent["from"]), address_key(intent["to"])
+            addresses[payer], addresses[payee] = intent["from"], intent["to"]
+            positions[payer] -= intent["amount"]
+            positions[payee] += intent["amount"]
+        group_ids = [intent["id"] for intent in group]
+
+        debtors = sorted(([-amount, key] for key, amount in positions.items() if amount < 0), reverse=True)
+        creditors = sorted(([amount, key] for key, amount in positions.items() if amount > 0), reverse=True)
+        while debtors and creditors:
+            debt, creditor = debtors[0], creditors[0]
+            amount = min(debt[0], creditor[0])
+            settlements.append({
+                "from": addresses[debt[1]],
+                "to": addresses[creditor[1]],
+                "amount": amount,
+                "intents": group_ids
+            })
+            debt[0] -= amount
+            creditor[0] -= amount
+            if not debt[0]:
+                debtors.pop(0)
+            if not creditor[0]:
+                creditors.pop(0)
+            debtors.sort(reverse=True)
+            creditors.sort(reverse=True)
+    return settlements
+
+
+class TransferNetter:
+    """
+    Collects transfer intents for a short window and submits only their net
+
+    submit() queues an intent and returns a Future; it never waits for a
+    settlement. When the window closes (`window` seconds after its first
+    intent on a timer thread, or at max_intents on a new settling thread) the
+    intents
+    are netted per wallet pair (PAIRWISE) or across the whole group (MINIMAL)
+    and the resulting transfers go through transfer_usdc, in parallel across
+    source wallets and in order per wallet. Each Future then resolves with the
+    settlement transfers that carried or offset its intent, and fails if any
+    of them failed; an intent whose group netted out to nothing resolves
+    without any transfer.
+
+    Every window is kept in `audit` (intent -> settlement ids, settlement ->
+    transaction). With a TransactionJournal, the intents are journaled as
+    kind "netted_intent" and each settlement as a regular "transfer"
+    operation under its settlement id, so the mapping survives restarts.
+    """
+
+    def __init__(self, api_key: str, chain: str = "base-sepolia", window: float = 0.5,
+                 mode: str = PAIRWISE, max_intents: int = 1000, private_key: str = None,
+                 signer_pool=None, journal=None, ledger=None, max_workers: int = 8, keep_audit: int = 100):
+        """
+        Args:
+            api_key (str): Crossmint API key
+            chain (str): Blockchain network (default: "base-sepolia")
+            window (float): Seconds intents are collected before netting
+            mode (str): PAIRWISE (net each wallet pair) or MINIMAL (settle the group)
+            max_intents (int): Close the window early at this many intents
+            private_key (str): Admin signer key of the source wallets
+            signer_pool (SignerPool): Signers of the source wallets, instead of private_key
+            journal (TransactionJournal): Durable audit of intents and settlements
+            ledger (BalanceLedger): Updated with each submitted settlement
+            max_workers (int): Settlements submitted at once (different source wallets)
+            keep_audit (int): Windows kept in `audit`
+        """
+        if mode not in (PAIRWISE, MINIMAL):
+            raise ValueError(f"Unknown netting mode: {mode}")
+        self.api_key = api_key
+        self.chain = chain
+        self.window = window
+        self.mode = mode
+        self.max_intents = max_intents
+        self.private_key = private_key
+        self.signer_pool = signer_pool
+        self.journal = journal
+        self.ledger = ledger
+        self.keep_audit = keep_audit
+        self._executor = KeyedExecutor(max_workers=max_workers)
+        self._lock = threading.Lock()
+        self._pending = []
+        self._timer = None
+        self._settling = set()
+        self._windows = itertools.count(1)
+        # Window ids stay unique across restarts sharing one journal
+        self._run_id = uuid.uuid4().hex[:8]
+        self.audit = {}
+        self.intents = 0
+        self.settlements = 0
+        self.windows = 0
+
+    def submit(self, from_wallet_address: str, to_wallet_address: str, amount: int, intent_id: str = None) -> Future:
+        """
+        Queue a transfer intent for the current window
+
+        Args:
+            from_wallet_address (str): Source wallet address
+            to_wallet_address (str): Destination wallet address
+            amount (int): Amount in USDC base units (1000000 = 1 USDC)
+            intent_id (str): Caller's id for the intent (default: a new one)
+
+        Returns:
+            Future: Resolves to a response with the intent's "settled_by" settlements
+        """
+        future = Future()
+        checked = validate_addresses([from_wallet_address, to_wallet_address])
+        if checked["invalid"] or amount <= 0:
+            future.set_result({
+                "status": "error",
+                "error": checked["invalid"][0]["error"] if checked["invalid"] else f"Invalid amount: {amount}",
+                "timestamp": datetime.utcnow().isoformat()
+            })
+            return future
+
+        from_wallet_address, to_wallet_address = checked["valid"]
+        intent = {
+            "id": intent_id or f"intent-{uuid.uuid4().hex[:12]}",
+            "from": from_wallet_address,
+            "to": to_wallet_address,
+            "amount": amount,
+            "future": future
+        }
+        with self._lock:
+            self._pending.append(intent)
+            self.intents += 1
+            if len(self._pending) >= self.max_intents:
+                # Settle the full window off the caller's thread, like the timer does
+                window_id, intents = self._close_window()
+                thread = threading.Thread(target=self._settle_closed, args=(window_id, intents),
+                                          name=f"netting-{window_id}", daemon=True)
+                self._settling.add(thread)
+                thread.start()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.window, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        return future
+
+    def _close_window(self) -> tuple:
+        """Take the pending intents as a new window; call with the lock held"""
+        intents, self._pending = self._pending, []
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not intents:
+            return None, []
+        self.windows += 1
+        return f"window-{self._run_id}-{next(self._windows)}", intents
+
+    def _settle_closed(self, window_id: str, intents: list):
+        try:
+            self._settle(window_id, intents)
+        finally:
+            with self._lock:
+                self._settling.discard(threading.current_thread())
+
+    def flush(self) -> dict:
+        """Net and submit the intents collected so far; returns the window's audit entry"""
+        with self._lock:
+            window_id, intents = self._close_window()
+        if not intents:
+            return None
+        return self._settle(window_id, intents)
+
+    def _settle(self, window_id: str, intents: list) -> dict:
+        started = time.perf_counter()
+        plain = [{key: intent[key] for key in ("id", "from", "to", "amount")} for intent in intents]
+        net = net_pairwise if self.mode == PAIRWISE else minimal_settlement
+        settlements = net(plain)
+        for index, settlement in enumerate(settlements):
+            settlement["id"] = f"{window_id}-settlement-{index}"
+
+        if self.journal:
+            for intent in plain:
+                self.journal.record(intent["id"], "netted", kind="netted_intent", window=window_id,
+                                    from_wallet_address=intent["from"], to_wallet_address=intent["to"],
+                                    amount=intent["amount"])
+
+        futures = {
+            settlement["id"]: self._executor.submit(settlement["from"], self._submit, settlement)
+            for settlement in settlements
+        }
+        results = {}
+        for settlement_id, future in futures.items():
+            try:
+                results[settlement_id] = future.result()
+            except Exception as e:
+                # Fails the intents of this settlement only, and every future still resolves
+                results[settlement_id] = {"status": "error", "error": str(e)}
+
+        settled_by = defaultdict(list)
+        for settlement in settlements:
+            response = results[settlement["id"]]
+            settlement["status"] = response.get("status")
+            settlement["transaction_id"] = response.get("transaction_data", {}).get("id")
+            if response.get("status") != "success":
+                settlement["error"] = response.get("error")
+            for intent_id in settlement["intents"]:
+                settled_by[intent_id].append(settlement["id"])
+
+        failed = {settlement["id"] for settlement in settlements if settlement["status"] != "success"}
+        for intent in intents:
+            intent_settlements = settled_by.get(intent["id"], [])
+            ok = not failed.intersection(intent_settlements)
+            if self.journal:
+                self.journal.record(intent["id"], "completed" if ok else "failed", settled_by=intent_settlements)
+            intent["future"].set_result({
+                "status": "success" if ok else "error",
+                "intent_id": intent["id"],
+                "window": window_id,
+                "netted_out": not intent_settlements,
+                "settled_by": [
+                    {key: settlement.get(key) for key in ("id", "from", "to", "amount", "status", "transaction_id", "error")}
+                    for settlement in settlements if settlement["id"] in intent_settlements
+                ],
+                "timestamp": datetime.utcnow().isoformat()
+            })
+
+        entry = {
+            "window": window_id,
+            "mode": self.mode,
+            "intents": {intent["id"]: settled_by.get(intent["id"], []) for intent in plain},
+            "settlements": settlements,
+            "gross_amount": sum(intent["amount"] for intent in plain),
+            "net_amount": sum(settlement["amount"] for settlement in settlements),
+            "elapsed_seconds": round(time.perf_counter() - started, 3),
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        with self._lock:
+            self.settlements += len(settlements)
+            self.audit[window_id] = entry
+            while len(self.audit) > self.keep_audit:
+                self.audit.pop(next(iter(self.audit)))
+        return entry
+
+    def _submit(self, settlement: dict) -> dict:
+        response = transfer_usdc(
+            self.api_key, settlement["from"], settlement["to"], settlement["amount"], self.chain,
+            self.private_key, signer_pool=self.signer_pool,
+            journal=self.journal, op_id=settlement["id"] if self.journal else None)
+        if response.get("status") == "success" and self.ledger:
+            self.ledger.apply_transfer(settlement["from"], settlement["to"], settlement["amount"])
+        return response
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "intents": self.intents,
+                "windows": self.windows,
+                "settlements": self.settlements,
+                "transfers_saved": self.intents - len(self._pending) - self.settlements,
+                "pending": len(self._pending)
+            }
+
+    def close(self):
+        """Submit what is still pending, wait for windows being settled, then stop the executor"""
+        self.flush()
+        with self._lock:
+            settling = list(self._settling)
+        for thread in settling:
+            thread.join()
+        self._executor.shutdown()
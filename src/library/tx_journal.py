@@ -0,0 +1,231 @@
+import glob
+import json
+import os
+import queue
+import threading
+import time
+
+from library.wallet_utils import (
+    TERMINAL_TRANSACTION_STATUSES, approve_transaction, create_transaction, get_transaction,
+    wait_for_transaction
+)
+
+TERMINAL_STATES = ("confirmed", "failed", "completed")
+
+SEGMENT_PATTERN = "journal-{:06d}.log"
+
+_FLUSH = "flush"
+_STOP = "stop"
+_ROTATE = "rotate"
+
+
+class TransactionJournal:
+    """
+    Durable append-only log of wallet operation state transitions
+
+    record() updates the in-memory state and hands the entry to a background
+    writer, so callers never wait on disk. The writer appends JSON lines to
+    segment files and fsyncs once per batch (every fsync_interval seconds or
+    fsync_batch entries). On startup the segments are replayed, so get() and
+    in_flight() reflect everything recorded before a crash; a torn last line
+    from a crash mid-write is skipped.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = 16 * 1024 * 1024,
+                 fsync_interval: float = 0.05, fsync_batch: int = 256):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.fsync_interval = fsync_interval
+        self.fsync_batch = fsync_batch
+        os.makedirs(directory, exist_ok=True)
+
+        self._ops = self.replay(directory)
+        self._lock = threading.Lock()
+        self._queue = queue.SimpleQueue()
+        self._segment_index = max(self._segment_indexes(directory), default=0) + 1
+        self._file = open(self._segment_path(self._segment_index), "ab")
+        self._compacted_from = 0
+        self.records_written = 0
+        self.fsyncs = 0
+
+        self._writer = threading.Thread(target=self._write_loop, name="tx-journal-writer", daemon=True)
+        self._writer.start()
+
+    @staticmethod
+    def _segment_indexes(directory: str):
+        for path in glob.glob(os.path.join(directory, "journal-*.log")):
+            yield int(os.path.basename(path)[len("journal-"):-len(".log")])
+
+    def _segment_path(self, index: int) -> str:
+        return os.path.join(self.directory, SEGMENT_PATTERN.format(index))
+
+    @classmethod
+    def replay(cls, directory: str) -> dict:
+        """
+        Rebuild operation state from the journal segments
+
+        Returns:
+            dict: op_id -> merged data of all its records, with "state" set to the
+            latest state and "history" listing the states in order
+        """
+        ops = {}
+        for index in sorted(cls._segment_indexes(directory)):
+            with open(os.path.join(directory, SEGMENT_PATTERN.format(index)), "rb") as segment:
+                for line in segment:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Torn write from a crash, nothing after it was acknowledged
+                        continue
+                    cls._apply(ops, entry)
+        return ops
+
+    @staticmethod
+    def _apply(ops: dict, entry: dict):
+        op = ops.setdefault(entry["op"], {"history": []})
+        op.update({key: value for key, value in entry.items() if key not in ("op", "history")})
+        op["history"].append(entry["state"])
+
+    def record(self, op_id: str, state: str, **data):
+        """Record that an operation reached a state; returns without touching disk"""
+        entry = {"op": op_id, "state": state, "ts": time.time(), **data}
+        with self._lock:
+            self._apply(self._ops, entry)
+        self._queue.put(entry)
+
+    def get(self, op_id: str):
+        """Current state and data of an operation, or None"""
+        with self._lock:
+            op = self._ops.get(op_id)
+            return dict(op) if op else None
+
+    def in_flight(self, kind: str = None) -> dict:
+        """Operations that have not reached a terminal state, optionally of one kind"""
+        with self._lock:
+            return {
+                op_id: dict(op) for op_id, op in self._ops.items()
+                if op["state"] not in TERMINAL_STATES and (kind is None or op.get("kind") == kind)
+            }
+
+    def flush(self, timeout: float = None):
+        """Block until every record so far is written and fsynced"""
+        done = threading.Event()
+        self._queue.put((_FLUSH, done))
+        done.wait(timeout)
+
+    def close(self):
+        done = threading.Event()
+        self._queue.put((_STOP, done))
+        done.wait()
+        self._writer.join()
+
+    def compact(self):
+        """Rewrite the journal keeping only in-flight operations, then drop old segments"""
+        with self._lock:
+            live = {op_id: op for op_id, op in self._ops.items() if op["state"] not in TERMINAL_STATES}
+            # Start a fresh segment, then write one snapshot entry per live operation
+            self._queue.put((_ROTATE, None))
+            self._ops = {}
+            for op_id, op in live.items():
+                entry = {key: value for key, value in op.items() if key != "history"}
+                entry["op"] = op_id
+                self._apply(self._ops, entry)
+                self._queue.put(entry)
+        self.flush()
+
+        for index in list(self._segment_indexes(self.directory)):
+            if index < self._compacted_from:
+                os.remove(self._segment_path(index))
+
+    def _rotate(self):
+        self._file.close()
+        self._segment_index += 1
+        self._file = open(self._segment_path(self._segment_index), "ab")
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.fsync_interval
+            while len(batch) < self.fsync_batch and not isinstance(batch[-1], tuple):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            control = batch.pop() if isinstance(batch[-1], tuple) else None
+            if batch:
+                self._file.write(b"".join(json.dumps(entry).encode() + b"\n" for entry in batch))
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self.records_written += len(batch)
+                self.fsyncs += 1
+                if self._file.tell() >= self.segment_bytes:
+                    self._rotate()
+
+            if control:
+                command, done = control
+                if command == _ROTATE:
+                    self._rotate()
+                    self._compacted_from = self._segment_index
+                elif command == _STOP:
+                    self._file.close()
+                    done.set()
+                    return
+                else:
+                    done.set()
+
+
+def resume_transaction(journal: TransactionJournal, api_key: str, op_id: str,
+                       private_key: str = None, signer_pool=None, confirm_timeout: float = 60) -> dict:
+    """
+    Finish an interrupted transaction from its last journaled state
+
+    Only the missing steps run: an "intent" is created, a "created" transaction
+    is signed and approved if Crossmint still has it awaiting approval (any
+    other live status is adopted), an "approved" one is only confirmed. If the process
+    died between sending create_transaction and journaling "created", a second
+    transaction is created; the first was never approved, so it cannot execute.
+
+    Returns:
+        dict: The wait_for_transaction response, or the error that stopped it
+    """
+    op = journal.get(op_id)
+    if op is None:
+        return {"status": "error", "error": f"Unknown journal operation {op_id}"}
+    wallet_address = op["wallet_address"]
+
+    if op["state"] == "intent":
+        response = create_transaction(api_key, wallet_address, op.get("chain", "base-sepolia"), op.get("params"))
+        if response.get("status") != "success":
+            journal.record(op_id, "failed", error=response.get("error"))
+            return response
+        op["transaction_data"] = response["transaction_data"]
+        op["state"] = "created"
+        journal.record(op_id, "created", transaction_data=op["transaction_data"])
+
+    if op["state"] in ("created", "signed"):
+        # The approval may have gone through before the crash; only sign what still awaits it
+        live = get_transaction(api_key, wallet_address, op["transaction_data"]["id"])
+        if live.get("status") != "success":
+            return live
+        status = live["transaction_data"].get("status")
+        if status in TERMINAL_TRANSACTION_STATUSES:
+            journal.record(op_id, "confirmed" if status == "success" else "failed", final_status=status)
+            return live
+        if status == "awaiting-approval":
+            op["transaction_data"] = live["transaction_data"]
+            response = approve_transaction(api_key, wallet_address, op["transaction_data"], private_key, signer_pool)
+            if response.get("status") != "success":
+                if response.get("status") == "error":
+                    journal.record(op_id, "failed", error=response.get("error"))
+                return response
+        journal.record(op_id, "approved")
+
+    response = wait_for_transaction(api_key, wallet_address, op["transaction_data"]["id"], confirm_timeout)
+    if response.get("status") == "success":
+        final_state = "confirmed" if response["transaction_data"]["status"] == "success" else "failed"
+        journal.record(op_id, final_state, final_status=response["transaction_data"]["status"])
+    return response
@@ -0,0 +1,350 @@
+import os
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+
+from library.signer_pool import SignerPool
+from library.wallet_utils import (
+    build_transfer_params, create_transaction,
+    submit_transaction_approvals, wait_for_transaction
+)
+
+STAGES = ("create", "sign", "approve", "confirm")
+
+# Journal state recorded when a stage hands a job to the next one, and the stage
+# an operation in that state resumes at
+COMPLETED_STATES = {"create": "created", "sign": "signed", "approve": "approved"}
+RESUME_STAGES = {"intent": "create", "created": "sign", "signed": "approve", "approved": "confirm"}
+
+_STOP = object()
+
+# Worker-process signer pool, built once per process by _init_sign_worker
+_worker_signer_pool = None
+
+
+def _init_sign_worker(private_keys):
+    global _worker_signer_pool
+    _worker_signer_pool = SignerPool(private_keys, max_workers=1)
+
+
+def _sign_in_worker(transaction_data: dict) -> list:
+    return _worker_signer_pool.sign_pending(transaction_data)
+
+
+class StageStats:
+    """Throughput and latency counters for one pipeline stage"""
+
+    def __init__(self, name: str, stage_queue: queue.Queue, workers: int):
+        self.name = name
+        self.queue = stage_queue
+        self.workers = workers
+        self.in_flight = 0
+        self.processed = 0
+        self.failed = 0
+        self.total_wait = 0.0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self._lock = threading.Lock()
+
+    def started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def record(self, wait: float, latency: float, failed: bool):
+        with self._lock:
+            self.in_flight -= 1
+            self.processed += 1
+            self.failed += int(failed)
+            self.total_wait += wait
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            processed = self.processed or 1
+            avg_latency = self.total_latency / processed
+            return {
+                "workers": self.workers,
+                "queue_depth": self.queue.qsize(),
+                "in_flight": self.in_flight,
+                "processed": self.processed,
+                "failed": self.failed,
+                "avg_queue_wait_ms": round(self.total_wait / processed * 1000, 2),
+                "avg_latency_ms": round(avg_latency * 1000, 2),
+                "max_latency_ms": round(self.max_latency * 1000, 2),
+                # Transactions per second this stage can sustain with its workers
+                "capacity_per_second": round(self.workers / avg_latency, 2) if self.processed and avg_latency else None
+            }
+
+
+class TransactionPipeline:
+    """
+    Staged create -> sign -> approve -> confirm engine
+
+    Each stage has its own bounded queue and worker threads, so many transactions
+    are in different stages at once and throughput is set by the slowest stage.
+    HTTP stages run on I/O threads; signing runs on a process pool when
+    cpu_workers > 0 (otherwise on the signer pool's threads), fed by at least
+    two sign-stage threads so one slow signature does not stall the stage. A full queue blocks
+    the stage feeding it, which keeps memory bounded under load.
+
+    Results are delivered through the Future returned by submit(), in the same
+    dict format as the wallet_utils functions.
+    """
+
+    def __init__(self, api_key: str, signer_pool: SignerPool, chain: str = "base-sepolia",
+                 io_workers: int = 8, cpu_workers: int = None, confirm_workers: int = 32,
+                 queue_size: int = 64, confirm_timeout: float = 120, poll_interval: float = 2,
+                 waiter=None, journal=None):
+        """
+        Args:
+            api_key (str): Crossmint API key
+            signer_pool (SignerPool): Signers for the pending approvals
+            chain (str): Blockchain network (default: "base-sepolia")
+            io_workers (int): Threads for the create and approve stages
+            cpu_workers (int): Signing processes (default: CPU count, 0 signs in-process)
+            confirm_workers (int): Threads waiting for transactions to confirm
+            queue_size (int): Capacity of each stage's input queue
+            confirm_timeout (float): Seconds to wait for a terminal status
+            poll_interval (float): Seconds between status polls
+            waiter (callable): Replaces polling in the confirm stage, called as
+                waiter(wallet_address, transaction_id, timeout) -> get_transaction response
+            journal (TransactionJournal): Records every stage transition, see resume()
+
+        Raises:
+            ValueError: If a worker count is out of range
+        """
+        self.api_key = api_key
+        self.signer_pool = signer_pool
+        self.chain = chain
+        self.confirm_timeout = confirm_timeout
+        self.poll_interval = poll_interval
+        self.waiter = waiter
+        self.journal = journal
+
+        if cpu_workers is None:
+            cpu_workers = os.cpu_count() or 1
+        if cpu_workers < 0:
+            raise ValueError(f"cpu_workers must be 0 (sign in-process) or more, got {cpu_workers}")
+        if io_workers < 1 or confirm_workers < 1:
+            raise ValueError(f"io_workers and confirm_workers must be at least 1, got {io_workers} and {confirm_workers}")
+        self._cpu_pool = None
+        if cpu_workers > 0:
+            self._cpu_pool = ProcessPoolExecutor(
+                max_workers=cpu_workers,
+                initializer=_init_sign_worker,
+                initargs=(signer_pool.private_keys(),))
+
+        workers = {
+            "create": io_workers,
+            "sign": max(cpu_workers, 2),
+            "approve": io_workers,
+            "confirm": confirm_workers
+        }
+        handlers = {
+            "create": self._create,
+            "sign": self._sign,
+            "approve": self._approve,
+            "confirm": self._confirm
+        }
+
+        self._queues = {stage: queue.Queue(maxsize=queue_size) for stage in STAGES}
+        self._stats = {stage: StageStats(stage, self._queues[stage], workers[stage]) for stage in STAGES}
+        self._threads = {stage: [] for stage in STAGES}
+        self._closed = False
+
+        for stage in STAGES:
+            for i in range(workers[stage]):
+                thread = threading.Thread(
+                    target=self._run_stage, args=(stage, handlers[stage]),
+                    name=f"pipeline-{stage}-{i}", daemon=True)
+                thread.start()
+                self._threads[stage].append(thread)
+
+    def submit(self, wallet_address: str, params: dict = None, start_stage: str = "create",
+               op_id: str = None, **job_fields) -> Future:
+        """
+        Queue a transaction; blocks while the first stage's queue is full
+
+        Args:
+            wallet_address (str): Wallet sending the transaction
+            params (dict): create_transaction params (None for the default call)
+            start_stage (str): Stage to enter the pipeline at, for transactions
+                that already went through earlier stages
+            **job_fields: Pre-filled job state for later stages, such as
+                transaction_data for "sign" or "approve"
+            op_id (str): Journal operation id (generated when a journal is set)
+
+        Returns:
+            Future: Resolves to the confirm result or the first error
+        """
+        if self._closed:
+            raise RuntimeError("Pipeline is closed")
+
+        future = Future()
+        job = {
+            "wallet_address": wallet_address,
+            "params": params,
+            "future": future,
+            "timings": {},
+            **job_fields
+        }
+        if self.journal:
+            job["op_id"] = op_id or str(uuid.uuid4())
+            if start_stage == "create":
+                self.journal.record(job["op_id"], "intent", kind="transaction",
+                                    wallet_address=wallet_address, chain=self.chain, params=params)
+        self._enqueue(start_stage, job)
+        return future
+
+    def resume(self) -> dict:
+        """
+        Re-queue every in-flight journaled transaction at the stage it stopped at
+
+        Returns:
+            dict: op_id -> Future for each resumed transaction
+        """
+        futures = {}
+        for op_id, op in self.journal.in_flight(kind="transaction").items():
+            stage = RESUME_STAGES.get(op["state"])
+            if stage is None:
+                continue
+            fields = {key: op[key] for key in ("transaction_data", "approvals") if key in op}
+            futures[op_id] = self.submit(op["wallet_address"], op.get("params"), stage, op_id, **fields)
+        return futures
+
+    def submit_transfer(self, from_wallet_address: str, to_wallet_address: str, amount: int) -> Future:
+        """Queue a USDC transfer (amount in base units)"""
+        params = build_transfer_params(to_wallet_address, amount, self.chain)
+        return self.submit(from_wallet_address, params)
+
+    def stats(self) -> dict:
+        """Per-stage queue depth, latency and capacity; the bottleneck has the lowest capacity"""
+        stages = {stage: self._stats[stage].snapshot() for stage in STAGES}
+        capacities = {stage: s["capacity_per_second"] for stage, s in stages.items() if s["capacity_per_second"]}
+        return {
+            "stages": stages,
+            "bottleneck": min(capacities, key=capacities.get) if capacities else None
+        }
+
+    def close(self, wait: bool = True):
+        """Stop accepting work and shut the stages down in order once drained"""
+        self._closed = True
+        for stage in STAGES:
+            for _ in self._threads[stage]:
+                self._queues[stage].put(_STOP)
+            if wait:
+                for thread in self._threads[stage]:
+                    thread.join()
+        if self._cpu_pool:
+            self._cpu_pool.shutdown(wait=wait)
+
+    def _enqueue(self, stage: str, job: dict):
+        job["enqueued_at"] = time.perf_counter()
+        self._queues[stage].put(job)
+
+    def _run_stage(self, stage: str, handler):
+        stats = self._stats[stage]
+        stage_queue = self._queues[stage]
+
+        while True:
+            job = stage_queue.get()
+            if job is _STOP:
+                return
+
+            started = time.perf_counter()
+            wait = started - job["enqueued_at"]
+            stats.started()
+            try:
+                result = handler(job)
+            except Exception as e:
+                result = {"status": "error", "error": str(e), "timestamp": datetime.utcnow().isoformat()}
+
+            latency = time.perf_counter() - started
+            job["timings"][stage] = round(latency * 1000, 2)
+            failed = isinstance(result, dict) and result.get("status") != "success"
+            stats.record(wait, latency, failed)
+
+            if isinstance(result, str):
+                # Handler returned the next stage
+                self._journal_stage(job, stage)
+                self._enqueue(result, job)
+            else:
+                self._journal_result(job, stage, result)
+                self._finish(job, result)
+
+    def _journal_stage(self, job: dict, stage: str):
+        if not (self.journal and job.get("op_id")):
+            return
+        data = {}
+        if stage == "create":
+            data["transaction_data"] = job["transaction_data"]
+        elif stage == "sign":
+            data["approvals"] = job["approvals"]
+        self.journal.record(job["op_id"], COMPLETED_STATES[stage], **data)
+
+    def _journal_result(self, job: dict, stage: str, result: dict):
+        if not (self.journal and job.get("op_id")):
+            return
+        status = (result.get("transaction_data") or {}).get("status")
+        if result.get("status") == "success":
+            self.journal.record(job["op_id"], "confirmed" if status == "success" else "failed", final_status=status)
+        elif stage != "confirm":
+            self.journal.record(job["op_id"], "failed", error=result.get("error"))
+        # A confirm timeout stays "approved": the transaction may still land, so
+        # resume() only checks on it again
+
+    def _finish(self, job: dict, result: dict):
+        result = dict(result)
+        result["pipeline"] = {"stage_latency_ms": job["timings"]}
+        job["future"].set_result(result)
+
+    def _create(self, job: dict):
+        response = create_transaction(self.api_key, job["wallet_address"], self.chain, job["params"])
+        if response.get("status") != "success":
+            return response
+
+        transaction_data = response["transaction_data"]
+        if transaction_data.get("status") != "awaiting-approval":
+            return {
+                "status": "error",
+                "error": f"Unexpected transaction status: {transaction_data.get('status')}",
+                "transaction_data": transaction_data,
+                "timestamp": datetime.utcnow().isoformat()
+            }
+        job["transaction_data"] = transaction_data
+        return "sign"
+
+    def _sign(self, job: dict):
+        if self._cpu_pool:
+            approvals = self._cpu_pool.submit(_sign_in_worker, job["transaction_data"]).result()
+        else:
+            approvals = self.signer_pool.sign_pending(job["transaction_data"])
+
+        if not approvals:
+            return {
+                "status": "error",
+                "error": "No pending approval matches a signer in the signer pool",
+                "transaction_data": job["transaction_data"],
+                "timestamp": datetime.utcnow().isoformat()
+            }
+        job["approvals"] = approvals
+        return "approve"
+
+    def _approve(self, job: dict):
+        response = submit_transaction_approvals(
+            self.api_key, job["wallet_address"], job["transaction_data"]["id"], job["approvals"])
+        if response.get("status") != "success":
+            return response
+        return "confirm"
+
+    def _confirm(self, job: dict):
+        transaction_id = job["transaction_data"]["id"]
+        if self.waiter:
+            return self.waiter(job["wallet_address"], transaction_id, self.confirm_timeout)
+        return wait_for_transaction(
+            self.api_key, job["wallet_address"], transaction_id,
+            self.confirm_timeout, self.poll_interval)
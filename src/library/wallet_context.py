@@ -0,0 +1,54 @@
+DEFAULT_TOKEN_BUDGET = 300
+
+# Rough size of a token for English text and hex addresses. Good enough to keep
+# the prompt bounded without pulling in a tokenizer.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate the number of prompt tokens for a piece of text"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def build_wallet_context(wallets, token_budget: int = DEFAULT_TOKEN_BUDGET) -> str:
+    """
+    Build the wallet section of the system prompt within a token budget
+
+    The section holds a summary of all tracked wallets followed by the most
+    recently used ones, as many as fit in the budget. The model is pointed at the
+    find_wallets tool for everything else, so the prompt size does not depend on
+    how many wallets are tracked.
+
+    Args:
+        wallets (WalletRegistry): The agent's tracked wallets
+        token_budget (int): Maximum approximate token count of the section
+
+    Returns:
+        str: The wallet context for the prompt
+    """
+    if not len(wallets):
+        return "No wallets created yet."
+
+    counts = wallets.count_by_type()
+    breakdown = ", ".join(f"{count} {wallet_type}" for wallet_type, count in sorted(counts.items()))
+    summary = f"Tracking {len(wallets)} wallets ({breakdown})."
+    footer = "Use the find_wallets tool to look up any wallet that is not listed here."
+
+    lines = [summary, "Most recently used wallets:"]
+    used = estimate_tokens("\n".join(lines + [footer]))
+
+    listed = 0
+    for wallet in wallets.recent(limit=max(token_budget // 10, 1)):
+        line = f"- {wallet.get('address', 'No address')} (Type: {wallet.get('type', 'unknown')})"
+        cost = estimate_tokens(line) + 1
+        if used + cost > token_budget:
+            break
+        lines.append(line)
+        used += cost
+        listed += 1
+
+    if listed == len(wallets):
+        # Everything fit, the lookup hint would only waste tokens
+        return "\n".join([summary, "Available wallets:"] + lines[2:])
+
+    return "\n".join(lines + [footer])
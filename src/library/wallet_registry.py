@@ -0,0 +1,103 @@
+import threading
+from collections import OrderedDict
+from itertools import islice
+
+from library.addresses import address_key
+
+
+class WalletRegistry:
+    """
+    In-memory store of the wallets an agent is tracking
+
+    Behaves like the list of wallet dicts the agents used before (len, iteration,
+    indexing) but also keeps an address index, a most-recently-used order and a
+    version counter that changes whenever the set of wallets changes.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._wallets = []
+        self._by_address = {}
+        self._recent = OrderedDict()
+        self._type_counts = {}
+        self.version = 0
+
+    @staticmethod
+    def _key(address: str) -> str:
+        return address_key(address)
+
+    def __len__(self):
+        return len(self._wallets)
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._wallets))
+
+    def __getitem__(self, index):
+        return self._wallets[index]
+
+    def add(self, wallet: dict):
+        """Track a wallet as returned by create_wallet"""
+        key = self._key(wallet.get("address"))
+        with self._lock:
+            if key in self._by_address:
+                self._by_address[key].update(wallet)
+            else:
+                self._wallets.append(wallet)
+                self._by_address[key] = wallet
+                wallet_type = wallet.get("type", "unknown")
+                self._type_counts[wallet_type] = self._type_counts.get(wallet_type, 0) + 1
+            self.version += 1
+        self.touch(key)
+        return wallet
+
+    def get(self, address: str):
+        """Return the tracked wallet for an address, or None"""
+        return self._by_address.get(self._key(address))
+
+    def touch(self, address: str):
+        """Mark a wallet as recently used"""
+        key = self._key(address)
+        with self._lock:
+            if key not in self._by_address:
+                return
+            self._recent.pop(key, None)
+            self._recent[key] = True
+
+    def recent(self, limit: int = 10):
+        """Most recently used wallets, newest first"""
+        with self._lock:
+            keys = list(islice(reversed(self._recent), limit))
+            return [self._by_address[key] for key in keys]
+
+    def count_by_type(self):
+        with self._lock:
+            return dict(self._type_counts)
+
+    def search(self, query: str = "", wallet_type: str = None, limit: int = 20):
+        """
+        Find tracked wallets by address substring and/or wallet type
+
+        Args:
+            query (str): Case-insensitive substring of the address (empty matches all)
+            wallet_type (str): Only return wallets of this type
+            limit (int): Maximum number of wallets to return
+
+        Returns:
+            list: Matching wallets, most recently used first
+        """
+        query = (query or "").strip().lower()
+        with self._lock:
+            # Every tracked wallet is in the recency order (add() touches it)
+            ordered = [self._by_address[key] for key in reversed(self._recent)]
+
+        matches = []
+        for wallet in ordered:
+            if query and query not in (wallet.get("address") or "").lower():
+                continue
+            if wallet_type and wallet.get("type") != wallet_type:
+                continue
+            matches.append(wallet)
+            if len(matches) >= limit:
+                break
+        return matches
@@ -1,12 +1,41 @@
 import requests
 import os
+import threading
+import time
 from datetime import datetime
-from web3 import Web3
-from eth_abi import encode
-from eth_utils import function_signature_to_4byte_selector
-from eth_account.messages import encode_defunct
 
+from library.addresses import is_valid_address, to_checksum_address
+from library.tracing import traced, traced_sleep
 
+# The eth_* packages (and web3 behind them) are slow to import, so they are
+# loaded inside the functions that sign or ABI-encode. Read-only calls such as
+# get_transaction never pay for them.
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def http_session() -> requests.Session:
+    """
+    Session shared by every Crossmint call, so TCP/TLS connections are reused
+
+    The connection pool holds HTTP_POOL_SIZE connections per host (default 32),
+    enough for the thread pools that call wallet_utils concurrently.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                pool_size = int(os.getenv('HTTP_POOL_SIZE', '32'))
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+@traced("http.create_wallet")
 def create_wallet(api_key: str, wallet_type: str, signer_address: str):
     """
     Create a new wallet using Crossmint API
@@ -38,7 +67,7 @@ def create_wallet(api_key: str, wallet_type: str, signer_address: str):
     }
 
     try:
-        response = requests.post(
+        response = http_session().post(
             endpoint,
             json=payload,
             headers=headers
@@ -72,6 +101,36 @@ def create_wallet(api_key: str, wallet_type: str, signer_address: str):
         }
 
 
+def _invalid_address_response(*addresses, chain: str = "base-sepolia"):
+    """Error response naming the first malformed EVM address, or None if all are valid"""
+    if chain.startswith("solana"):
+        return None
+    for address in addresses:
+        if not is_valid_address(address):
+            return {
+                "status": "error",
+                "error": f"Invalid EVM address: {address}",
+                "timestamp": datetime.utcnow().isoformat()
+            }
+    return None
+
+
+def _rate_limited_response(response, error_message: str) -> dict:
+    """Error response for a 429, flagged so callers can back off and retry"""
+    try:
+        retry_after = float(response.headers.get("Retry-After"))
+    except (TypeError, ValueError, AttributeError):
+        retry_after = None
+    return {
+        "status": "error",
+        "error": error_message,
+        "rate_limited": True,
+        "retry_after": retry_after,
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
+@traced("http.get_usdc_from_faucet")
 def get_usdc_from_faucet(api_key: str, chain: str, wallet_address: str, amount: int):
     """
     Get USDC from the Crossmint faucet
@@ -83,8 +142,14 @@ def get_usdc_from_faucet(api_key: str, chain: str, wallet_address: str, amount:
         amount (int): Amount of USDC to request
 
     Returns:
-        dict: Response containing status and transaction data or error message
+        dict: Response containing status and transaction data or error message.
+        A 429 response has "rate_limited": True and the Retry-After seconds
+        (or None) in "retry_after".
     """
+    invalid = _invalid_address_response(wallet_address, chain=chain)
+    if invalid:
+        return invalid
+
     endpoint = f"https://staging.crossmint.com/api/v1-alpha2/wallets/{wallet_address}/balances"
 
     headers = {
@@ -99,22 +164,21 @@ def get_usdc_from_faucet(api_key: str, chain: str, wallet_address: str, amount:
     }
 
     try:
-        response = requests.post(endpoint, json=payload, headers=headers)
+        response = http_session().post(endpoint, json=payload, headers=headers)
 
         if not response.ok:
             error_message = "Unknown error"
             try:
                 error_data = response.json()
                 if response.status_code == 429 and error_data.get("error") and error_data.get("message"):
-                    return {
-                        "status": "error",
-                        "error": error_data["message"],
-                        "timestamp": datetime.utcnow().isoformat()
-                    }
+                    return _rate_limited_response(response, error_data["message"])
                 error_message = error_data.get('message', str(response.text))
             except:
                 error_message = str(response.text)
 
+            if response.status_code == 429:
+                return _rate_limited_response(response, f"API Error: {error_message}")
+
             return {
                 "status": "error",
                 "error": f"API Error: {error_message}",
@@ -135,48 +199,166 @@ def get_usdc_from_faucet(api_key: str, chain: str, wallet_address: str, amount:
         }
 
 
-def transfer_usdc(api_key: str, from_wallet_address: str, to_wallet_address: str, amount: int, chain: str = "base-sepolia", private_key: str = None):
+@traced("abi.build_transfer_params")
+def build_transfer_params(to_wallet_address: str, amount: int, chain: str = "base-sepolia") -> dict:
     """
-    Transfer USDC from one wallet to another
+    Build create_transaction params for a USDC transfer
 
     Args:
-        api_key (str): Crossmint API key
-        from_wallet_address (str): Source wallet address
         to_wallet_address (str): Destination wallet address
         amount (int): Amount in USDC base units (1000000 = 1 USDC)
         chain (str): Blockchain network (default: "base-sepolia")
-        private_key (str): Private key for signing the transaction
+
+    Returns:
+        dict: Transaction params with a single ERC-20 transfer call
     """
-    usdc_contract_address = "0x14196F08a4Fa0B66B7331bC40dd6bCd8A1dEeA9F"
+    return build_batch_transfer_params([(to_wallet_address, amount)], chain)
+
+
+@traced("abi.build_batch_transfer_params")
+def build_batch_transfer_params(transfers, chain: str = "base-sepolia") -> dict:
+    """
+    Build create_transaction params for several USDC transfers in one transaction
 
-    # Make sure to_wallet_address is checksummed
-    to_wallet_address = Web3.to_checksum_address(to_wallet_address)
+    Args:
+        transfers (list): (to_wallet_address, amount in base units) pairs
+        chain (str): Blockchain network (default: "base-sepolia")
+
+    Returns:
+        dict: Transaction params with one ERC-20 transfer call per pair
+    """
+    from eth_abi import encode
+    from eth_utils import function_signature_to_4byte_selector
+
+    usdc_contract_address = "0x14196F08a4Fa0B66B7331bC40dd6bCd8A1dEeA9F"
 
     # Encode the transfer function call
     transfer_selector = function_signature_to_4byte_selector(
         'transfer(address,uint256)')
-    encoded_params = encode(['address', 'uint256'], [
-                            to_wallet_address, amount])
-    encoded_transfer = transfer_selector + encoded_params
 
-    params = {
-        "calls": [{
+    calls = []
+    for to_wallet_address, amount in transfers:
+        # Make sure to_wallet_address is checksummed (cached per address)
+        encoded_params = encode(['address', 'uint256'], [
+                                to_checksum_address(to_wallet_address), amount])
+        encoded_transfer = transfer_selector + encoded_params
+        calls.append({
             "to": usdc_contract_address,
             "value": "0",
             "data": f"0x{encoded_transfer.hex()}"
-        }],
+        })
+
+    return {
+        "calls": calls,
         "chain": chain
     }
 
+
+def transfer_usdc(api_key: str, from_wallet_address: str, to_wallet_address: str, amount: int, chain: str = "base-sepolia", private_key: str = None, signer_pool=None, journal=None, op_id: str = None):
+    """
+    Transfer USDC from one wallet to another
+
+    Args:
+        api_key (str): Crossmint API key
+        from_wallet_address (str): Source wallet address
+        to_wallet_address (str): Destination wallet address
+        amount (int): Amount in USDC base units (1000000 = 1 USDC)
+        chain (str): Blockchain network (default: "base-sepolia")
+        private_key (str): Private key for signing the transaction
+        signer_pool (SignerPool): Signs every pending approval with the matching
+            cached signer instead of using private_key
+        journal (TransactionJournal): Records each state transition under op_id,
+            so an interrupted transfer can be resumed (see tx_journal.resume_transaction)
+        op_id (str): Journal operation id (required with journal)
+    """
+    invalid = _invalid_address_response(from_wallet_address, to_wallet_address, chain=chain)
+    if invalid:
+        return invalid
+
+    params = build_transfer_params(to_wallet_address, amount, chain)
+    if journal:
+        journal.record(op_id, "intent", kind="transfer", wallet_address=from_wallet_address,
+                       chain=chain, params=params, amount=amount, to_wallet_address=to_wallet_address)
+
     # Create the transaction
     tx_response = create_transaction(
         api_key, from_wallet_address, chain, params)
 
     if tx_response["status"] != "success":
+        if journal:
+            journal.record(op_id, "failed", error=tx_response.get("error"))
         return tx_response
 
     tx_data = tx_response["transaction_data"]
+    if journal:
+        journal.record(op_id, "created", transaction_data=tx_data)
+
+    signature_response = approve_transaction(
+        api_key, from_wallet_address, tx_data, private_key, signer_pool)
+
+    if journal:
+        if signature_response.get("status") == "success":
+            journal.record(op_id, "approved")
+        elif signature_response.get("status") == "error":
+            journal.record(op_id, "failed", error=signature_response.get("error"))
+
+    return signature_response
 
+
+def transfer_usdc_batch(api_key: str, from_wallet_address: str, transfers, chain: str = "base-sepolia", private_key: str = None, signer_pool=None):
+    """
+    Transfer USDC from one wallet to many in a single transaction
+
+    The smart wallet executes every transfer call of the transaction, so N
+    payouts cost one create, one approval and one on-chain operation.
+
+    Args:
+        api_key (str): Crossmint API key
+        from_wallet_address (str): Source wallet address
+        transfers (list): (to_wallet_address, amount in base units) pairs
+        chain (str): Blockchain network (default: "base-sepolia")
+        private_key (str): Private key for signing the transaction
+        signer_pool (SignerPool): Signs every pending approval with the matching
+            cached signer instead of using private_key
+    """
+    transfers = list(transfers)
+    if not transfers:
+        return {
+            "status": "error",
+            "error": "No transfers to send",
+            "timestamp": datetime.utcnow().isoformat()
+        }
+
+    invalid = _invalid_address_response(
+        from_wallet_address, *(to_wallet_address for to_wallet_address, _ in transfers), chain=chain)
+    if invalid:
+        return invalid
+
+    params = build_batch_transfer_params(transfers, chain)
+    tx_response = create_transaction(api_key, from_wallet_address, chain, params)
+    if tx_response["status"] != "success":
+        return tx_response
+
+    return approve_transaction(
+        api_key, from_wallet_address, tx_response["transaction_data"], private_key, signer_pool)
+
+
+def approve_transaction(api_key: str, wallet_address: str, tx_data: dict, private_key: str = None, signer_pool=None):
+    """
+    Sign and submit the pending approvals of a created transaction
+
+    Args:
+        api_key (str): Crossmint API key
+        wallet_address (str): Wallet that created the transaction
+        tx_data (dict): Transaction data returned by create_transaction
+        private_key (str): Private key for signing the transaction
+        signer_pool (SignerPool): Signs every pending approval with the matching
+            cached signer instead of using private_key
+
+    Returns:
+        dict: The submit_transaction_approval response, or an error /
+        "awaiting_signature" response if the transaction cannot be signed
+    """
     # Check if transaction is awaiting approval
     if tx_data["status"] != "awaiting-approval":
         return {
@@ -186,6 +368,18 @@ def transfer_usdc(api_key: str, from_wallet_address: str, to_wallet_address: str
             "timestamp": datetime.utcnow().isoformat()
         }
 
+    if signer_pool is not None:
+        approvals = signer_pool.sign_pending(tx_data)
+        if not approvals:
+            return {
+                "status": "error",
+                "error": "No pending approval matches a signer in the signer pool",
+                "transaction_data": tx_data,
+                "timestamp": datetime.utcnow().isoformat()
+            }
+        return submit_transaction_approvals(
+            api_key, wallet_address, tx_data["id"], approvals)
+
     # If no private key provided, return the transaction data for later signing
     if not private_key:
         return {
@@ -207,7 +401,7 @@ def transfer_usdc(api_key: str, from_wallet_address: str, to_wallet_address: str
     # Submit the signature
     signature_response = submit_transaction_approval(
         api_key=api_key,
-        user_op_sender=from_wallet_address,
+        user_op_sender=wallet_address,
         transaction_id=tx_data["id"],
         signer_id=signer_id,
         signature=signature
@@ -216,6 +410,7 @@ def transfer_usdc(api_key: str, from_wallet_address: str, to_wallet_address: str
     return signature_response
 
 
+@traced("http.create_transaction")
 def create_transaction(api_key: str, wallet_address: str, chain: str, params: dict = None):
     """
     Create a transaction with specific parameters
@@ -269,7 +464,7 @@ def create_transaction(api_key: str, wallet_address: str, chain: str, params: di
     }
 
     try:
-        response = requests.post(
+        response = http_session().post(
             endpoint,
             json=payload,
             headers=headers
@@ -321,6 +516,20 @@ def generate_signature(private_key: str, user_op_hash: str) -> str:
     if not private_key:
         raise ValueError("Private key is required")
 
+    _validate_user_op_hash(user_op_hash)
+
+    from eth_account import Account
+
+    try:
+        account = Account.from_key(private_key)
+    except (ValueError, AttributeError):
+        raise ValueError("Invalid private key format")
+
+    return sign_user_op_hash(account, user_op_hash)
+
+
+def _validate_user_op_hash(user_op_hash: str) -> bytes:
+    """Validate a '0x'-prefixed user operation hash and return its bytes"""
     if not user_op_hash:
         raise ValueError("User operation hash is required")
 
@@ -329,18 +538,30 @@ def generate_signature(private_key: str, user_op_hash: str) -> str:
         if not user_op_hash.startswith('0x'):
             raise ValueError("User operation hash must start with '0x'")
         # Try to convert to bytes to validate it's a proper hex string
-        bytes.fromhex(user_op_hash.replace('0x', ''))
+        return bytes.fromhex(user_op_hash.replace('0x', ''))
     except (ValueError, AttributeError):
         raise ValueError("Invalid user operation hash format")
 
-    try:
-        w3 = Web3()
-        account = w3.eth.account.from_key(private_key)
-    except (ValueError, AttributeError):
-        raise ValueError("Invalid private key format")
+
+@traced("sign")
+def sign_user_op_hash(account, user_op_hash: str) -> str:
+    """
+    Sign a user operation hash with an already loaded account
+
+    Same result as generate_signature, but skips deriving the account from the
+    private key, which matters when one signer signs many transactions.
+
+    Args:
+        account (LocalAccount): eth_account account to sign with
+        user_op_hash (str): The user operation hash to sign
+
+    Returns:
+        str: The generated signature with '0x' prefix
+    """
+    from eth_account.messages import encode_defunct
 
     # Convert the hash to bytes and sign it as an Ethereum message
-    message_bytes = bytes.fromhex(user_op_hash.replace('0x', ''))
+    message_bytes = _validate_user_op_hash(user_op_hash)
     eth_message = encode_defunct(primitive=message_bytes)
     signed_message = account.sign_message(eth_message)
 
@@ -383,15 +604,32 @@ def submit_transaction_approval(
             }
         }
     """
+    return submit_transaction_approvals(
+        api_key,
+        user_op_sender,
+        transaction_id,
+        [{"signer": signer_id, "signature": signature}]
+    )
+
+
+@traced("http.submit_transaction_approvals")
+def submit_transaction_approvals(api_key: str, user_op_sender: str, transaction_id: str, approvals: list) -> dict:
+    """
+    Submit one or more approvals for a transaction in a single request
+
+    Args:
+        api_key (str): Crossmint API key
+        user_op_sender (str): The wallet address that created the transaction
+        transaction_id (str): The transaction ID to approve
+        approvals (list): Approvals as [{"signer": str, "signature": str}, ...]
+
+    Returns:
+        dict: Same format as submit_transaction_approval
+    """
     endpoint = f"https://staging.crossmint.com/api/2022-06-09/wallets/{user_op_sender}/transactions/{transaction_id}/approvals"
 
     payload = {
-        "approvals": [
-            {
-                "signer": signer_id,
-                "signature": signature
-            }
-        ]
+        "approvals": approvals
     }
 
     headers = {
@@ -400,7 +638,7 @@ def submit_transaction_approval(
     }
 
     try:
-        response = requests.post(
+        response = http_session().post(
             endpoint,
             json=payload,
             headers=headers
@@ -434,6 +672,7 @@ def submit_transaction_approval(
         }
 
 
+@traced("http.get_transaction")
 def get_transaction(api_key: str, user_op_sender: str, transaction_id: str) -> dict:
     """
     Get a transaction response
@@ -454,7 +693,7 @@ def get_transaction(api_key: str, user_op_sender: str, transaction_id: str) -> d
     }
 
     try:
-        response = requests.get(endpoint, headers=headers)
+        response = http_session().get(endpoint, headers=headers)
 
         if response.ok:
             return {
@@ -484,11 +723,51 @@ def get_transaction(api_key: str, user_op_sender: str, transaction_id: str) -> d
         }
 
 
+TERMINAL_TRANSACTION_STATUSES = ("success", "failed")
+
+
+@traced("wait_for_transaction")
+def wait_for_transaction(api_key: str, user_op_sender: str, transaction_id: str, timeout: float = 60, poll_interval: float = 2) -> dict:
+    """
+    Poll a transaction until it reaches a terminal status or the timeout expires
+
+    Args:
+        api_key (str): Crossmint API key
+        user_op_sender (str): The wallet address
+        transaction_id (str): The transaction ID
+        timeout (float): Seconds to wait before giving up
+        poll_interval (float): Seconds between polls
+
+    Returns:
+        dict: The last get_transaction response, or an error if the timeout expired
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        response = get_transaction(api_key, user_op_sender, transaction_id)
+        status = response.get("transaction_data", {}).get("status")
+        if response.get("status") == "success" and status in TERMINAL_TRANSACTION_STATUSES:
+            return response
+
+        if time.monotonic() + poll_interval > deadline:
+            return {
+                "status": "error",
+                "error": f"Timed out waiting for transaction {transaction_id} (last status: {status})",
+                "transaction_data": response.get("transaction_data"),
+                "timestamp": datetime.utcnow().isoformat()
+            }
+        traced_sleep(poll_interval)
+
+
+@traced("http.get_wallet_balance")
 def get_wallet_balance(api_key: str, chain: str, wallet_address: str):
     """
     Get the balance of a wallet using Crossmint API
     """
 
+    invalid = _invalid_address_response(wallet_address, chain=chain)
+    if invalid:
+        return invalid
+
     # Hit the Crossmint Staging API
     endpoint = f"https://staging.crossmint.com/api/unstable/wallets/{chain}:{wallet_address}/tokens"
 
@@ -498,7 +777,7 @@ def get_wallet_balance(api_key: str, chain: str, wallet_address: str):
     }
 
     try:
-        response = requests.get(endpoint, headers=headers)
+        response = http_session().get(endpoint, headers=headers)
 
         if not response.ok:
             return {
@@ -514,12 +793,14 @@ def get_wallet_balance(api_key: str, chain: str, wallet_address: str):
         balance = "0x0"
         if usdc_token:
             balance = usdc_token.get("tokenBalance", "0x0")
-        human_readable_balance = int(balance, 16) / 10**6
+        balance_base_units = int(balance, 16)
+        human_readable_balance = balance_base_units / 10**6
 
         return {
             "status": "success",
             "timestamp": datetime.utcnow().isoformat(),
             "balance": human_readable_balance,
+            "balance_base_units": balance_base_units,
         }
 
     except requests.exceptions.RequestException as e:
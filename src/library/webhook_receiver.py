@@ -0,0 +1,269 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from library.wallet_utils import TERMINAL_TRANSACTION_STATUSES, get_transaction
+
+WEBHOOK_PATH = "/webhooks/crossmint"
+
+
+def _secret_bytes(secret: str) -> bytes:
+    # Crossmint (Svix) secrets look like "whsec_<base64>"
+    if secret.startswith("whsec_"):
+        return base64.b64decode(secret[len("whsec_"):])
+    return secret.encode()
+
+
+def sign_payload(secret: str, message_id: str, timestamp: str, body: bytes) -> str:
+    """Compute the svix-signature header value for a webhook body"""
+    signed_content = f"{message_id}.{timestamp}.".encode() + body
+    digest = hmac.new(_secret_bytes(secret), signed_content, hashlib.sha256).digest()
+    return "v1," + base64.b64encode(digest).decode()
+
+
+def verify_signature(secret: str, headers, body: bytes, tolerance: int = 300) -> bool:
+    """
+    Verify a Crossmint webhook using its Svix headers
+
+    Args:
+        secret (str): Webhook signing secret
+        headers (Mapping): Request headers (svix-id, svix-timestamp, svix-signature)
+        body (bytes): Raw request body
+        tolerance (int): Maximum age of the timestamp in seconds, against replays
+
+    Returns:
+        bool: True if one of the signatures matches
+    """
+    message_id = headers.get("svix-id")
+    timestamp = headers.get("svix-timestamp")
+    signatures = headers.get("svix-signature")
+    if not (message_id and timestamp and signatures):
+        return False
+
+    try:
+        if abs(time.time() - int(timestamp)) > tolerance:
+            return False
+    except ValueError:
+        return False
+
+    expected = sign_payload(secret, message_id, timestamp, body)
+    return any(hmac.compare_digest(expected, candidate) for candidate in signatures.split())
+
+
+class TransactionWaiter:
+    """
+    Futures for transaction completion, resolved by webhook callbacks
+
+    wait() blocks until a callback reports a terminal status. Every poll_interval
+    seconds without a callback it polls get_transaction once, so a missed webhook
+    costs one poll interval, not the whole timeout. Callbacks that arrive before
+    anyone waits are kept (bounded) so the wait returns immediately.
+    """
+
+    def __init__(self, api_key: str = None, poll_interval: float = 10, keep_recent: int = 4096):
+        self.api_key = api_key
+        self.poll_interval = poll_interval
+        self.keep_recent = keep_recent
+        self._futures = {}
+        self._recent = OrderedDict()
+        self._lock = threading.Lock()
+        self.resolved_by_webhook = 0
+        self.resolved_by_poll = 0
+        self.timeouts = 0
+
+    def expect(self, transaction_id: str) -> Future:
+        """Future resolving to the terminal transaction data"""
+        with self._lock:
+            future = self._futures.get(transaction_id)
+            if future is None:
+                future = self._futures[transaction_id] = Future()
+                if transaction_id in self._recent:
+                    future.set_result(self._recent.pop(transaction_id))
+            return future
+
+    def resolve(self, transaction_id: str, transaction_data: dict) -> bool:
+        """Complete the waiter for a transaction; returns True if someone was waiting"""
+        with self._lock:
+            future = self._futures.pop(transaction_id, None)
+            if future is None:
+                self._recent[transaction_id] = transaction_data
+                while len(self._recent) > self.keep_recent:
+                    self._recent.popitem(last=False)
+                return False
+        if not future.done():
+            future.set_result(transaction_data)
+        return True
+
+    def wait(self, wallet_address: str, transaction_id: str, timeout: float = 120) -> dict:
+        """
+        Wait for a transaction to reach a terminal status
+
+        Returns:
+            dict: Same format as get_transaction, plus "resolved_by" ("webhook" or "poll")
+        """
+        future = self.expect(transaction_id)
+        deadline = time.monotonic() + timeout
+
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    transaction_data = future.result(timeout=min(self.poll_interval, remaining))
+                    self.resolved_by_webhook += 1
+                    return {
+                        "status": "success",
+                        "timestamp": datetime.utcnow().isoformat(),
+                        "transaction_data": transaction_data,
+                        "resolved_by": "webhook"
+                    }
+                except TimeoutError:
+                    pass
+
+                if self.api_key:
+                    response = get_transaction(self.api_key, wallet_address, transaction_id)
+                    status = response.get("transaction_data", {}).get("status")
+                    if response.get("status") == "success" and status in TERMINAL_TRANSACTION_STATUSES:
+                        self.resolved_by_poll += 1
+                        return {**response, "resolved_by": "poll"}
+        finally:
+            with self._lock:
+                self._futures.pop(transaction_id, None)
+
+        self.timeouts += 1
+        return {
+            "status": "error",
+            "error": f"Timed out waiting for transaction {transaction_id}",
+            "timestamp": datetime.utcnow().isoformat()
+        }
+
+    __call__ = wait
+
+    def stats(self) -> dict:
+        return {
+            "waiting": len(self._futures),
+            "resolved_by_webhook": self.resolved_by_webhook,
+            "resolved_by_poll": self.resolved_by_poll,
+            "timeouts": self.timeouts
+        }
+
+
+class WebhookReceiver:
+    """Local HTTP server that accepts Crossmint transaction callbacks and feeds a TransactionWaiter"""
+
+    def __init__(self, waiter: TransactionWaiter, secret: str, host: str = "127.0.0.1", port: int = 0):
+        self.waiter = waiter
+        self.secret = secret
+        self.received = 0
+        self.rejected = 0
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{WEBHOOK_PATH}"
+
+    def start(self) -> str:
+        """Serve in a background thread and return the callback URL"""
+        self._thread = threading.Thread(target=self._server.serve_forever, name="webhook-receiver", daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def handle_event(self, payload: dict):
+        data = payload.get("data", payload)
+        transaction = data.get("transaction", data)
+        transaction_id = transaction.get("id")
+        if transaction_id and transaction.get("status") in TERMINAL_TRANSACTION_STATUSES:
+            self.waiter.resolve(transaction_id, transaction)
+
+    def _handler_class(self):
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path != WEBHOOK_PATH:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if not verify_signature(receiver.secret, self.headers, body):
+                    receiver.rejected += 1
+                    self.send_response(401)
+                    self.end_headers()
+                    return
+
+                try:
+                    receiver.handle_event(json.loads(body))
+                except (ValueError, AttributeError):
+                    self.send_response(400)
+                    self.end_headers()
+                    return
+
+                receiver.received += 1
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def post_callback(url: str, secret: str, transaction_data: dict) -> requests.Response:
+    """
+    Local stand-in for Crossmint: post a signed transaction status callback
+
+    Args:
+        url (str): Receiver URL (WebhookReceiver.url)
+        secret (str): Webhook signing secret shared with the receiver
+        transaction_data (dict): Transaction as returned by get_transaction
+    """
+    status = transaction_data.get("status")
+    event_type = "wallets.transaction.succeeded" if status == "success" else f"wallets.transaction.{status}"
+    body = json.dumps({"type": event_type, "data": transaction_data}).encode()
+
+    message_id = f"msg_{uuid.uuid4().hex}"
+    timestamp = str(int(time.time()))
+    headers = {
+        "Content-Type": "application/json",
+        "svix-id": message_id,
+        "svix-timestamp": timestamp,
+        "svix-signature": sign_payload(secret, message_id, timestamp, body)
+    }
+    return requests.post(url, data=body, headers=headers)
+
+
+def waiter_from_env(api_key: str):
+    """
+    Start a receiver when WEBHOOK_SECRET and WEBHOOK_PORT are set
+
+    Returns:
+        TransactionWaiter: Waiter fed by the receiver, or None if webhooks are not configured
+    """
+    secret = os.getenv('WEBHOOK_SECRET')
+    port = os.getenv('WEBHOOK_PORT')
+    if not (secret and port):
+        return None
+
+    waiter = TransactionWaiter(api_key, poll_interval=float(os.getenv('WEBHOOK_POLL_INTERVAL', '10')))
+    receiver = WebhookReceiver(waiter, secret, os.getenv('WEBHOOK_HOST', '127.0.0.1'), int(port))
+    print(f"Listening for transaction webhooks at {receiver.start()}")
+    return waiter
@@ -1,10 +1,11 @@
+import copy
 import os
 import sys
 from pathlib import Path
+import argparse
 import json
 import time
 import random
-from openai import OpenAI
 from dotenv import load_dotenv
 
 # Add the project root to Python path
@@ -12,19 +13,31 @@ project_root = str(Path(__file__).parent.parent)
 sys.path.append(project_root)
 
 from library.wallet_utils import (
-    create_wallet, create_transaction, generate_signature, 
-    submit_transaction_approval, get_transaction, 
+    create_wallet, create_transaction,
+    submit_transaction_approvals, get_transaction, 
     transfer_usdc, get_usdc_from_faucet, get_wallet_balance
 )
 from library.tools_schema import tools_schema
+from library.command_router import route_command
+from library.wallet_registry import WalletRegistry
+from library.addresses import validate_addresses
+from library.signer_pool import SignerPool
+from library.balance_ledger import BalanceLedger, print_reconciliation
+from library.speculative_tx import SpeculativeTransactions
+from library.webhook_receiver import waiter_from_env
+from library import tracing
+from library.profiling import Profiler
+from library.token_budget import BudgetExceededError, TokenBudget
+from library.tracing import span, traced_sleep
 
 # Load environment variables
 load_dotenv()
 
 class CryptoAssistantAgent:
     def __init__(self):
-        # Initialize OpenAI client and API keys
-        self.client = OpenAI()
+        # The OpenAI clients are created lazily, see `client` and `async_client`
+        self._client = None
+        self._async_client = None
         self.api_key = os.getenv('CROSSMINT_SERVER_API_KEY')
         self.private_key = os.getenv('SIGNER_PRIVATE_KEY')
         self.signer_address = os.getenv('SIGNER_ADDRESS')
@@ -32,19 +45,91 @@ class CryptoAssistantAgent:
         if not all([self.api_key, self.private_key, self.signer_address]):
             raise ValueError("Missing required environment variables")
             
-        self.wallets = []
+        self.wallets = WalletRegistry()
+        self._signer_pool = None
+        self.ledger = self._ledger_from_env()
+        # Webhook-driven confirmations when WEBHOOK_SECRET/WEBHOOK_PORT are set
+        self.transaction_waiter = waiter_from_env(self.api_key)
+        # Replaced by main() when run with --profile
+        self.profiler = Profiler()
+        self.model = "gpt-4-turbo-preview"
+        # Token and cost ceilings from the BUDGET_* environment variables
+        self.budget = TokenBudget.from_env(self.model)
+        # Pre-created, pre-signed repeat transfers when SPECULATIVE_TX_TTL is set
+        self.speculation = self._speculation_from_env()
         self.chain_explorers = {
             "base-sepolia": "https://sepolia.basescan.org",
             "ethereum-sepolia": "https://sepolia.etherscan.io",
             "solana-devnet": "https://explorer.solana.com/?cluster=devnet"
         }
 
+    @property
+    def client(self):
+        """OpenAI client, created on first use to keep startup fast"""
+        if self._client is None:
+            from openai import OpenAI
+            self._client = OpenAI()
+        return self._client
+
+    @property
+    def async_client(self):
+        """AsyncOpenAI client for the session manager, created on first use"""
+        if self._async_client is None:
+            from openai import AsyncOpenAI
+            self._async_client = AsyncOpenAI()
+        return self._async_client
+
+    @property
+    def signer_pool(self):
+        """Signer pool (SIGNER_PRIVATE_KEY plus SIGNER_KEYSTORE), loaded on first use"""
+        if self._signer_pool is None:
+            self._signer_pool = SignerPool.from_env()
+        return self._signer_pool
+
+    def _ledger_from_env(self):
+        """Balance ledger, reconciled every LEDGER_RECONCILE_INTERVAL seconds when set"""
+        ledger = BalanceLedger(self.api_key)
+        if os.getenv('LEDGER_RECONCILE_INTERVAL'):
+            ledger.start(float(os.getenv('LEDGER_RECONCILE_INTERVAL')), print_reconciliation)
+        return ledger
+
+    def _speculation_from_env(self):
+        if not os.getenv('SPECULATIVE_TX_TTL'):
+            return None
+        return SpeculativeTransactions(
+            self.api_key, self.signer_pool, ttl=float(os.getenv('SPECULATIVE_TX_TTL')))
+
+    def for_session(self):
+        """
+        Agent for one conversation of a multi-session process
+
+        Shares the OpenAI clients, signers, budget, confirmation waiter and
+        profiler with this agent. The wallet registry, ledger (and its
+        reconciler) and speculative transactions are the session's own, so
+        sessions never see each other's wallets or prepared transfers.
+        """
+        session = copy.copy(self)
+        session._signer_pool = self.signer_pool
+        session.wallets = WalletRegistry()
+        session.ledger = self._ledger_from_env()
+        session.speculation = self._speculation_from_env()
+        return session
+
+    def admin_signer_address(self):
+        """Admin signer for a new wallet, spread across the pool when a keystore is configured"""
+        if os.getenv('SIGNER_KEYSTORE'):
+            return self.signer_pool.next_address()
+        return self.signer_address
+
     def create_new_wallet(self, wallet_type):
         """Agent method to create and track new wallets"""
-        result = create_wallet(self.api_key, wallet_type, self.signer_address)
+        result = create_wallet(self.api_key, wallet_type, self.admin_signer_address())
         
         if result.get("status") == "success":
-            self.wallets.append(result["wallet_data"])
+            self.wallets.add(result["wallet_data"])
+            # The ledger reconciles on base-sepolia: it only holds EVM wallets
+            if wallet_type == "evm-smart-wallet":
+                self.ledger.track(result["wallet_data"].get("address"))
             
         return result
 
@@ -80,19 +165,37 @@ class CryptoAssistantAgent:
 
     def get_wallet_balance(self, wallet_address):
         """Agent method to get the balance of a wallet"""
-        wallet = next((w for w in self.wallets if w['address'] == wallet_address), None)
+        wallet = self.wallets.get(wallet_address)
         if not wallet:
             return {"status": "error", "message": "Wallet not found in tracked wallets"}
+        self.wallets.touch(wallet_address)
             
         chain = "base-sepolia" if wallet['type'] == "evm-smart-wallet" else "solana-devnet"
         explorer_url = self.get_explorer_url(wallet_address, chain)
         
-        return {
+        result = {
             "status": "success",
             "message": f"View wallet balance and transactions at: {explorer_url}",
             "explorer_url": explorer_url
         }
 
+        # Balance from the local ledger, fetched only when it is unknown or suspect
+        balance = self.ledger.checked_balance(wallet_address) if wallet['type'] == "evm-smart-wallet" else None
+        if balance is not None:
+            result["balance"] = balance / 10**6
+            result["message"] = f"Balance: {result['balance']} USDC. " + result["message"]
+        return result
+
+    def find_wallets(self, query: str = "", wallet_type: str = None, limit: int = 10):
+        """Agent method to look up tracked wallets by address fragment or type"""
+        limit = max(1, min(int(limit or 10), 50))
+        matches = self.wallets.search(query or "", wallet_type, limit)
+        return {
+            "status": "success",
+            "total_tracked": len(self.wallets),
+            "wallets": [{"address": w.get("address"), "type": w.get("type")} for w in matches]
+        }
+
     def create_transaction(self, wallet_address):
         """Create and process a transaction for the specified wallet"""
         try:
@@ -105,31 +208,33 @@ class CryptoAssistantAgent:
                 
             transaction_data = transaction_response.get("transaction_data", {})
             transaction_id = transaction_data.get("id")
-            user_op_hash = transaction_data.get("data", {}).get("userOperationHash")
-            
-            # Step 2: Generate signature
+
+            # Step 2: Sign every pending approval with its cached signer
             print("Generating signature...")
-            signature = generate_signature(self.private_key, user_op_hash)
-            
-            # Step 3: Submit signature
+            approvals = self.signer_pool.sign_pending(transaction_data)
+            if not approvals:
+                return {"status": "error", "message": "No signer available for the pending approvals"}
+
+            # Step 3: Submit signatures
             print("Submitting signature...")
-            signer_id = self.signer_address
-            submit_response = submit_transaction_approval(
-                self.api_key, 
-                wallet_address, 
-                transaction_id, 
-                signer_id, 
-                signature
+            submit_response = submit_transaction_approvals(
+                self.api_key,
+                wallet_address,
+                transaction_id,
+                approvals
             )
-            
+
             if submit_response.get("status") != "success":
                 return {"status": "error", "message": "Signature submission failed"}
                 
             # Step 4: Verify transaction
             print("Verifying transaction...")
-            time.sleep(10)  # Allow transaction to process
-            
-            transaction_status = get_transaction(self.api_key, wallet_address, transaction_id)
+            if self.transaction_waiter:
+                transaction_status = self.transaction_waiter.wait(wallet_address, transaction_id)
+            else:
+                traced_sleep(10)  # Allow transaction to process
+
+                transaction_status = get_transaction(self.api_key, wallet_address, transaction_id)
             
             return {
                 "status": "success",
@@ -145,11 +250,13 @@ class CryptoAssistantAgent:
 
     def get_usdc_tokens(self, wallet_address: str, amount: int):
         """Get USDC tokens from faucet for a wallet"""
+        self.wallets.touch(wallet_address)
         result = get_usdc_from_faucet(self.api_key, "base-sepolia", wallet_address, amount)
         
         if result.get("status") == "success":
             print(f"Waiting for faucet transaction to process...")
-            time.sleep(5)
+            self.ledger.apply_faucet(wallet_address, amount)
+            traced_sleep(5)
             
             # Provide explorer link instead of balance
             explorer_url = self.get_explorer_url(wallet_address)
@@ -163,24 +270,46 @@ class CryptoAssistantAgent:
             # Convert USDC amount to base units (1 USDC = 1,000,000 base units)
             amount_in_base_units = amount * 1000000
 
+            # Reject malformed addresses before any API call, and use one spelling
+            checked = validate_addresses([from_wallet, to_wallet])
+            if checked["invalid"]:
+                return {"status": "error", "message": checked["invalid"][0]["error"]}
+            from_wallet, to_wallet = checked["valid"]
+            self.wallets.touch(to_wallet)
+            self.wallets.touch(from_wallet)
+
             # Create and send the transaction
-            transaction_response = transfer_usdc(
-                self.api_key,
-                from_wallet,
-                to_wallet,
-                amount_in_base_units,
-                "base-sepolia",
-                self.private_key
-            )
+            if self.speculation:
+                transaction_response = self.speculation.submit_transfer(
+                    from_wallet, to_wallet, amount_in_base_units)
+            else:
+                transaction_response = transfer_usdc(
+                    self.api_key,
+                    from_wallet,
+                    to_wallet,
+                    amount_in_base_units,
+                    "base-sepolia",
+                    self.private_key,
+                    signer_pool=self.signer_pool
+                )
             
             if transaction_response.get("status") != "success":
                 return transaction_response
 
+            self.ledger.apply_transfer(from_wallet, to_wallet, amount_in_base_units)
+
             transaction_data = transaction_response.get("transaction_data", {})
             
             # Wait for transaction to process
             print("Waiting for transaction to process...")
-            time.sleep(15)  # Increased wait time
+            if self.transaction_waiter:
+                self.transaction_waiter.wait(from_wallet, transaction_data.get("id"))
+            else:
+                traced_sleep(15)  # Increased wait time
+
+            if self.speculation:
+                # A transfer seen twice recently is likely to repeat: have it ready
+                self.speculation.prepare_repeat_transfer(from_wallet, to_wallet, amount_in_base_units)
             
             # Get the explorer URLs
             from_explorer = self.get_explorer_url(from_wallet)
@@ -202,9 +331,70 @@ class CryptoAssistantAgent:
                 "message": f"Transfer failed: {str(e)}"
             }
 
+def handle_tool_call(agent, name, args):
+    """Run a tool by name with parsed arguments, print progress and return its output"""
+    with span(f"tool.{name}"), agent.profiler.profile(f"tool.{name}"):
+        return _run_tool(agent, name, args)
+
+def _run_tool(agent, name, args):
+    result = None
+
+    if name == "create_new_wallet":
+        result = agent.create_new_wallet(args["wallet_type"])
+        if result.get("status") == "success":
+            print(f"\nWallet Created Successfully!")
+
+    elif name == "get_wallet_balance":
+        result = agent.get_wallet_balance(args["wallet_address"])
+        if result.get("status") == "success":
+            print(f"\n{result.get('message')}")
+
+    elif name == "find_wallets":
+        result = agent.find_wallets(
+            args.get("query", ""), args.get("wallet_type"), args.get("limit", 10))
+
+    elif name == "create_transaction":
+        wallet_address = agent.select_wallet()
+        if wallet_address:
+            result = agent.create_transaction(wallet_address)
+            if result.get("status") == "success":
+                print("\nTransaction Completed Successfully!")
+            else:
+                print(f"\nTransaction Failed: {result.get('message', 'Unknown error')}")
+
+    elif name == "get_usdc_from_faucet":
+        result = agent.get_usdc_tokens(args["wallet_address"], args["amount"])
+        if result.get("status") == "success":
+            print("\nUSDC tokens requested successfully!")
+        else:
+            print(f"\nFailed to get USDC tokens: {result.get('message', 'Unknown error')}")
+
+    elif name == "transfer_usdc":
+        result = agent.transfer_usdc_tokens(
+            args["from_wallet_address"],
+            args["to_wallet_address"],
+            args["amount"]
+        )
+        if result.get("status") == "success":
+            print("\nUSDC transfer completed successfully!")
+            print(f"\nView source wallet at: {result['data']['from_wallet_explorer']}")
+            print(f"View destination wallet at: {result['data']['to_wallet_explorer']}")
+        else:
+            print(f"\nUSDC transfer failed: {result.get('message', 'Unknown error')}")
+
+    return result
+
 def main():
     try:
+        parser = argparse.ArgumentParser()
+        parser.add_argument("--profile", nargs="?", const="profile-stats", metavar="DIR",
+                            help="cProfile every tool call into DIR (default: profile-stats)")
+        options = parser.parse_args()
+
         agent = CryptoAssistantAgent()
+        agent.profiler = Profiler(options.profile)
+        if tracing.configure():
+            print(f"Writing trace spans to {os.getenv('TRACE_FILE')}")
         print("Welcome to the AI Assistant! (Type 'exit' or 'q' to quit)")
 
         # Create an assistant
@@ -213,7 +403,7 @@ def main():
             instructions="""You are a super helpful AI web3 assistant that can perform actions on the blockchain using Crossmint's API.
             You can create new wallets, check balances, deposit tokens, transfer tokens between wallets, and more.""",
             tools=tools_schema(),
-            model="gpt-4-turbo-preview"
+            model=agent.model
         )
 
         # Create a thread for the conversation
@@ -225,102 +415,92 @@ def main():
             if user_input.lower() in ['exit', 'q']:
                 farewell = random.choice(["Goodbye!", "See ya!", "Take care!"])
                 print(farewell)
+                if agent.speculation:
+                    print(f"Speculative transactions: {json.dumps(agent.speculation.stats())}")
+                print(f"Budget: {json.dumps(agent.budget.stats(), indent=2)}")
+                agent.profiler.print_hotspots()
                 break
 
-            # Create message in thread
-            message = agent.client.beta.threads.messages.create(
-                thread_id=thread.id,
-                role="user",
-                content=user_input
-            )
+            # One root span per turn when TRACE_FILE is set
+            with span("turn", input=user_input[:80]):
+                # Structured commands go straight to the tool, skipping the run
+                routed = route_command(user_input)
+                if routed:
+                    result = handle_tool_call(agent, *routed)
+                    print(f"Result: {json.dumps(result, indent=2)}")
+                    continue
 
-            # Create and process run
-            run = agent.client.beta.threads.runs.create(
-                thread_id=thread.id,
-                assistant_id=assistant.id,
-            )
+                # A spent budget ends the turn, not the session
+                try:
+                    agent.budget.acquire()
+                except BudgetExceededError as e:
+                    print(f"\nBudget exceeded: {e}")
+                    continue
 
-            while True:
-                run = agent.client.beta.threads.runs.retrieve(
-                    thread_id=thread.id,
-                    run_id=run.id
-                )
-                
-                if run.status == 'completed':
-                    messages = agent.client.beta.threads.messages.list(
-                        thread_id=thread.id
+                # Create message in thread
+                with span("openai.messages.create"):
+                    message = agent.client.beta.threads.messages.create(
+                        thread_id=thread.id,
+                        role="user",
+                        content=user_input
                     )
-                    # Display latest assistant message
-                    latest_message = next(msg for msg in messages.data 
-                                       if msg.role == "assistant")
-                    print(f"\nAI Assistant: {latest_message.content[0].text.value}")
-                    break
+
+                # Create and process run
+                run_started = time.perf_counter()
+                with span("openai.runs.create"):
+                    run = agent.client.beta.threads.runs.create(
+                        thread_id=thread.id,
+                        assistant_id=assistant.id,
+                    )
+
+                while True:
+                    with span("openai.runs.retrieve"):
+                        run = agent.client.beta.threads.runs.retrieve(
+                            thread_id=thread.id,
+                            run_id=run.id
+                        )
+                
+                    if run.status in ['completed', 'failed', 'expired']:
+                        # Usage covers every model call the run made
+                        agent.budget.record(run.usage, time.perf_counter() - run_started, user_input[:80])
+
+                    if run.status == 'completed':
+                        with span("openai.messages.list"):
+                            messages = agent.client.beta.threads.messages.list(
+                                thread_id=thread.id
+                            )
+                        # Display latest assistant message
+                        latest_message = next(msg for msg in messages.data 
+                                           if msg.role == "assistant")
+                        print(f"\nAI Assistant: {latest_message.content[0].text.value}")
+                        break
                     
-                elif run.status == 'requires_action':
-                    tool_calls = run.required_action.submit_tool_outputs.tool_calls
-                    tool_outputs = []
+                    elif run.status == 'requires_action':
+                        tool_calls = run.required_action.submit_tool_outputs.tool_calls
+                        tool_outputs = []
                     
-                    for tool_call in tool_calls:
-                        args = json.loads(tool_call.function.arguments)
-                        result = None
-                        
-                        # Handle different tool calls
-                        if tool_call.function.name == "create_new_wallet":
-                            result = agent.create_new_wallet(args["wallet_type"])
-                            if result.get("status") == "success":
-                                print(f"\nWallet Created Successfully!")
-                            
-                        elif tool_call.function.name == "get_wallet_balance":
-                            result = agent.get_wallet_balance(args["wallet_address"])
-                            if result.get("status") == "success":
-                                print(f"\n{result.get('message')}")
-                                
-                        elif tool_call.function.name == "create_transaction":
-                            wallet_address = agent.select_wallet()
-                            if wallet_address:
-                                result = agent.create_transaction(wallet_address)
-                                if result.get("status") == "success":
-                                    print("\nTransaction Completed Successfully!")
-                                else:
-                                    print(f"\nTransaction Failed: {result.get('message', 'Unknown error')}")
-
-                        elif tool_call.function.name == "get_usdc_from_faucet":
-                            result = agent.get_usdc_tokens(args["wallet_address"], args["amount"])
-                            if result.get("status") == "success":
-                                print("\nUSDC tokens requested successfully!")
-                            else:
-                                print(f"\nFailed to get USDC tokens: {result.get('message', 'Unknown error')}")
-
-                        elif tool_call.function.name == "transfer_usdc":
-                            result = agent.transfer_usdc_tokens(
-                                args["from_wallet_address"],
-                                args["to_wallet_address"],
-                                args["amount"]
-                            )
-                            if result.get("status") == "success":
-                                print("\nUSDC transfer completed successfully!")
-                                print(f"\nView source wallet at: {result['data']['from_wallet_explorer']}")
-                                print(f"View destination wallet at: {result['data']['to_wallet_explorer']}")
-                            else:
-                                print(f"\nUSDC transfer failed: {result.get('message', 'Unknown error')}")
-
-                        tool_outputs.append({
-                            "tool_call_id": tool_call.id,
-                            "output": json.dumps(result)
-                        })
+                        for tool_call in tool_calls:
+                            args = json.loads(tool_call.function.arguments)
+                            result = handle_tool_call(agent, tool_call.function.name, args)
+
+                            tool_outputs.append({
+                                "tool_call_id": tool_call.id,
+                                "output": json.dumps(result)
+                            })
                     
-                    # Submit tool outputs
-                    agent.client.beta.threads.runs.submit_tool_outputs(
-                        thread_id=thread.id,
-                        run_id=run.id,
-                        tool_outputs=tool_outputs
-                    )
+                        # Submit tool outputs
+                        with span("openai.runs.submit_tool_outputs"):
+                            agent.client.beta.threads.runs.submit_tool_outputs(
+                                thread_id=thread.id,
+                                run_id=run.id,
+                                tool_outputs=tool_outputs
+                            )
                     
-                elif run.status in ['failed', 'expired']:
-                    print(f"Run failed with status: {run.status}")
-                    break
+                    elif run.status in ['failed', 'expired']:
+                        print(f"Run failed with status: {run.status}")
+                        break
                 
-                time.sleep(1)
+                    traced_sleep(1)
 
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
@@ -0,0 +1,372 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+
+# The agent lives next to this script; the project root for library imports
+from run import CryptoAssistantAgent, handle_tool_call
+
+from library import tracing
+from library.command_router import route_command
+from library.token_budget import BudgetExceededError
+from library.tools_schema import tools_schema
+from library.tracing import span
+
+ASSISTANT_INSTRUCTIONS = """You are a super helpful AI web3 assistant that can perform actions on the blockchain using Crossmint's API.
+            You can create new wallets, check balances, deposit tokens, transfer tokens between wallets, and more."""
+
+# Tools that prompt on stdin, which concurrent sessions cannot share
+INTERACTIVE_TOOLS = {"create_transaction"}
+
+# Run statuses after which the run makes no more model calls
+TERMINAL_RUN_STATUSES = ("completed", "failed", "expired", "cancelled", "incomplete")
+
+
+class SessionLimitError(Exception):
+    """Opening a session would go past the cap on active sessions"""
+
+
+def _percentile(values: list, fraction: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class SessionMetrics:
+    """Latency of one session's turns, split into OpenAI, tool and polling time"""
+
+    def __init__(self, keep: int = 256):
+        self.turns = 0
+        self.errors = 0
+        self.polls = 0
+        self.openai_seconds = 0.0
+        self.tool_seconds = 0.0
+        self.latencies = deque(maxlen=keep)
+
+    def record_turn(self, latency: float, ok: bool):
+        self.turns += 1
+        if not ok:
+            self.errors += 1
+        self.latencies.append(latency)
+
+    def stats(self) -> dict:
+        latencies = list(self.latencies)
+        to_ms = lambda seconds: round(seconds * 1000, 1) if seconds is not None else None
+        return {
+            "turns": self.turns,
+            "errors": self.errors,
+            "polls": self.polls,
+            "avg_ms": to_ms(sum(latencies) / len(latencies)) if latencies else None,
+            "p50_ms": to_ms(_percentile(latencies, 0.5)),
+            "p95_ms": to_ms(_percentile(latencies, 0.95)),
+            "max_ms": to_ms(max(latencies)) if latencies else None,
+            "openai_ms": to_ms(self.openai_seconds),
+            "tool_ms": to_ms(self.tool_seconds)
+        }
+
+
+class Session:
+    """One conversation: an Assistants thread and the wallets created in it"""
+
+    def __init__(self, session_id: str, thread_id: str, agent: CryptoAssistantAgent):
+        self.id = session_id
+        self.thread_id = thread_id
+        self.agent = agent
+        self.metrics = SessionMetrics()
+        self.created = time.monotonic()
+        self.last_active = self.created
+        # A thread accepts one run at a time: a session's turns queue up here
+        self.lock = asyncio.Lock()
+
+
+class SessionManager:
+    """
+    Many Assistants conversations in one process, on one event loop
+
+    Each session ID maps to its own thread and runs its run/poll/tool loop as
+    an asyncio task, so a session waiting on OpenAI or on a transfer does not
+    hold up the others. OpenAI calls go through AsyncOpenAI; tools, which
+    block on Crossmint, run in worker threads. Sessions share the assistant,
+    signers and budget, but each has its own wallet registry, ledger and
+    speculative transactions (CryptoAssistantAgent.for_session).
+    """
+
+    def __init__(self, agent: CryptoAssistantAgent, max_sessions: int = 16,
+                 idle_timeout: float = 1800, poll_interval: float = 1.0):
+        """
+        Args:
+            agent (CryptoAssistantAgent): Agent whose clients and signers the sessions share
+            max_sessions (int): Most sessions open at once
+            idle_timeout (float): Seconds after which an idle session may be closed
+                to make room for a new one
+            poll_interval (float): Seconds between run status polls
+        """
+        self.agent = agent
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.poll_interval = poll_interval
+        self.sessions = {}
+        self.assistant_id = None
+        self.rejected = 0
+        self.closed = 0
+        self._open_lock = asyncio.Lock()
+
+    @classmethod
+    def from_env(cls, agent: CryptoAssistantAgent):
+        """Limits from ASSISTANT_MAX_SESSIONS, ASSISTANT_IDLE_TIMEOUT and ASSISTANT_POLL_INTERVAL"""
+        return cls(
+            agent,
+            max_sessions=int(os.getenv('ASSISTANT_MAX_SESSIONS', '16')),
+            idle_timeout=float(os.getenv('ASSISTANT_IDLE_TIMEOUT', '1800')),
+            poll_interval=float(os.getenv('ASSISTANT_POLL_INTERVAL', '1')))
+
+    async def start(self):
+        """Create the assistant every session talks to"""
+        assistant = await self.agent.async_client.beta.assistants.create(
+            name="Web3 Assistant",
+            instructions=ASSISTANT_INSTRUCTIONS,
+            tools=tools_schema(),
+            model=self.agent.model
+        )
+        self.assistant_id = assistant.id
+
+    def thread_ids(self) -> dict:
+        """session ID -> Assistants thread ID"""
+        return {session_id: session.thread_id for session_id, session in self.sessions.items()}
+
+    async def open_session(self, session_id: str = None) -> Session:
+        """
+        Open a session (or return the open one with this ID)
+
+        Raises:
+            SessionLimitError: If max_sessions are open and none has been idle
+                for idle_timeout
+        """
+        session_id = session_id or uuid.uuid4().hex[:12]
+        async with self._open_lock:
+            if session_id in self.sessions:
+                return self.sessions[session_id]
+            if len(self.sessions) >= self.max_sessions and not self._close_idle():
+                self.rejected += 1
+                raise SessionLimitError(f"{self.max_sessions} sessions are active")
+
+            with span("openai.threads.create"):
+                thread = await self.agent.async_client.beta.threads.create()
+            session = Session(session_id, thread.id, self.agent.for_session())
+            self.sessions[session_id] = session
+            return session
+
+    def _close_idle(self) -> bool:
+        """Close the least recently active session idle past idle_timeout, if any"""
+        now = time.monotonic()
+        idle = [session for session in self.sessions.values()
+                if not session.lock.locked() and now - session.last_active >= self.idle_timeout]
+        if not idle:
+            return False
+        self.close_session(min(idle, key=lambda session: session.last_active).id)
+        return True
+
+    def close_session(self, session_id: str):
+        session = self.sessions.pop(session_id, None)
+        if session:
+            session.agent.ledger.stop()
+            if session.agent.speculation:
+                session.agent.speculation.close(wait=False)
+            self.closed += 1
+
+    async def ask(self, session_id: str, user_input: str) -> dict:
+        """
+        Run one turn of a session, opening it if needed
+
+        Returns:
+            dict: Response with the assistant's "reply" and the turn's latency
+        """
+        opening = time.perf_counter()
+        try:
+            session = await self.open_session(session_id)
+        except Exception as e:
+            # Over the limit, or the thread could not be created: fail this turn only
+            return {"status": "error", "session_id": session_id, "message": str(e),
+                    "latency_ms": round((time.perf_counter() - opening) * 1000, 1),
+                    "timestamp": datetime.utcnow().isoformat()}
+
+        async with session.lock:
+            started = time.perf_counter()
+            try:
+                with span("turn", session=session.id, input=user_input[:80]):
+                    result = await self._turn(session, user_input)
+            except BudgetExceededError as e:
+                result = {"status": "error", "message": f"Budget exceeded: {e}"}
+            except Exception as e:
+                result = {"status": "error", "message": str(e)}
+            latency = time.perf_counter() - started
+            session.last_active = time.monotonic()
+            session.metrics.record_turn(latency, result.get("status") != "error")
+
+        result.update({
+            "session_id": session.id,
+            "latency_ms": round(latency * 1000, 1),
+            "timestamp": datetime.utcnow().isoformat()
+        })
+        return result
+
+    async def _call_openai(self, session: Session, name: str, call):
+        started = time.perf_counter()
+        try:
+            with span(f"openai.{name}"):
+                return await call
+        finally:
+            session.metrics.openai_seconds += time.perf_counter() - started
+
+    async def _run_tool(self, session: Session, name: str, args: dict) -> dict:
+        if name in INTERACTIVE_TOOLS:
+            return {"status": "error", "message": f"{name} needs an interactive terminal and is not available in sessions"}
+        started = time.perf_counter()
+        try:
+            return await asyncio.to_thread(handle_tool_call, session.agent, name, args)
+        finally:
+            session.metrics.tool_seconds += time.perf_counter() - started
+
+    async def _turn(self, session: Session, user_input: str) -> dict:
+        agent = session.agent
+        client = agent.async_client
+
+        # Structured commands go straight to the tool, skipping the run
+        routed = route_command(user_input)
+        if routed:
+            result = await self._run_tool(session, *routed)
+            return {"status": "success", "reply": json.dumps(result, indent=2)}
+
+        # Raises BudgetExceededError past a session ceiling, throttles per minute
+        await asyncio.to_thread(agent.budget.acquire)
+
+        await self._call_openai(session, "messages.create", client.beta.threads.messages.create(
+            thread_id=session.thread_id,
+            role="user",
+            content=user_input
+        ))
+        run_started = time.perf_counter()
+        run = await self._call_openai(session, "runs.create", client.beta.threads.runs.create(
+            thread_id=session.thread_id,
+            assistant_id=self.assistant_id
+        ))
+
+        while True:
+            session.metrics.polls += 1
+            run = await self._call_openai(session, "runs.retrieve", client.beta.threads.runs.retrieve(
+                thread_id=session.thread_id,
+                run_id=run.id
+            ))
+
+            if run.status in TERMINAL_RUN_STATUSES:
+                # Usage covers every model call the run made; recording also
+                # releases the room acquire() reserved
+                agent.budget.record(run.usage, time.perf_counter() - run_started, user_input[:80])
+
+            if run.status == 'completed':
+                messages = await self._call_openai(session, "messages.list", client.beta.threads.messages.list(
+                    thread_id=session.thread_id
+                ))
+                latest_message = next(msg for msg in messages.data if msg.role == "assistant")
+                return {"status": "success", "reply": latest_message.content[0].text.value}
+
+            elif run.status == 'requires_action':
+                tool_outputs = []
+                for tool_call in run.required_action.submit_tool_outputs.tool_calls:
+                    args = json.loads(tool_call.function.arguments)
+                    result = await self._run_tool(session, tool_call.function.name, args)
+                    tool_outputs.append({"tool_call_id": tool_call.id, "output": json.dumps(result)})
+
+                await self._call_openai(session, "runs.submit_tool_outputs", client.beta.threads.runs.submit_tool_outputs(
+                    thread_id=session.thread_id,
+                    run_id=run.id,
+                    tool_outputs=tool_outputs
+                ))
+                continue
+
+            elif run.status in TERMINAL_RUN_STATUSES:
+                return {"status": "error", "message": f"Run failed with status: {run.status}"}
+
+            await asyncio.sleep(self.poll_interval)
+
+    def stats(self) -> dict:
+        return {
+            "active_sessions": len(self.sessions),
+            "max_sessions": self.max_sessions,
+            "rejected": self.rejected,
+            "closed": self.closed,
+            "sessions": {
+                session_id: {
+                    "thread_id": session.thread_id,
+                    "wallets": len(session.agent.wallets),
+                    **session.metrics.stats()
+                }
+                for session_id, session in self.sessions.items()
+            }
+        }
+
+
+async def _serve_stdin(manager: SessionManager):
+    """Read "<session>: <message>" lines and answer each session concurrently"""
+    pending = set()
+
+    async def answer(session_id, message):
+        result = await manager.ask(session_id, message)
+        if result["status"] == "error":
+            print(f"\n[{session_id}] Error: {result['message']} ({result['latency_ms']} ms)")
+        else:
+            print(f"\n[{session_id}] AI Assistant: {result['reply']} ({result['latency_ms']} ms)")
+
+    while True:
+        line = (await asyncio.to_thread(input, "")).strip()
+        if line.lower() in ['exit', 'q']:
+            break
+        if line.lower() == 'stats':
+            print(json.dumps(manager.stats(), indent=2))
+            continue
+        session_id, separator, message = line.partition(":")
+        if not separator or not message.strip():
+            print('Use "<session>: <message>", "stats" or "q"')
+            continue
+        task = asyncio.create_task(answer(session_id.strip(), message.strip()))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+
+    if pending:
+        print(f"Waiting for {len(pending)} turns in progress...")
+        await asyncio.gather(*pending)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve many assistant conversations from one process")
+    parser.add_argument("--max-sessions", type=int, help="Most sessions open at once (ASSISTANT_MAX_SESSIONS)")
+    options = parser.parse_args()
+
+    agent = CryptoAssistantAgent()
+    if tracing.configure():
+        print(f"Writing trace spans to {os.getenv('TRACE_FILE')}")
+    manager = SessionManager.from_env(agent)
+    if options.max_sessions:
+        manager.max_sessions = options.max_sessions
+
+    async def run():
+        await manager.start()
+        print(f"Multi-session assistant ready, up to {manager.max_sessions} sessions.")
+        print('Type "<session>: <message>" to talk in a session, "stats" for metrics, "q" to quit.')
+        await _serve_stdin(manager)
+
+    try:
+        asyncio.run(run())
+    except (KeyboardInterrupt, EOFError):
+        pass
+    print(f"Sessions: {json.dumps(manager.stats(), indent=2)}")
+    print(f"Budget: {json.dumps(agent.budget.stats(), indent=2)}")
+
+
+if __name__ == "__main__":
+    main()
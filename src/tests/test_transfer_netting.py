@@ -0,0 +1,91 @@
+import sys
+import threading
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent)
+sys.path.append(project_root)
+
+from library import transfer_netting
+from library.transfer_netting import MINIMAL, TransferNetter, minimal_settlement
+
+A = "0x" + "aa" * 20
+B = "0x" + "bb" * 20
+C = "0x" + "cc" * 20
+D = "0x" + "dd" * 20
+
+
+def test_minimal_settlement_attaches_offset_intents():
+    settlements = minimal_settlement([
+        {"id": "i1", "from": A, "to": B, "amount": 5},
+        {"id": "i2", "from": B, "to": A, "amount": 10}
+    ])
+    assert [(s["from"], s["to"], s["amount"]) for s in settlements] == [(B, A, 5)]
+    assert settlements[0]["intents"] == ["i1", "i2"]
+
+
+def test_minimal_settlement_keeps_unconnected_groups_apart():
+    settlements = minimal_settlement([
+        {"id": "i1", "from": A, "to": B, "amount": 5},
+        {"id": "i2", "from": C, "to": D, "amount": 7}
+    ])
+    assert sorted((s["from"], s["to"], s["amount"], tuple(s["intents"])) for s in settlements) == [
+        (A, B, 5, ("i1",)), (C, D, 7, ("i2",))
+    ]
+
+
+def test_failed_settlement_fails_offset_intents(monkeypatch):
+    def failing_transfer(*args, **kwargs):
+        return {"status": "error", "error": "rejected"}
+
+    monkeypatch.setattr(transfer_netting, "transfer_usdc", failing_transfer)
+    netter = TransferNetter("api-key", mode=MINIMAL, window=60)
+    try:
+        first = netter.submit(A, B, 5, intent_id="i1")
+        second = netter.submit(B, A, 10, intent_id="i2")
+        netter.flush()
+        for future in (first, second):
+            result = future.result(timeout=5)
+            assert result["status"] == "error"
+            assert not result["netted_out"]
+            assert [s["amount"] for s in result["settled_by"]] == [5]
+    finally:
+        netter.close()
+
+
+def test_full_window_settles_off_the_caller_thread(monkeypatch):
+    release = threading.Event()
+
+    def blocking_transfer(*args, **kwargs):
+        release.wait(5)
+        return {"status": "success", "transaction_data": {"id": "tx"}}
+
+    monkeypatch.setattr(transfer_netting, "transfer_usdc", blocking_transfer)
+    netter = TransferNetter("api-key", window=60, max_intents=2)
+    try:
+        first = netter.submit(A, B, 5, intent_id="i1")
+        second = netter.submit(C, D, 7, intent_id="i2")
+        assert not second.done()
+        release.set()
+        assert first.result(timeout=5)["status"] == "success"
+        assert second.result(timeout=5)["status"] == "success"
+    finally:
+        release.set()
+        netter.close()
+
+
+def test_raising_settlement_resolves_every_intent(monkeypatch):
+    def raising_transfer(*args, **kwargs):
+        raise RuntimeError("connection reset")
+
+    monkeypatch.setattr(transfer_netting, "transfer_usdc", raising_transfer)
+    netter = TransferNetter("api-key", window=60)
+    try:
+        futures = [netter.submit(A, B, 5, intent_id="i1"), netter.submit(C, D, 7, intent_id="i2")]
+        netter.flush()
+        for future in futures:
+            result = future.result(timeout=5)
+            assert result["status"] == "error"
+            assert result["settled_by"][0]["error"] == "connection reset"
+    finally:
+        netter.close()